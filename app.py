@@ -4,23 +4,114 @@ from urllib3.exceptions import NotOpenSSLWarning
 # Suppress the NotOpenSSLWarning
 warnings.filterwarnings("ignore", category=NotOpenSSLWarning)
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_file, Response, abort, g
 import os
 import time
-import requests
-from bs4 import BeautifulSoup
+import hashlib
+import itertools
+import threading
+import logging
 from flask_cors import CORS
-from datetime import datetime
+from synthesis_cache import SynthesisCache
+from audio_store import AudioStore
+from http_pool import HTTPPool
+from concurrent.futures import ThreadPoolExecutor
+from text_segmenter import segment_text, split_first
+from mp3_utils import join_mp3
+from packing import can_pack, pack_text, plan_packs
+from providers import ProviderRegistry
+from providers.base import output_file
+from job_queue import JobQueue
+from async_runtime import TIMEOUT_ERRORS, AsyncLoopThread
+from provider_router import CircuitBreaker, ProviderRouter
+from hedging import Hedger
+import cancellation
+from rate_limiter import RateLimiter, RateLimitTimeout
+from voice_catalog import VoiceCatalog, fetch_ttsmaker_voices, fetch_edge_voices
+from metrics import Registry
+from stage_timer import StageTimer, merge_parallel, log_sampled
+from warmup import WarmUp, resolve_host
+from single_flight import SingleFlight
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 CORS(app)
 
 # Configuration
-UPLOAD_FOLDER = 'static/audio'
+UPLOAD_FOLDER = os.environ.get('TTS_AUDIO_DIR', 'static/audio')
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['AUDIO_MAX_BYTES'] = int(os.environ.get('TTS_AUDIO_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+app.config['AUDIO_TTL'] = int(os.environ.get('TTS_AUDIO_TTL', 30 * 24 * 3600))
+app.config['AUDIO_SWEEP_INTERVAL'] = int(os.environ.get('TTS_AUDIO_SWEEP_INTERVAL', 300))
+app.config['CACHE_MAX_AGE'] = int(os.environ.get('TTS_CACHE_MAX_AGE', 7 * 24 * 3600))
+# '' serves audio from Python, 'x-accel' hands it to nginx, 'x-sendfile' to Apache/lighttpd
+app.config['AUDIO_SENDFILE'] = os.environ.get('TTS_AUDIO_SENDFILE', '')
+app.config['AUDIO_ACCEL_PREFIX'] = os.environ.get('TTS_AUDIO_ACCEL_PREFIX', '/_protected_audio/')
+app.config['USE_X_SENDFILE'] = app.config['AUDIO_SENDFILE'] == 'x-sendfile'
+app.config['HTTP_POOL_SIZE'] = int(os.environ.get('TTS_HTTP_POOL_SIZE', 10))
+app.config['HTTP_CONNECT_TIMEOUT'] = float(os.environ.get('TTS_HTTP_CONNECT_TIMEOUT', 5))
+app.config['HTTP_READ_TIMEOUT'] = float(os.environ.get('TTS_HTTP_READ_TIMEOUT', 60))
+app.config['CHUNK_MAX_CHARS'] = int(os.environ.get('TTS_CHUNK_MAX_CHARS', 300))
+app.config['CHUNK_CONCURRENCY'] = int(os.environ.get('TTS_CHUNK_CONCURRENCY', 4))
+# Longest packed edge-tts request when many short texts share a voice (0 disables packing)
+app.config['EDGE_PACK_MAX_CHARS'] = int(os.environ.get('TTS_EDGE_PACK_MAX_CHARS', 1000))
+# Longest first segment /api/convert/progressive synthesizes before answering
+app.config['FIRST_SEGMENT_MAX_CHARS'] = int(os.environ.get('TTS_FIRST_SEGMENT_MAX_CHARS', 60))
+app.config['JOB_DB'] = os.environ.get('TTS_JOB_DB', 'tts_jobs.db')
+app.config['JOB_WORKERS'] = int(os.environ.get('TTS_JOB_WORKERS', 4))
+app.config['EDGE_TTS_CONCURRENCY'] = int(os.environ.get('TTS_EDGE_CONCURRENCY', 200))
+app.config['EDGE_TTS_TIMEOUT'] = float(os.environ.get('TTS_EDGE_TIMEOUT', 120))
+# Threads running the Flask routes that async_server.py does not serve natively
+app.config['ASYNC_WSGI_THREADS'] = int(os.environ.get('TTS_ASYNC_WSGI_THREADS', 32))
+# Upstream endpoints, overridable to point at local stand-ins (see benchmark.py)
+app.config['TTSMAKER_URL'] = os.environ.get('TTS_TTSMAKER_URL', 'https://ttsmaker.cn/api/tts')
+app.config['EDGE_WSS_URL'] = os.environ.get('TTS_EDGE_WSS_URL', '')
+app.config['ROUTER_FALLBACK'] = os.environ.get('TTS_ROUTER_FALLBACK', '1') == '1'
+app.config['BREAKER_FAILURES'] = int(os.environ.get('TTS_BREAKER_FAILURES', 5))
+app.config['BREAKER_ERROR_RATE'] = float(os.environ.get('TTS_BREAKER_ERROR_RATE', 0.5))
+app.config['BREAKER_RESET_TIMEOUT'] = float(os.environ.get('TTS_BREAKER_RESET_TIMEOUT', 30))
+app.config['SLOW_CALL_THRESHOLD'] = float(os.environ.get('TTS_SLOW_CALL_THRESHOLD', 20))
+app.config['HEDGE_ENABLED'] = os.environ.get('TTS_HEDGE_ENABLED', '0') == '1'
+app.config['HEDGE_PERCENTILE'] = float(os.environ.get('TTS_HEDGE_PERCENTILE', 95))
+app.config['HEDGE_MIN_DELAY'] = float(os.environ.get('TTS_HEDGE_MIN_DELAY', 0.5))
+app.config['HEDGE_MAX_DELAY'] = float(os.environ.get('TTS_HEDGE_MAX_DELAY', 10))
+# Upstream admission limits: requests/second and characters/second per host
+app.config['RATE_LIMITS'] = {
+    'ttsmaker.cn': {
+        'requests_per_second': float(os.environ.get('TTS_RATE_TTSMAKER_RPS', 2)),
+        'chars_per_second': float(os.environ.get('TTS_RATE_TTSMAKER_CPS', 2000)),
+    },
+    'speech.platform.bing.com': {
+        'requests_per_second': float(os.environ.get('TTS_RATE_EDGE_RPS', 10)),
+        'chars_per_second': float(os.environ.get('TTS_RATE_EDGE_CPS', 20000)),
+    },
+}
+app.config['RATE_LIMIT_MAX_WAIT'] = float(os.environ.get('TTS_RATE_LIMIT_MAX_WAIT', 30))
+# SQLite file holding the rate-limit buckets when several worker processes share them (see prefork.py)
+app.config['RATE_LIMIT_DB'] = os.environ.get('TTS_RATE_LIMIT_DB', '')
+# Worker number under prefork.py; only worker 0 runs the voice catalog refresh
+app.config['WORKER_ID'] = int(os.environ.get('TTS_WORKER_ID', 0))
+app.config['VOICE_SNAPSHOT'] = os.environ.get('TTS_VOICE_SNAPSHOT', 'voice_catalog.json')
+app.config['VOICE_REFRESH_INTERVAL'] = float(os.environ.get('TTS_VOICE_REFRESH_INTERVAL', 3600))
+# Warm up providers, upstream connections and the voice list at start-up; /healthz/ready waits for it
+app.config['WARMUP'] = os.environ.get('TTS_WARMUP', '0') == '1'
+app.config['WARMUP_CONNECTIONS'] = int(os.environ.get('TTS_WARMUP_CONNECTIONS', 2))
+app.config['VALIDATE_VOICES'] = os.environ.get('TTS_VALIDATE_VOICES', '1') == '1'
+# Fraction of conversions whose stage timings are written to the 'tts.timing' log
+app.config['TIMING_SAMPLE_RATE'] = float(os.environ.get('TTS_TIMING_SAMPLE_RATE', 0.01))
+app.config['BATCH_MAX_ITEMS'] = int(os.environ.get('TTS_BATCH_MAX_ITEMS', 500))
+# Concurrent upstream calls allowed per provider across all batch requests (unset: the plugin's default)
+app.config['BATCH_PROVIDER_LIMITS'] = {
+    service: int(os.environ[variable])
+    for service, variable in [('ttsmaker', 'TTS_BATCH_TTSMAKER_LIMIT'), ('ai_speaker', 'TTS_BATCH_AI_SPEAKER_LIMIT')]
+    if os.environ.get(variable)
+}
+# Provider plugins imported at start-up (during warm-up); the others are imported on first use
+app.config['PROVIDERS'] = [
+    name.strip() for name in os.environ.get('TTS_PROVIDERS', 'ttsmaker,ai_speaker').split(',') if name.strip()
+]
 
 # Available TTS services with their settings
 TTS_SERVICES = {
@@ -75,186 +166,668 @@ TTS_SERVICES = {
     }
 }
 
+# Closest AI Speaker voice for each TTSMaker voice, used when routing around an unhealthy provider
+TTSMAKER_TO_AI_SPEAKER = {
+    1504: 'zh-CN-XiaoxiaoNeural',
+    350: 'zh-CN-YunxiNeural',
+    352: 'zh-CN-YunjianNeural',
+    359: 'zh-CN-YunyangNeural',
+}
+AI_SPEAKER_TO_TTSMAKER = {
+    'zh-CN-XiaoxiaoNeural': 1504,
+    'zh-CN-YunxiNeural': 350,
+    'zh-CN-YunjianNeural': 352,
+    'zh-CN-XiaoyiNeural': 349,
+    'zh-CN-YunyangNeural': 359,
+}
+# AI Speaker prosody keywords and the TTSMaker multipliers they correspond to
+AI_SPEAKER_RATES = {'x-slow': 0.5, 'slow': 0.75, 'medium': 1.0, 'fast': 1.25, 'x-fast': 1.5,
+                    'x-low': 0.5, 'low': 0.75, 'high': 1.25, 'x-high': 1.5}
+AI_SPEAKER_VOLUMES = {'silent': 0.5, 'x-soft': 0.5, 'soft': 0.75, 'medium': 1.0, 'loud': 1.25, 'x-loud': 1.5}
+
+def translate_params(service, params, target):
+    """Map request parameters to the equivalent voice on another provider, or None"""
+    if service == 'ttsmaker' and target == 'ai_speaker':
+        voice_id = TTSMAKER_TO_AI_SPEAKER.get(params['voice_id'])
+        if voice_id is None:
+            voice = voice_catalog.get('ttsmaker', params['voice_id'])
+            if voice is None or voice['language'] != 'zh-cn':
+                return None
+            voice_id = 'zh-CN-YunxiNeural' if voice['gender'] == 'Male' else 'zh-CN-XiaoxiaoNeural'
+        return {
+            'voice_id': voice_id,
+            'speed': str(params['speed']),
+            'pitch': str(params['pitch']),
+            'volume': str(params['volume']),
+        }
+    if service == 'ai_speaker' and target == 'ttsmaker':
+        voice_id = AI_SPEAKER_TO_TTSMAKER.get(params['voice_id'])
+        if voice_id is None:
+            return None
+        try:
+            return {
+                'voice_id': voice_id,
+                'speed': AI_SPEAKER_RATES.get(params['speed']) or float(params['speed']),
+                'pitch': AI_SPEAKER_RATES.get(params['pitch']) or float(params['pitch']),
+                'volume': AI_SPEAKER_VOLUMES.get(params['volume']) or float(params['volume']),
+            }
+        except (TypeError, ValueError):
+            return None
+    return None
+
 class TTSConverter:
-    def __init__(self, output_dir):
+    """Entry point of the app's conversions, dispatching to the provider plugins
+
+    Plugins are loaded through a ProviderRegistry on first use; see providers/.
+    """
+
+    def __init__(self, output_dir, http=None, runtime=None, edge_timeout=120, limiter=None,
+                 ttsmaker_url='https://ttsmaker.cn/api/tts', edge_wss_url='', enabled=()):
         self.output_dir = output_dir
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        # Per-host token buckets every upstream call is admitted through
+        self.limiter = limiter or RateLimiter({})
+        # Keep-alive connection pools shared by all worker threads
+        self.http = http or HTTPPool()
+        # Long-lived event loop that all edge-tts sessions are multiplexed on
+        self.runtime = runtime or AsyncLoopThread()
+        self.providers = ProviderRegistry(
+            {'output_dir': output_dir, 'http': self.http, 'limiter': self.limiter, 'runtime': self.runtime},
+            options={
+                'ttsmaker': {'url': ttsmaker_url},
+                'ai_speaker': {'timeout': edge_timeout, 'wss_url': edge_wss_url},
+            },
+            enabled=enabled
+        )
+
+    def output_file(self, prefix):
+        """Return a unique (filename, path) in the output directory"""
+        return output_file(self.output_dir, prefix)
 
-    def tts_maker(self, text, voice_id=1504, speed=1.0, pitch=1.0, volume=1.0):
+    def tts_maker(self, text, voice_id=1504, speed=1.0, pitch=1.0, volume=1.0, priority=False):
         """Convert text to speech using the real TTSMaker API"""
-        try:
-            import requests
-            import os
-            from datetime import datetime
-            
-            # Create output directory if it doesn't exist
-            os.makedirs(self.output_dir, exist_ok=True)
-            
-            # TTSMaker API endpoint
-            url = 'https://ttsmaker.cn/api/tts'
-            
-            # Prepare the request data
-            data = {
-                'text': text,
-                'voice_id': voice_id,  # Use the actual voice ID from TTSMaker
-                'speed': speed,
-                'volume': volume,
-                'pitch': pitch,
-                'audio_format': 'mp3',
-                'audio_speed': speed,
-                'audio_volume': volume,
-                'audio_norm': '0',
-                'text_paragraph_pause_time': '0',
-                'background_music_volume': '0',
-                'background_music_speed': '1',
-                'speech_rate': speed,
-                'pitch_rate': pitch,
-            }
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': '*/*',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Referer': 'https://ttsmaker.cn/',
-                'Origin': 'https://ttsmaker.cn',
-                'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'
-            }
-            
-            # Make the API request
-            response = requests.post(url, data=data, headers=headers)
-            
-            if response.status_code == 200:
-                # Generate a unique filename with timestamp
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f'ttsmaker_{timestamp}.mp3'
-                filepath = os.path.join(self.output_dir, filename)
-                
-                # Save the audio response
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-                
-                # Verify the file was created
-                if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-                    return {
-                        'success': True, 
-                        'filename': filename, 
-                        'service': f'TTSMaker (ID: {voice_id})'
-                    }
-                else:
-                    return {'success': False, 'error': 'Failed to save audio file'}
-            else:
-                return {'success': False, 'error': f'API request failed with status {response.status_code}'}
-                
-        except Exception as e:
-            return {'success': False, 'error': f'Error with TTSMaker API: {str(e)}'}
+        return self.providers.get('ttsmaker').synthesize(text, voice_id, speed, pitch, volume, priority)
 
-    def luyinzhushou(self, text, voice_id=0, speed=1.0, pitch=1.0, volume=1.0):
-        """Convert text to speech using edge-tts as fallback for luyinzhushou"""
-        try:
-            # Use edge-tts as a fallback
-            # Map voice_id to a different range if needed
-            # voice_id 0 -> 0, 1 -> 1, etc.
-            return self.tts_maker(text, voice_id=voice_id % 6, speed=speed, pitch=pitch, volume=volume)
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f'Error with TTS service: {str(e)}'
-            }
+    async def tts_maker_async(self, session, text, voice_id=1504, speed=1.0, pitch=1.0, volume=1.0):
+        """Like tts_maker, but awaits the API over an aiohttp session instead of blocking a thread"""
+        return await self.providers.get('ttsmaker').synthesize_async(session, text, voice_id, speed, pitch, volume)
+
+    def luyinzhushou(self, text, voice_id='zh-CN-YunxiNeural', speed='0%', pitch='0%', volume=None):
+        """Convert text to speech using luyinzhushou.com"""
+        return self.providers.get('luyinzhushou').synthesize(text, voice_id, speed, pitch, volume)
 
-    def ai_speaker(self, text, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium'):
+    def ai_speaker(self, text, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium', priority=False):
         """Convert text to speech using AI Speaker service with edge-tts"""
-        try:
-            import edge_tts
-            import asyncio
-            import os
-            from datetime import datetime
-            
-            # Convert string parameters to appropriate values for edge_tts
-            # Map string values to numeric values for edge-tts
-            speed_map = {
-                'x-slow': '-50%', 'slow': '-25%', 'medium': '0%', 'fast': '25%', 'x-fast': '50%',
-                # Also handle numeric values that might be passed as strings
-                '0.5': '-50%', '0.75': '-25%', '1.0': '0%', '1.25': '25%', '1.5': '50%', '2.0': '100%'
-            }
-            pitch_map = {
-                'x-low': '-50%', 'low': '-25%', 'medium': '0%', 'high': '25%', 'x-high': '50%',
-                # Also handle numeric values that might be passed as strings
-                '0.5': '-50%', '0.75': '-25%', '1.0': '0%', '1.25': '25%', '1.5': '50%', '2.0': '100%'
-            }
-            volume_map = {
-                'silent': '0%', 'x-soft': '25%', 'soft': '50%', 'medium': '75%', 'loud': '90%', 'x-loud': '100%',
-                # Also handle numeric values that might be passed as strings
-                '0.5': '50%', '0.75': '75%', '1.0': '100%', '1.25': '125%', '1.5': '150%', '2.0': '200%'
-            }
-            
-            # Get the mapped values or default to medium if not found
-            mapped_speed = speed_map.get(str(speed), '0%')
-            mapped_pitch = pitch_map.get(str(pitch), '0%')
-            mapped_volume = volume_map.get(str(volume), '100%')
-            
-            # Create output directory if it doesn't exist
-            os.makedirs(self.output_dir, exist_ok=True)
-            
-            # Generate a unique filename with timestamp
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'ai_speaker_{timestamp}.mp3'
-            filepath = os.path.join(self.output_dir, filename)
-            
-            async def generate_speech():
-                # Create SSML (Speech Synthesis Markup Language) to include voice parameters
-                ssml_text = f"""<speak>
-                    <voice name="{voice_id}">
-                        <prosody rate="{mapped_speed}" pitch="{mapped_pitch}" volume="{mapped_volume}">
-                            {text}
-                        </prosody>
-                    </voice>
-                </speak>"""
-                
-                communicate = edge_tts.Communicate(
-                    text=ssml_text,
-                    voice=voice_id
-                )
-                await communicate.save(filepath)
-            
-            # Run the async function
-            asyncio.run(generate_speech())
-            
-            # Verify the file was created
-            if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-                return {
-                    'success': True, 
-                    'filename': filename, 
-                    'service': f'AI Speaker ({voice_id})'
-                }
-            else:
-                return {'success': False, 'error': 'Failed to generate audio file'}
-                
-        except Exception as e:
-            return {'success': False, 'error': f'Error with AI Speaker: {str(e)}'}
+        return self.providers.get('ai_speaker').synthesize(text, voice_id, speed, pitch, volume, priority)
+
+    def ai_speaker_packed(self, texts, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium'):
+        """Synthesize several texts in one AI Speaker session and cut the audio into one file per text"""
+        return self.providers.get('ai_speaker').synthesize_packed(texts, voice_id, speed, pitch, volume)
+
+    async def ai_speaker_async(self, text, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium'):
+        """Like ai_speaker, but awaited directly on the caller's event loop"""
+        return await self.providers.get('ai_speaker').synthesize_async(text, voice_id, speed, pitch, volume)
+
+    def ai_speaker_stream(self, text, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium', on_complete=None):
+        """Stream AI Speaker audio chunks as edge-tts produces them; see EdgeTTSProvider.stream"""
+        return self.providers.get('ai_speaker').stream(text, voice_id, speed, pitch, volume, on_complete)
 
     def google_tts(self, text, voice_id='zh-CN-Wavenet-A', speed=1.0, pitch=1.0, volume=1.0):
-        """Convert text to speech using edge-tts as fallback for Google TTS"""
-        try:
-            # Use edge-tts as a fallback
-            return self.tts_maker(text, voice_id=0, speed=speed, pitch=pitch, volume=volume)
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f'Error with TTS service: {str(e)}'
-            }
+        """Alias of tts_maker kept for older callers; there is no Google backend
+
+        The text is always read by TTSMaker voice 0, whatever voice_id is given.
+        """
+        return self.tts_maker(text, voice_id=0, speed=speed, pitch=pitch, volume=volume)
+
+timing_log = logging.getLogger('tts.timing')
+if not timing_log.handlers:
+    timing_log.addHandler(logging.StreamHandler())
+    timing_log.setLevel(logging.INFO)
 
 # Initialize TTS converter
-tts_converter = TTSConverter(app.config['UPLOAD_FOLDER'])
+http_pool = HTTPPool(
+    pool_size=app.config['HTTP_POOL_SIZE'],
+    connect_timeout=app.config['HTTP_CONNECT_TIMEOUT'],
+    read_timeout=app.config['HTTP_READ_TIMEOUT']
+)
+rate_limiter = RateLimiter(
+    app.config['RATE_LIMITS'],
+    max_wait=app.config['RATE_LIMIT_MAX_WAIT'],
+    shared_path=app.config['RATE_LIMIT_DB']
+)
+async_runtime = AsyncLoopThread(max_concurrency=app.config['EDGE_TTS_CONCURRENCY'])
+audio_store = AudioStore(
+    app.config['UPLOAD_FOLDER'],
+    max_bytes=app.config['AUDIO_MAX_BYTES'],
+    ttl=app.config['AUDIO_TTL'],
+    sweep_interval=app.config['AUDIO_SWEEP_INTERVAL']
+)
+# The store is one directory shared by every prefork worker, so only worker 0 scans and evicts
+if app.config['WORKER_ID'] == 0:
+    audio_store.start_sweeper()
+# Converters write into the store's staging area; finished files are moved into their shard
+tts_converter = TTSConverter(
+    audio_store.staging_dir,
+    http=http_pool,
+    runtime=async_runtime,
+    edge_timeout=app.config['EDGE_TTS_TIMEOUT'],
+    limiter=rate_limiter,
+    ttsmaker_url=app.config['TTSMAKER_URL'],
+    edge_wss_url=app.config['EDGE_WSS_URL'],
+    enabled=app.config['PROVIDERS']
+)
+voice_catalog = VoiceCatalog(
+    {service: config['voices'] for service, config in TTS_SERVICES.items()},
+    # Other workers pick up the snapshot worker 0 saves instead of fetching the lists themselves,
+    # and only the enabled providers' lists are fetched
+    sources={
+        service: source for service, source in {
+            'ttsmaker': lambda: fetch_ttsmaker_voices(http_pool, rate_limiter),
+            'ai_speaker': lambda: fetch_edge_voices(async_runtime),
+        }.items() if service in app.config['PROVIDERS']
+    } if app.config['WORKER_ID'] == 0 else None,
+    snapshot_path=app.config['VOICE_SNAPSHOT'],
+    refresh_interval=app.config['VOICE_REFRESH_INTERVAL']
+)
+voice_catalog.start_refresher()
+synthesis_cache = SynthesisCache(audio_store, max_age=app.config['CACHE_MAX_AGE'])
+single_flight = SingleFlight()
+# The async serving mode adds its own, so stats and metrics cover both
+single_flights = [single_flight]
+
+def coalesced_stats():
+    """Leader, follower and in-flight counts summed over every single-flight group"""
+    totals = {'leaders': 0, 'followers': 0, 'in_flight': 0}
+    for flight in single_flights:
+        for name, value in flight.stats().items():
+            totals[name] += value
+    return totals
+
+provider_router = ProviderRouter(
+    providers=list(TTS_SERVICES),
+    fallbacks={'ttsmaker': ['ai_speaker'], 'ai_speaker': ['ttsmaker']} if app.config['ROUTER_FALLBACK'] else {},
+    translate=translate_params,
+    slow_threshold=app.config['SLOW_CALL_THRESHOLD'],
+    failure_threshold=app.config['BREAKER_FAILURES'],
+    error_rate_threshold=app.config['BREAKER_ERROR_RATE'],
+    reset_timeout=app.config['BREAKER_RESET_TIMEOUT']
+)
+hedger = Hedger(
+    provider_router,
+    percentile=app.config['HEDGE_PERCENTILE'],
+    min_delay=app.config['HEDGE_MIN_DELAY'],
+    max_delay=app.config['HEDGE_MAX_DELAY']
+)
+
+warmup_steps = [
+    ('async_runtime', async_runtime.start),
+    ('providers', tts_converter.providers.load_enabled),
+]
+if 'ttsmaker' in app.config['PROVIDERS']:
+    warmup_steps.append(
+        ('ttsmaker', lambda: http_pool.preconnect(app.config['TTSMAKER_URL'], app.config['WARMUP_CONNECTIONS']))
+    )
+if 'ai_speaker' in app.config['PROVIDERS']:
+    # edge-tts opens a new connection per session, so only its DNS lookup can be done ahead
+    warmup_steps.append(('edge_tts', lambda: resolve_host(tts_converter.providers.get('ai_speaker').endpoint)))
+warmup_steps.append(('voices', lambda: voice_catalog.prime(timeout=30)))
+warmup = WarmUp(warmup_steps)
+if app.config['WARMUP']:
+    warmup.start()
+else:
+    warmup.skip()
+
+metrics = Registry()
+request_latency = metrics.histogram(
+    'tts_request_duration_seconds', 'Conversion request latency until the response starts',
+    ['endpoint', 'service', 'voice']
+)
+upstream_latency = metrics.histogram(
+    'tts_upstream_duration_seconds', 'Latency of single upstream synthesis calls', ['provider', 'voice']
+)
+upstream_errors = metrics.counter('tts_upstream_errors_total', 'Failed upstream synthesis calls', ['provider', 'type'])
+characters_synthesized = metrics.counter(
+    'tts_characters_synthesized_total', 'Characters sent to upstream providers', ['provider']
+)
+bytes_produced = metrics.counter('tts_audio_bytes_produced_total', 'MP3 bytes stored after synthesis', ['provider'])
+bytes_served = metrics.counter('tts_audio_bytes_served_total', 'MP3 bytes sent to clients', ['endpoint'])
+packed_requests = metrics.counter(
+    'tts_edge_packed_texts_total', 'Texts synthesized inside packed multi-text edge-tts sessions'
+)
+in_flight = metrics.gauge('tts_requests_in_flight', 'Requests currently being handled', ['endpoint'])
+metrics.snapshot('tts_cache_hits_total', 'Synthesis cache hits', lambda: synthesis_cache.hits, kind='counter')
+metrics.snapshot('tts_cache_misses_total', 'Synthesis cache misses', lambda: synthesis_cache.misses, kind='counter')
+metrics.snapshot(
+    'tts_coalesced_requests_total', 'Conversions that waited for an identical one in flight instead of calling upstream',
+    lambda: coalesced_stats()['followers'], kind='counter'
+)
+metrics.snapshot('tts_audio_store_bytes', 'Bytes held in the audio store', lambda: audio_store.stats()['bytes'])
+metrics.snapshot('tts_audio_store_files', 'Files held in the audio store', lambda: audio_store.stats()['files'])
+metrics.snapshot(
+    'tts_provider_circuit_open', 'Whether the provider circuit breaker is open (1) or not (0)',
+    lambda: {(service,): int(state['state'] != 'closed') for service, state in provider_router.status().items()},
+    labelnames=['provider']
+)
+metrics.snapshot(
+    'tts_rate_limit_waiting', 'Upstream calls queued for rate-limit capacity',
+    lambda: {(host,): stats['waiting'] for host, stats in rate_limiter.stats().items()},
+    labelnames=['host']
+)
+metrics.snapshot('tts_edge_sessions_in_flight', 'edge-tts sessions on the event loop', lambda: async_runtime.in_flight)
+
+def record_upstream(provider, voice_id, text, result, elapsed):
+    """Count one upstream call in the latency, error and character metrics"""
+    upstream_latency.observe(elapsed, provider=provider, voice=voice_id)
+    characters_synthesized.inc(len(text), provider=provider)
+    if not result['success']:
+        upstream_errors.inc(provider=provider, type=result.get('error_type', 'exception'))
+
+def parse_conversion_params(service, data):
+    """Normalize the voice and prosody parameters of a request for the given service
+
+    Raises ValueError naming a parameter that is not a string or number; these
+    end up in catalog lookups and cache keys, which need plain values.
+    """
+    for name in ('voice_id', 'speed', 'pitch', 'volume'):
+        value = data.get(name, '')
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            raise ValueError(name)
+    if service == 'ttsmaker':
+        return {
+            'voice_id': int(data.get('voice_id', 0)),
+            'speed': float(data.get('speed', 1.0)),
+            'pitch': float(data.get('pitch', 1.0)),
+            'volume': float(data.get('volume', 1.0)),
+        }
+    if service == 'ai_speaker':
+        return {
+            'voice_id': data.get('voice_id', 'zh-CN-XiaoxiaoNeural'),
+            'speed': data.get('speed', 'medium'),
+            'pitch': data.get('pitch', 'medium'),
+            'volume': data.get('volume', 'medium'),
+        }
+    return None
+
+def request_params(service, data):
+    """Parse and check a conversion request's parameters, returning (params, error message)"""
+    try:
+        params = parse_conversion_params(service, data)
+    except (TypeError, ValueError) as e:
+        return None, f'参数无效: {str(e)}'
+    if params is None:
+        return None, '不支持的TTS服务'
+    if 'voice_id' in data:
+        return params, check_voice(service, params)
+    return params, None
+
+def check_voice(service, params):
+    """Return an error message if the requested voice is not in the catalog"""
+    if app.config['VALIDATE_VOICES'] and not voice_catalog.has(service, params['voice_id']):
+        return f'不支持的音色: {params["voice_id"]}'
+    return None
+
+def service_label(service, voice_id):
+    if service == 'ttsmaker':
+        return f'TTSMaker (ID: {voice_id})'
+    return f'AI Speaker ({voice_id})'
+
+def call_converter(service, text, params, priority=False):
+    """Dispatch a single conversion to the TTSConverter backend for the service"""
+    start = time.perf_counter()
+    if service == 'ttsmaker':
+        result = tts_converter.tts_maker(text, priority=priority, **params)
+    else:
+        result = tts_converter.ai_speaker(text, priority=priority, **params)
+    record_upstream(service, params['voice_id'], text, result, time.perf_counter() - start)
+    return result
+
+def call_packed(texts, params, route=False):
+    """Synthesize several AI Speaker texts in one edge-tts session, counted as one upstream call"""
+    start = time.perf_counter()
+    result = tts_converter.ai_speaker_packed(texts, **params)
+    elapsed = time.perf_counter() - start
+    record_upstream('ai_speaker', params['voice_id'], pack_text(texts), result, elapsed)
+    if route:
+        provider_router.record('ai_speaker', result['success'], elapsed)
+    if result['success']:
+        packed_requests.inc(len(texts))
+        for item in result['items']:
+            item['provider'] = 'ai_speaker'
+    return result
+
+def synthesize_chunked(service, text, params):
+    """Synthesize text as sentence segments concurrently and join them into one MP3
+
+    Every segment is cached on its own under its voice, prosody and normalized
+    text, so converting an edited text again only sends the new or changed
+    sentences upstream.
+    """
+    segments = segment_text(text, app.config['CHUNK_MAX_CHARS'])
+    if len(segments) <= 1:
+        return call_converter(service, text, params)
+
+    return join_segments(service, params, synthesize_segments(service, segments, params))
+
+def submit_segments(service, segments, params, executor, fallback=None, route=False):
+    """Start synthesizing the segments missing from the cache on executor, one task per pack
+
+    Missing AI Speaker segments are packed into shared edge-tts sessions.
+    fallback(segment) replaces the cached single-segment synthesis of segments
+    that are not packed or whose pack failed; route counts packs in the
+    provider router's health. Returns a function that waits for the tasks and
+    returns the audio result of each segment.
+    """
+    keys = [SynthesisCache.make_key(service, segment, **params) for segment in segments]
+    results = [cached_result(key, service, params) for key in keys]
+    missing = [index for index, result in enumerate(results) if result is None]
+
+    packs = [[index] for index in missing]
+    if service == 'ai_speaker' and app.config['EDGE_PACK_MAX_CHARS'] > 0:
+        packs = [[missing[i] for i in pack] for pack in plan_packs(
+            [segments[index] for index in missing], app.config['EDGE_PACK_MAX_CHARS']
+        )]
+
+    # Pool threads do not inherit the caller's cancellation, so a hedged request's loser carries it over
+    token = cancellation.current()
+
+    def synthesize_one(index):
+        if cancellation.cancelled():
+            return cancellation.cancelled_result()
+        if fallback:
+            return fallback(segments[index])
+        return store_result(service, keys[index], call_converter(service, segments[index], params))
+
+    def convert(pack):
+        with cancellation.scope(token):
+            return convert_pack(pack)
+
+    def convert_pack(pack):
+        if len(pack) > 1:
+            packed = call_packed([segments[index] for index in pack], params, route)
+            if packed['success']:
+                return [(index, store_result(service, keys[index], item)) for index, item in zip(pack, packed['items'])]
+        # Single segments, and packs whose audio could not be split, are synthesized one by one
+        return [(index, synthesize_one(index)) for index in pack]
+
+    futures = [executor.submit(convert, pack) for pack in packs]
+
+    def collect():
+        for future in futures:
+            for index, result in future.result():
+                results[index] = result
+        return results
+    return collect
+
+def synthesize_segments(service, segments, params, fallback=None, route=False):
+    """Return the audio of each segment from the cache, synthesizing and caching the misses
+
+    The packs of this call run on their own pool of CHUNK_CONCURRENCY threads.
+    """
+    workers = max(1, min(app.config['CHUNK_CONCURRENCY'], len(segments)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return submit_segments(service, segments, params, pool, fallback, route)()
+
+def join_segments(service, params, results):
+    """Join the cached segment files of a segmented conversion into one new MP3"""
+    for index, result in enumerate(results):
+        if not result['success']:
+            return {'success': False, 'error': f'第{index + 1}段转换失败: {result["error"]}'}
+
+    timer = StageTimer()
+    with timer.stage('join'):
+        parts = []
+        for result in results:
+            with open(audio_store.resolve(result['filename']), 'rb') as f:
+                parts.append(f.read())
+        filename, path = tts_converter.output_file(service)
+        with open(path, 'wb') as f:
+            f.write(join_mp3(parts))
+
+    return {
+        'success': True,
+        'filename': filename,
+        'service': service_label(service, params['voice_id']),
+        'chunks': len(results),
+        'chunks_cached': sum(1 for result in results if result.get('cached')),
+        # Segments run in parallel, so each stage reports its slowest segment
+        'timings': dict(merge_parallel(result.get('timings') for result in results), **timer.stages)
+    }
+
+def cached_result(key, service, params):
+    """Return the conversion result for a cache hit on key, or None"""
+    filename = synthesis_cache.get(key)
+    if not filename:
+        return None
+    return {
+        'success': True,
+        'filename': filename,
+        'service': service_label(service, params['voice_id']),
+        'cached': True
+    }
+
+def store_result(service, key, result):
+    """Move the file of a successful conversion into the cache under key"""
+    if result['success']:
+        store_start = time.perf_counter()
+        path = os.path.join(tts_converter.output_dir, result['filename'])
+        bytes_produced.inc(os.path.getsize(path), provider=service)
+        result['filename'] = synthesis_cache.put(key, path)
+        result['cached'] = False
+        result.setdefault('timings', {})['store'] = (time.perf_counter() - store_start) * 1000
+    return result
+
+def synthesize(service, text, params, chunked=False, hedge=True, priority=False):
+    """Convert text with the given service, serving repeated requests from the cache
+
+    priority moves the upstream calls ahead of queued ones at the rate limiter.
+    Hedging only happens when TTS_HEDGE_ENABLED is set; hedge=False opts out.
+    """
+    timer = StageTimer()
+    with timer.stage('cache'):
+        key = SynthesisCache.make_key(service, text, **params)
+        cached = cached_result(key, service, params)
+    if cached:
+        cached['timings'] = timer.stages
+        return cached
+
+    def convert(candidate, text, candidate_params):
+        # Audio from a fallback provider is cached under its own parameters, so the
+        # primary is asked again for this request once it has recovered
+        candidate_key = key
+        if candidate != service:
+            candidate_key = SynthesisCache.make_key(candidate, text, **candidate_params)
+            cached = cached_result(candidate_key, candidate, candidate_params)
+            if cached:
+                return cached
+
+        if chunked:
+            result = synthesize_chunked(candidate, text, candidate_params)
+            # A text whose segments were all cached never reached the provider
+            result['upstream'] = 'chunks' not in result or result['chunks_cached'] < result['chunks']
+        else:
+            result = call_converter(candidate, text, candidate_params, priority)
+        if cancellation.cancelled():
+            # The losing copy of a hedged request; whatever it produced is not kept
+            if result.get('success') and 'filename' in result:
+                discard = os.path.join(tts_converter.output_dir, result['filename'])
+                if os.path.exists(discard):
+                    os.remove(discard)
+            return cancellation.cancelled_result()
+        return store_result(candidate, candidate_key, result)
+
+    hedge = hedge and app.config['HEDGE_ENABLED']
+
+    def route():
+        # The previous call for this key may have finished since the lookup above
+        cached = cached_result(key, service, params)
+        if cached:
+            return cached
+        if hedge:
+            return hedger.call(service, text, params, convert)
+        return provider_router.call(service, text, params, convert)
+
+    # Identical requests arriving while this one is synthesized wait for it and share its file
+    result, shared = single_flight.do(key, route)
+    if shared:
+        result['coalesced'] = True
+    result['timings'] = dict(timer.stages, **result.get('timings', {}))
+    return result
+
+# One bounded pool per provider so a slow provider cannot hold up the others' items
+batch_executors = {}
+batch_executors_lock = threading.Lock()
+
+def batch_executor(service):
+    """The shared pool bounding one provider's batch calls, sized by config or the plugin's BATCH_CONCURRENCY"""
+    with batch_executors_lock:
+        if service not in batch_executors:
+            limit = app.config['BATCH_PROVIDER_LIMITS'].get(service)
+            if limit is None:
+                limit = tts_converter.providers.get(service).BATCH_CONCURRENCY
+            batch_executors[service] = ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f'tts-batch-{service}')
+        return batch_executors[service]
+
+def prepare_batch_item(item):
+    """Validate one batch item, returning (service, text, params) or an error message"""
+    if not isinstance(item, dict):
+        return None, '无效的条目'
+    text = str(item.get('text', '')).strip()
+    service = item.get('service', 'ttsmaker')
+    if not text:
+        return None, '请输入要转换的文本'
+    if not isinstance(service, str) or service not in TTS_SERVICES:
+        return None, '不支持的TTS服务'
+    params, error = request_params(service, item)
+    if error:
+        return None, error
+    return (service, text, params), None
+
+def packable_batch_item(service, text, params):
+    """Whether a batch item may share an edge-tts session with other items of the same voice"""
+    return (
+        service == 'ai_speaker'
+        and can_pack(text, app.config['EDGE_PACK_MAX_CHARS'])
+        # Items the provider router would move to a fallback provider go through synthesize
+        and provider_router.breakers['ai_speaker'].state == CircuitBreaker.CLOSED
+    )
+
+def submit_group(texts, params):
+    """Start synthesizing short AI Speaker batch texts of one voice, packed into shared edge-tts sessions
+
+    Each pack is one task on the AI Speaker batch executor, so packs of all
+    groups share its limit. Returns a function that waits for the results.
+    """
+    return submit_segments(
+        'ai_speaker', texts, params, batch_executor('ai_speaker'),
+        fallback=lambda text: synthesize('ai_speaker', text, params), route=True
+    )
+
+def synthesize_after_first(service, text, params, chunked=False):
+    """Synthesize the text following its first segment and join the two into the whole text's MP3
+
+    The first segment was synthesized (and cached) by the progressive request,
+    so it is normally read back from the cache here.
+    """
+    first, rest = split_first(text, app.config['FIRST_SEGMENT_MAX_CHARS'])
+    rest_result = synthesize(service, rest, params, chunked=chunked)
+    if not rest_result['success']:
+        return rest_result
+    first_result = synthesize(service, first, params, priority=True)
+    if not first_result['success']:
+        return first_result
+
+    timer = StageTimer()
+    with timer.stage('join'):
+        parts = []
+        for result in (first_result, rest_result):
+            with open(audio_store.resolve(result['filename']), 'rb') as f:
+                parts.append(f.read())
+        _, path = tts_converter.output_file(service)
+        with open(path, 'wb') as f:
+            f.write(join_mp3(parts))
+
+    # Only audio in the requested voice may be cached under the request's key
+    if 'fallback_from' in first_result or 'fallback_from' in rest_result:
+        filename = audio_store.adopt(path)
+    else:
+        filename = synthesis_cache.put(SynthesisCache.make_key(service, text, **params), path)
+    return {
+        'success': True,
+        'filename': filename,
+        'service': service_label(service, params['voice_id']),
+        'timings': dict(merge_parallel([first_result.get('timings'), rest_result.get('timings')]), **timer.stages)
+    }
+
+def run_job(payload):
+    """Worker entry point for queued conversions"""
+    if payload.get('progressive'):
+        return synthesize_after_first(payload['service'], payload['text'], payload['params'], chunked=payload['chunked'])
+    return synthesize(payload['service'], payload['text'], payload['params'], chunked=payload['chunked'])
+
+job_queue = JobQueue(app.config['JOB_DB'], run_job, workers=app.config['JOB_WORKERS'])
+
+# Endpoints whose latency is recorded per service and voice
+CONVERSION_ENDPOINTS = {'convert_text', 'convert_text_stream', 'convert_progressive', 'submit_job'}
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.in_flight_endpoint = request.endpoint or 'unknown'
+    in_flight.inc(endpoint=g.in_flight_endpoint)
+
+def request_metric_labels(data):
+    """Service and voice labels of a conversion request, 'unknown' unless the app accepts the value
+
+    Labels come from client JSON, so anything outside the service list and
+    voice catalog would give every distinct value its own time series.
+    """
+    service = data.get('service') if isinstance(data, dict) else None
+    if not isinstance(service, str) or service not in TTS_SERVICES:
+        return 'unknown', 'unknown'
+    if 'voice_id' not in data:
+        return service, 'default'
+    try:
+        voice_id = parse_conversion_params(service, data)['voice_id']
+        if voice_catalog.has(service, voice_id):
+            return service, str(voice_id)
+    except (TypeError, ValueError):
+        pass
+    return service, 'unknown'
+
+@app.after_request
+def record_request_metrics(response):
+    if request.endpoint in CONVERSION_ENDPOINTS:
+        service, voice = request_metric_labels(request.get_json(silent=True))
+        request_latency.observe(
+            time.perf_counter() - g.request_start,
+            endpoint=request.endpoint,
+            service=service,
+            voice=voice
+        )
+    elif request.endpoint == 'download_file' and response.status_code in (200, 206):
+        # With x-accel the body is sent by nginx, so count the file it was told to send
+        served = g.pop('accel_bytes', response.content_length)
+        bytes_served.inc(served or 0, endpoint='download_file')
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    endpoint = g.pop('in_flight_endpoint', None)
+    if endpoint is not None:
+        in_flight.dec(endpoint=endpoint)
+
+@app.route('/healthz/ready')
+def readiness():
+    """200 once start-up warm-up has finished, 503 before; failed steps are reported but do not block"""
+    status = warmup.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=Registry.CONTENT_TYPE)
 
 @app.route('/')
 def index():
-    return render_template('index.html', services=TTS_SERVICES)
+    return render_template('index.html')
 
 @app.route('/api/convert', methods=['POST'])
 def convert_text():
@@ -266,32 +839,335 @@ def convert_text():
         return jsonify({'success': False, 'error': '请输入要转换的文本'}), 400
     
     try:
-        if service == 'ttsmaker':
-            voice_id = int(data.get('voice_id', 0))
-            speed = float(data.get('speed', 1.0))
-            pitch = float(data.get('pitch', 1.0))
-            volume = float(data.get('volume', 1.0))
-            result = tts_converter.tts_maker(text, voice_id, speed, pitch, volume)
-        elif service == 'ai_speaker':
-            voice_id = data.get('voice_id', 'zh-CN-XiaoxiaoNeural')
-            speed = data.get('speed', 'medium')
-            pitch = data.get('pitch', 'medium')
-            volume = data.get('volume', 'medium')
-            # Use ai_speaker method for AI Speaker service
-            result = tts_converter.ai_speaker(text, voice_id, speed, pitch, volume)
-        else:
-            return jsonify({'success': False, 'error': '不支持的TTS服务'}), 400
+        timer = StageTimer()
+        with timer.stage('params'):
+            params, error = request_params(service, data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+
+        # Long texts are split at sentence boundaries and synthesized in parallel
+        chunked = bool(data.get('chunked', len(text) > app.config['CHUNK_MAX_CHARS']))
+        result = synthesize(service, text, params, chunked=chunked, hedge=data.get('hedge') is not False)
+        timer.merge(result.pop('timings', None))
             
         if result['success'] and 'filename' in result:
             result['download_url'] = f'/download/{result["filename"]}'
-        return jsonify(result)
+        result['timings'] = timer.as_dict()
+        log_sampled(
+            result['timings'], app.config['TIMING_SAMPLE_RATE'],
+            endpoint='convert_text', service=service, voice=params['voice_id'], chars=len(text),
+            success=result['success'], provider=result.get('provider'), cached=result.get('cached')
+        )
+        response = jsonify(result)
+        response.headers['Server-Timing'] = timer.header(result['timings'])
+        return response
         
     except Exception as e:
         return jsonify({'success': False, 'error': f'转换失败: {str(e)}'}), 500
 
+@app.route('/api/convert/progressive', methods=['POST'])
+def convert_progressive():
+    """Synthesize the first sentence right away and the whole text in the background"""
+    data = request.get_json()
+    text = data.get('text', '').strip()
+    service = data.get('service', 'ttsmaker')
+
+    if not text:
+        return jsonify({'success': False, 'error': '请输入要转换的文本'}), 400
+
+    try:
+        timer = StageTimer()
+        with timer.stage('params'):
+            params, error = request_params(service, data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+
+        chunked = bool(data.get('chunked', len(text) > app.config['CHUNK_MAX_CHARS']))
+        with timer.stage('cache'):
+            cached = cached_result(SynthesisCache.make_key(service, text, **params), service, params)
+        first, rest = split_first(text, app.config['FIRST_SEGMENT_MAX_CHARS'])
+        job_id = None
+        if cached:
+            result = cached
+        elif not rest:
+            result = synthesize(service, text, params, priority=True)
+        else:
+            # The rest starts upstream at once; the first segment jumps the rate-limit queue ahead of it
+            job_id = job_queue.submit({
+                'service': service,
+                'text': text,
+                'params': params,
+                'chunked': chunked,
+                'progressive': True,
+            })
+            result = synthesize(service, first, params, priority=True)
+        timer.merge(result.pop('timings', None))
+
+        if result['success']:
+            result['download_url'] = f'/download/{result["filename"]}'
+            result['first_text'] = first if job_id else text
+            result['rest'] = {'job_id': job_id, 'status_url': f'/api/jobs/{job_id}'} if job_id else None
+        result['timings'] = timer.as_dict()
+        response = jsonify(result)
+        response.headers['Server-Timing'] = timer.header(result['timings'])
+        return response
+
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'参数无效: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'转换失败: {str(e)}'}), 500
+
+@app.route('/api/convert/batch', methods=['POST'])
+def convert_batch():
+    """Convert many items concurrently, reporting success or failure per item"""
+    data = request.get_json()
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'error': '请提供要转换的条目列表'}), 400
+    if len(items) > app.config['BATCH_MAX_ITEMS']:
+        return jsonify({'success': False, 'error': f'条目数量不能超过{app.config["BATCH_MAX_ITEMS"]}'}), 400
+
+    results = [None] * len(items)
+    futures = {}
+    groups = {}
+    for index, item in enumerate(items):
+        prepared, error = prepare_batch_item(item)
+        if error:
+            results[index] = {'success': False, 'error': error}
+        elif packable_batch_item(*prepared):
+            groups.setdefault(tuple(sorted(prepared[2].items())), []).append((index, prepared[1]))
+        else:
+            service = prepared[0]
+            futures[index] = batch_executor(service).submit(synthesize, *prepared)
+
+    group_collectors = []
+    for group_params, members in groups.items():
+        texts = [text for _, text in members]
+        if len(members) == 1:
+            futures[members[0][0]] = batch_executor('ai_speaker').submit(
+                synthesize, 'ai_speaker', texts[0], dict(group_params)
+            )
+        else:
+            group_collectors.append((submit_group(texts, dict(group_params)), members))
+
+    for collect, members in group_collectors:
+        try:
+            group_results = collect()
+        except Exception as e:
+            group_results = [{'success': False, 'error': f'转换失败: {str(e)}'} for _ in members]
+        for (index, _), result in zip(members, group_results):
+            results[index] = result
+
+    for index, future in futures.items():
+        try:
+            results[index] = future.result()
+        except Exception as e:
+            results[index] = {'success': False, 'error': f'转换失败: {str(e)}'}
+
+    for result in results:
+        if result['success'] and 'filename' in result:
+            result['download_url'] = f'/download/{result["filename"]}'
+
+    for index, result in enumerate(results):
+        result['index'] = index
+    succeeded = sum(1 for result in results if result['success'])
+    return jsonify({
+        'success': succeeded == len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results
+    })
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a conversion and return immediately with a job id to poll"""
+    data = request.get_json()
+    text = data.get('text', '').strip()
+    service = data.get('service', 'ttsmaker')
+
+    if not text:
+        return jsonify({'success': False, 'error': '请输入要转换的文本'}), 400
+
+    params, error = request_params(service, data)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+
+    job_id = job_queue.submit({
+        'service': service,
+        'text': text,
+        'params': params,
+        'chunked': bool(data.get('chunked', len(text) > app.config['CHUNK_MAX_CHARS'])),
+    })
+    return jsonify({'success': True, 'job_id': job_id, 'status_url': f'/api/jobs/{job_id}'}), 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': '任务不存在'}), 404
+    if job.get('filename'):
+        job['download_url'] = f'/download/{job["filename"]}'
+    return jsonify(job)
+
+@app.route('/api/convert/stream', methods=['POST'])
+def convert_text_stream():
+    """Stream AI Speaker audio to the client while it is being synthesized"""
+    data = request.get_json()
+    text = data.get('text', '').strip()
+    service = data.get('service', 'ai_speaker')
+
+    if not text:
+        return jsonify({'success': False, 'error': '请输入要转换的文本'}), 400
+    if service != 'ai_speaker':
+        return jsonify({'success': False, 'error': '流式转换仅支持AI Speaker服务'}), 400
+
+    timer = StageTimer()
+    with timer.stage('params'):
+        params, error = request_params(service, data)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    with timer.stage('cache'):
+        key = SynthesisCache.make_key(service, text, **params)
+        cached = synthesis_cache.get(key)
+    if cached:
+        response = send_file(audio_store.resolve(cached), mimetype='audio/mpeg')
+        response.headers['X-Download-Url'] = f'/download/{cached}'
+        response.headers['Server-Timing'] = timer.header()
+        return response
+
+    start = time.perf_counter()
+
+    def stream_complete(filename):
+        path = os.path.join(tts_converter.output_dir, filename)
+        record_upstream(service, params['voice_id'], text, {'success': True}, time.perf_counter() - start)
+        bytes_produced.inc(os.path.getsize(path), provider=service)
+        synthesis_cache.put(key, path)
+
+    try:
+        with timer.stage('rate_limit'):
+            _, audio_chunks = tts_converter.ai_speaker_stream(text, on_complete=stream_complete, **params)
+    except RateLimitTimeout as e:
+        upstream_errors.inc(provider=service, type='rate_limited')
+        return jsonify({'success': False, 'error': f'服务繁忙，请稍后再试: {str(e)}'}), 503
+    # Wait for the first chunk so upstream failures still get a JSON error
+    try:
+        with timer.stage('upstream_first_byte'):
+            first_chunk = next(audio_chunks)
+    except StopIteration:
+        upstream_errors.inc(provider=service, type='empty_audio')
+        return jsonify({'success': False, 'error': 'Failed to generate audio file'}), 502
+    except Exception as e:
+        upstream_errors.inc(provider=service, type='timeout' if isinstance(e, TIMEOUT_ERRORS) else 'exception')
+        return jsonify({'success': False, 'error': f'转换失败: {str(e)}'}), 502
+
+    def generate():
+        for chunk in itertools.chain([first_chunk], audio_chunks):
+            bytes_served.inc(len(chunk), endpoint='convert_text_stream')
+            yield chunk
+
+    response = Response(generate(), mimetype='audio/mpeg')
+    # The teed file is stored in the cache under this name once synthesis completes
+    response.headers['X-Download-Url'] = f'/download/{synthesis_cache.filename_for(key)}'
+    response.headers['Cache-Control'] = 'no-store'
+    # Only the stages before the first byte are known when the headers are sent
+    response.headers['Server-Timing'] = timer.header()
+    return response
+
+@app.route('/api/voices')
+def list_voices():
+    """Voice catalog for the UI, revalidated by ETag instead of re-sent on every load"""
+    service = request.args.get('service')
+    language = request.args.get('language')
+    gender = request.args.get('gender')
+    services = [service] if service else list(TTS_SERVICES)
+    if any(name not in TTS_SERVICES for name in services):
+        return jsonify({'success': False, 'error': '不支持的TTS服务'}), 400
+
+    etag = hashlib.sha256(f'{voice_catalog.version}?{request.query_string.decode()}'.encode('utf-8')).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify({
+            'version': voice_catalog.version,
+            'services': {
+                name: {
+                    'name': TTS_SERVICES[name]['name'],
+                    'languages': voice_catalog.languages(name),
+                    'voices': voice_catalog.voices(name, language=language, gender=gender),
+                    'speeds': TTS_SERVICES[name]['speeds'],
+                    'pitches': TTS_SERVICES[name]['pitches'],
+                    'volumes': TTS_SERVICES[name]['volumes'],
+                }
+                for name in services
+            }
+        })
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/api/voices/stats')
+def voice_catalog_stats():
+    return jsonify(voice_catalog.stats())
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify(dict(synthesis_cache.stats(), coalesced=coalesced_stats()))
+
+@app.route('/api/providers')
+def provider_status():
+    return jsonify(provider_router.status())
+
+@app.route('/api/providers/plugins')
+def provider_plugins():
+    return jsonify(tts_converter.providers.describe())
+
+@app.route('/api/hedging')
+def hedging_stats():
+    return jsonify(hedger.stats())
+
+@app.route('/api/rate-limits')
+def rate_limit_stats():
+    return jsonify(rate_limiter.stats())
+
+@app.route('/api/storage/stats')
+def storage_stats():
+    return jsonify(audio_store.stats())
+
 @app.route('/download/<filename>')
 def download_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
+    """Serve a stored file with strong ETags, range requests and optional proxy offload"""
+    path = audio_store.resolve(filename)
+    if path is None:
+        abort(404)
+    etag = audio_store.etag(path)
+
+    if app.config['AUDIO_SENDFILE'] == 'x-accel':
+        # nginx serves the bytes (including ranges) from an internal location mapped to UPLOAD_FOLDER
+        relative = os.path.relpath(path, app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+        response = Response(mimetype='audio/mpeg')
+        response.headers['X-Accel-Redirect'] = app.config['AUDIO_ACCEL_PREFIX'] + relative
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+        response.set_etag(etag)
+        response.last_modified = os.path.getmtime(path)
+        response.make_conditional(request)
+        g.accel_bytes = os.path.getsize(path)
+    else:
+        response = send_file(
+            path,
+            mimetype='audio/mpeg',
+            as_attachment=True,
+            download_name=filename,
+            etag=etag,
+            conditional=True,
+            max_age=365 * 24 * 3600
+        )
+
+    # Stored names are never reused for different audio, so clients may cache them forever
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+    return response
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001)  # Changed to 5001 to avoid port conflict
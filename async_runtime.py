@@ -0,0 +1,90 @@
+import asyncio
+import concurrent.futures
+import threading
+
+import cancellation
+
+# What a timed-out run() or wait_for() raises; before Python 3.11 these are
+# distinct from the built-in TimeoutError
+TIMEOUT_ERRORS = (TimeoutError, concurrent.futures.TimeoutError, asyncio.TimeoutError)
+
+
+class AsyncLoopThread:
+    """One long-lived asyncio event loop on a background thread, shared by sync callers
+
+    Flask handlers submit coroutines from their own threads and wait on the
+    returned futures; many coroutines run multiplexed on the single loop, with
+    at most max_concurrency of them active at once.
+    """
+
+    def __init__(self, max_concurrency=200, name='tts-asyncio'):
+        self.max_concurrency = max_concurrency
+        self.name = name
+        self.in_flight = 0
+        self._loop = None
+        self._semaphore = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        self.start()
+        return self._loop
+
+    def start(self):
+        """Start the loop thread if it is not running yet"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+
+            def run():
+                self._loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self._loop)
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                ready.set()
+                self._loop.run_forever()
+
+            thread = threading.Thread(target=run, name=self.name, daemon=True)
+            thread.start()
+            ready.wait()
+            self._thread = thread
+
+    async def _limited(self, coro):
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await coro
+            finally:
+                self.in_flight -= 1
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop and return a concurrent.futures.Future"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._limited(coro), self._loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block until it finishes or times out
+
+        If the calling thread's work is cancelled (see cancellation.py), the
+        coroutine is cancelled on the loop and CancelledError is raised.
+        """
+        future = self.submit(coro)
+        cancellation.on_cancel(future.cancel)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
+            self._loop = None
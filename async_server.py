@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Native asyncio serving mode
+
+Serves /api/convert and /download with aiohttp: edge-tts sessions are awaited
+directly on the server's event loop and TTSMaker is called through a pooled
+aiohttp client session, so a conversion waiting on an upstream holds a
+coroutine instead of a thread. Every other route is handed to the Flask app
+through a WSGI bridge running on a bounded thread pool.
+
+    python async_server.py --port 5001
+
+Hedged requests are not supported in this mode; the 'hedge' flag is ignored.
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_to_bytes
+
+import aiohttp
+from aiohttp import web
+
+import app as tts_app
+from single_flight import AsyncSingleFlight
+from synthesis_cache import SynthesisCache
+from text_segmenter import segment_text
+from stage_timer import StageTimer, log_sampled
+
+config = tts_app.app.config
+
+# Response headers the WSGI app may set that aiohttp manages itself
+HOP_BY_HOP = {'connection', 'keep-alive', 'transfer-encoding', 'upgrade'}
+
+
+class AsyncSynthesizer:
+    """Cache-aware synthesis on the event loop, mirroring app.synthesize"""
+
+    def __init__(self, session):
+        self.session = session
+        self.edge_slots = asyncio.Semaphore(config['EDGE_TTS_CONCURRENCY'])
+        self.single_flight = AsyncSingleFlight()
+        tts_app.single_flights.append(self.single_flight)
+
+    async def call(self, service, text, params):
+        start = time.perf_counter()
+        if service == 'ttsmaker':
+            result = await tts_app.tts_converter.tts_maker_async(self.session, text, **params)
+        else:
+            async with self.edge_slots:
+                result = await tts_app.tts_converter.ai_speaker_async(text, **params)
+        tts_app.record_upstream(service, params['voice_id'], text, result, time.perf_counter() - start)
+        return result
+
+    async def synthesize_chunked(self, service, text, params):
+        segments = segment_text(text, config['CHUNK_MAX_CHARS'])
+        if len(segments) <= 1:
+            return await self.call(service, text, params)
+
+        slots = asyncio.Semaphore(max(1, config['CHUNK_CONCURRENCY']))
+
+        async def convert_segment(segment):
+            key = SynthesisCache.make_key(service, segment, **params)
+            cached = tts_app.cached_result(key, service, params)
+            if cached:
+                return cached
+            async with slots:
+                return tts_app.store_result(service, key, await self.call(service, segment, params))
+
+        results = await asyncio.gather(*(convert_segment(segment) for segment in segments))
+        return await asyncio.get_running_loop().run_in_executor(
+            None, tts_app.join_segments, service, params, list(results)
+        )
+
+    async def synthesize(self, service, text, params, chunked=False):
+        timer = StageTimer()
+        with timer.stage('cache'):
+            key = SynthesisCache.make_key(service, text, **params)
+            cached = tts_app.cached_result(key, service, params)
+        if cached:
+            cached['timings'] = timer.stages
+            return cached
+
+        async def convert(candidate, text, candidate_params):
+            candidate_key = key
+            if candidate != service:
+                candidate_key = SynthesisCache.make_key(candidate, text, **candidate_params)
+                cached = tts_app.cached_result(candidate_key, candidate, candidate_params)
+                if cached:
+                    return cached
+
+            if chunked:
+                result = await self.synthesize_chunked(candidate, text, candidate_params)
+                result['upstream'] = 'chunks' not in result or result['chunks_cached'] < result['chunks']
+            else:
+                result = await self.call(candidate, text, candidate_params)
+            return tts_app.store_result(candidate, candidate_key, result)
+
+        async def route():
+            cached = tts_app.cached_result(key, service, params)
+            if cached:
+                return cached
+            return await tts_app.provider_router.call_async(service, text, params, convert)
+
+        # Identical requests on this loop wait for the one in flight and share its file
+        result, shared = await self.single_flight.do(key, route)
+        if shared:
+            result['coalesced'] = True
+        result['timings'] = dict(timer.stages, **result.get('timings', {}))
+        return result
+
+
+SYNTHESIZER = web.AppKey('synthesizer', AsyncSynthesizer)
+WSGI_POOL = web.AppKey('wsgi_pool', ThreadPoolExecutor)
+
+
+async def convert_text(request):
+    started = time.perf_counter()
+    tts_app.in_flight.inc(endpoint='convert_text')
+    data = {}
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            data = {}
+            return web.json_response({'success': False, 'error': '无效的请求数据'}, status=400)
+        return await handle_convert(request, data)
+    finally:
+        service, voice = tts_app.request_metric_labels(data)
+        tts_app.request_latency.observe(
+            time.perf_counter() - started,
+            endpoint='convert_text',
+            service=service,
+            voice=voice
+        )
+        tts_app.in_flight.dec(endpoint='convert_text')
+
+
+async def handle_convert(request, data):
+    """Body of /api/convert; see app.convert_text for the synchronous version"""
+    text = data.get('text', '').strip()
+    service = data.get('service', 'ttsmaker')
+
+    if not text:
+        return web.json_response({'success': False, 'error': '请输入要转换的文本'}, status=400)
+
+    try:
+        timer = StageTimer()
+        with timer.stage('params'):
+            params, error = tts_app.request_params(service, data)
+        if error:
+            return web.json_response({'success': False, 'error': error}, status=400)
+
+        chunked = bool(data.get('chunked', len(text) > config['CHUNK_MAX_CHARS']))
+        result = await request.app[SYNTHESIZER].synthesize(service, text, params, chunked=chunked)
+        timer.merge(result.pop('timings', None))
+
+        if result['success'] and 'filename' in result:
+            result['download_url'] = f'/download/{result["filename"]}'
+        result['timings'] = timer.as_dict()
+        log_sampled(
+            result['timings'], config['TIMING_SAMPLE_RATE'],
+            endpoint='convert_text', service=service, voice=params['voice_id'], chars=len(text),
+            success=result['success'], provider=result.get('provider'), cached=result.get('cached')
+        )
+        return web.json_response(result, headers={'Server-Timing': timer.header(result['timings'])})
+
+    except Exception as e:
+        return web.json_response({'success': False, 'error': f'转换失败: {str(e)}'}, status=500)
+
+
+class AudioFileResponse(web.FileResponse):
+    """FileResponse that counts the bytes it sends in the download metric"""
+
+    async def prepare(self, request):
+        writer = await super().prepare(request)
+        if self.status in (200, 206):
+            tts_app.bytes_served.inc(self.content_length or 0, endpoint='download_file')
+        return writer
+
+
+async def download_file(request):
+    """Serve a stored file; see app.download_file for the synchronous version
+
+    Files are sent with aiohttp's FileResponse (sendfile, ranges, conditional
+    requests), whose ETag is derived from the file's mtime and size rather than
+    its content hash. Stored files never change, so either validator is exact.
+    """
+    filename = request.match_info['filename']
+    path = tts_app.audio_store.resolve(filename)
+    if path is None:
+        raise web.HTTPNotFound()
+    tts_app.in_flight.inc(endpoint='download_file')
+    try:
+        headers = {
+            'Content-Disposition': f'attachment; filename={filename}',
+            # Stored names are never reused for different audio, so clients may cache them forever
+            'Cache-Control': f'public, max-age={365 * 24 * 3600}, immutable',
+        }
+        if config['AUDIO_SENDFILE'] == 'x-accel':
+            etag = await asyncio.get_running_loop().run_in_executor(None, tts_app.audio_store.etag, path)
+            relative = os.path.relpath(path, config['UPLOAD_FOLDER']).replace(os.sep, '/')
+            headers['X-Accel-Redirect'] = config['AUDIO_ACCEL_PREFIX'] + relative
+            if request.if_none_match and any(tag.value in (etag, '*') for tag in request.if_none_match):
+                response = web.Response(status=304, headers=headers)
+            else:
+                response = web.Response(headers=headers, content_type='audio/mpeg')
+            response.etag = etag
+            response.last_modified = os.path.getmtime(path)
+            if response.status == 200:
+                tts_app.bytes_served.inc(os.path.getsize(path), endpoint='download_file')
+            return response
+
+        return AudioFileResponse(path, headers=headers)
+    finally:
+        tts_app.in_flight.dec(endpoint='download_file')
+
+
+def wsgi_environ(request, body):
+    """Build the WSGI environ of an aiohttp request"""
+    raw_path = request.raw_path.split('?', 1)[0]
+    host, _, port = request.host.partition(':')
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': unquote_to_bytes(raw_path).decode('latin-1'),
+        'QUERY_STRING': request.query_string,
+        'SERVER_NAME': host,
+        'SERVER_PORT': port or ('443' if request.scheme == 'https' else '80'),
+        'SERVER_PROTOCOL': f'HTTP/{request.version.major}.{request.version.minor}',
+        'REMOTE_ADDR': request.remote or '',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in request.headers.items():
+        key = name.upper().replace('-', '_')
+        if key == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif key != 'CONTENT_LENGTH':
+            key = f'HTTP_{key}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def wsgi_bridge(request):
+    """Run any other route on the Flask app, streaming its body as it is produced"""
+    loop = asyncio.get_running_loop()
+    pool = request.app[WSGI_POOL]
+    environ = wsgi_environ(request, await request.read())
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = headers
+        return lambda data: None
+
+    body = await loop.run_in_executor(pool, tts_app.app, environ, start_response)
+    chunks = iter(body)
+    try:
+        # WSGI lets an app defer start_response until its first chunk is produced
+        first = await loop.run_in_executor(pool, next, chunks, None)
+        response = web.StreamResponse(status=started['status'])
+        for name, value in started['headers']:
+            if name.lower() not in HOP_BY_HOP:
+                response.headers.add(name, value)
+        await response.prepare(request)
+        chunk = first
+        while chunk is not None:
+            if chunk:
+                await response.write(chunk)
+            chunk = await loop.run_in_executor(pool, next, chunks, None)
+        await response.write_eof()
+        return response
+    finally:
+        close = getattr(body, 'close', None)
+        if close is not None:
+            await loop.run_in_executor(pool, close)
+
+
+async def client_session(server):
+    """Open the pooled upstream HTTP session and WSGI threads for the server's lifetime"""
+    connector = aiohttp.TCPConnector(limit_per_host=config['HTTP_POOL_SIZE'])
+    timeout = aiohttp.ClientTimeout(
+        sock_connect=config['HTTP_CONNECT_TIMEOUT'], sock_read=config['HTTP_READ_TIMEOUT']
+    )
+    server[WSGI_POOL] = ThreadPoolExecutor(max_workers=config['ASYNC_WSGI_THREADS'], thread_name_prefix='tts-wsgi')
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        server[SYNTHESIZER] = AsyncSynthesizer(session)
+        yield
+    server[WSGI_POOL].shutdown(wait=False)
+
+
+def create_app():
+    server = web.Application(client_max_size=64 * 1024 * 1024)
+    server.cleanup_ctx.append(client_session)
+    server.router.add_post('/api/convert', convert_text)
+    server.router.add_get('/download/{filename}', download_file)
+    server.router.add_route('*', '/{tail:.*}', wsgi_bridge)
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the TTS app on asyncio')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args(argv)
+    web.run_app(create_app(), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
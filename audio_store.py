@@ -0,0 +1,232 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+
+NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*\.mp3$')
+
+
+class AudioStore:
+    """Sharded on-disk store for generated audio with a byte quota and idle TTL
+
+    Files live under root/<aa>/<bb>/<name>, where aa/bb come from a hash of the
+    name, so no directory grows beyond a few thousand entries. Converters write
+    into staging_dir and finished files are moved into their shard atomically.
+    A background sweeper removes files idle for longer than ttl and then the
+    least recently used ones until the store is back under max_bytes.
+    """
+
+    def __init__(self, root, max_bytes=2 * 1024 * 1024 * 1024, ttl=30 * 24 * 3600, sweep_interval=300):
+        self.root = root
+        self.staging_dir = os.path.join(root, '.staging')
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.evictions = 0
+        self.last_sweep = None
+        self._files = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sweeper = None
+        self._etags = {}
+        os.makedirs(self.staging_dir, exist_ok=True)
+
+    @staticmethod
+    def is_valid_name(name):
+        return bool(NAME_PATTERN.match(name or ''))
+
+    @staticmethod
+    def new_name():
+        return f'{uuid.uuid4().hex}.mp3'
+
+    def shard_path(self, name):
+        digest = hashlib.sha1(name.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest[:2], digest[2:4], name)
+
+    def staging_path(self, prefix='audio'):
+        """Return a unique path in the staging directory for a file being written"""
+        return os.path.join(self.staging_dir, f'{prefix}_{uuid.uuid4().hex}.mp3')
+
+    def _touch(self, path, st):
+        # Access times drive LRU eviction; only rewrite them once a minute
+        now = time.time()
+        if now - st.st_atime > 60:
+            try:
+                os.utime(path, (now, st.st_mtime))
+            except OSError:
+                pass
+
+    def stat(self, name, touch=False):
+        """Return os.stat of a stored file, or None if it is not in the store"""
+        if not self.is_valid_name(name):
+            return None
+        path = self.shard_path(name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if touch:
+            self._touch(path, st)
+        return st
+
+    def resolve(self, name):
+        """Return the path of a stored file and mark it as recently used, or None"""
+        if not self.is_valid_name(name):
+            return None
+        if self.stat(name, touch=True) is not None:
+            return self.shard_path(name)
+        # Files written before the store existed sit flat in the root directory
+        legacy = os.path.join(self.root, name)
+        if os.path.isfile(legacy):
+            return legacy
+        return None
+
+    def etag(self, path):
+        """Strong ETag for a file: the SHA-256 of its content, memoized per file version"""
+        st = os.stat(path)
+        version = (path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            etag = self._etags.get(version)
+        if etag is not None:
+            return etag
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        etag = digest.hexdigest()
+        with self._lock:
+            if len(self._etags) >= 4096:
+                self._etags.pop(next(iter(self._etags)))
+            self._etags[version] = etag
+        return etag
+
+    def adopt(self, source, name=None):
+        """Move a finished file into its shard and return its store name"""
+        name = name or self.new_name()
+        path = self.shard_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A file already stored under the name is replaced, and no longer counts
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = None
+        os.replace(source, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            if replaced is None:
+                self._files += 1
+            self._bytes += size - (replaced or 0)
+            over_quota = self._bytes > self.max_bytes
+        if over_quota:
+            self._wake.set()
+        return name
+
+    def put_bytes(self, data, name=None):
+        staging = self.staging_path()
+        with open(staging, 'wb') as f:
+            f.write(data)
+        return self.adopt(staging, name)
+
+    def remove(self, name):
+        try:
+            size = os.path.getsize(self.shard_path(name))
+            os.remove(self.shard_path(name))
+        except OSError:
+            return False
+        with self._lock:
+            self._files -= 1
+            self._bytes -= size
+        return True
+
+    def _scan(self):
+        for first in os.scandir(self.root):
+            if not (first.is_dir() and len(first.name) == 2):
+                continue
+            for second in os.scandir(first.path):
+                if not second.is_dir():
+                    continue
+                for entry in os.scandir(second.path):
+                    if entry.is_file():
+                        yield entry
+
+    def sweep(self):
+        """Remove idle files past the TTL, then least recently used files over the quota"""
+        now = time.time()
+        files = []
+        total = 0
+        removed = 0
+        for entry in self._scan():
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if now - max(st.st_atime, st.st_mtime) > self.ttl:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+                continue
+            files.append((max(st.st_atime, st.st_mtime), st.st_size, entry.path))
+            total += st.st_size
+
+        kept = len(files)
+        if total > self.max_bytes:
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                kept -= 1
+                try:
+                    os.remove(path)
+                    removed += 1
+                    total -= size
+                except OSError:
+                    pass
+
+        # Staging files older than an hour were abandoned by a crashed conversion
+        for entry in os.scandir(self.staging_dir):
+            try:
+                if now - entry.stat().st_mtime > 3600:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+        with self._lock:
+            self._files = kept
+            self._bytes = total
+            self.evictions += removed
+            self.last_sweep = now
+        return removed
+
+    def start_sweeper(self):
+        """Run sweep() now and then every sweep_interval seconds on a daemon thread"""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except Exception:
+                    pass
+                self._wake.wait(self.sweep_interval)
+                self._wake.clear()
+
+        self._sweeper = threading.Thread(target=run, name='audio-store-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files': self._files,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'evictions': self.evictions,
+                'last_sweep': self.last_sweep,
+            }
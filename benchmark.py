@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end load benchmark
+
+Starts local stand-ins for ttsmaker.cn and edge-tts (fake_upstreams.py), points
+the app at them, and drives /api/convert with increasing concurrency, reporting
+throughput, latency percentiles and memory for each level.
+
+    python benchmark.py --concurrency 1,8,32,128 --duration 10 --service mixed
+
+To benchmark a separately launched server (e.g. another serving mode), run the
+stand-ins on fixed ports and start the server with the printed environment:
+
+    python benchmark.py --upstreams-only --ttsmaker-port 9001 --edge-port 9002
+    python benchmark.py --target http://127.0.0.1:5001 --pid <server pid>
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from fake_upstreams import FakeEdgeTTS, FakeTTSMaker, Profile
+
+SAMPLE_TEXT = '今天天气很好，我们一起去公园散步吧。The quick brown fox jumps over the lazy dog. '
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+
+def rss_megabytes(pid=None):
+    """Resident set size of a process in MiB (Linux), or None if unavailable"""
+    try:
+        with open(f'/proc/{pid or "self"}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def start_upstreams(args):
+    ttsmaker = FakeTTSMaker(
+        Profile(args.ttsmaker_latency, args.ttsmaker_jitter, args.ttsmaker_errors), port=args.ttsmaker_port
+    ).start()
+    edge = FakeEdgeTTS(Profile(args.edge_latency, args.edge_jitter, args.edge_errors), port=args.edge_port).start()
+    return ttsmaker, edge
+
+
+def start_app(ttsmaker, edge, workdir):
+    """Import the app configured against the stand-ins and serve it on a local port"""
+    from werkzeug.serving import make_server
+
+    os.environ.update({
+        'TTS_TTSMAKER_URL': ttsmaker.url,
+        'TTS_EDGE_WSS_URL': edge.url,
+        'TTS_AUDIO_DIR': os.path.join(workdir, 'audio'),
+        'TTS_JOB_DB': os.path.join(workdir, 'jobs.db'),
+        'TTS_VOICE_SNAPSHOT': os.path.join(workdir, 'voices.json'),
+        'TTS_VOICE_REFRESH_INTERVAL': '0',
+        'TTS_TIMING_SAMPLE_RATE': '0',
+        # Measure our own overhead, not the production upstream quotas
+        'TTS_RATE_TTSMAKER_RPS': '100000',
+        'TTS_RATE_TTSMAKER_CPS': '100000000',
+        'TTS_RATE_EDGE_RPS': '100000',
+        'TTS_RATE_EDGE_CPS': '100000000',
+    })
+    import app as tts_app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, tts_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='benchmark-app', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def make_payload(args, index):
+    service = args.service
+    if service == 'mixed':
+        service = 'ttsmaker' if index % 2 else 'ai_speaker'
+    repeat = random.random() < args.repeat_ratio
+    text = (SAMPLE_TEXT * (args.text_length // len(SAMPLE_TEXT) + 1))[:args.text_length]
+    if not repeat:
+        # A unique suffix keeps the synthesis cache out of the measurement
+        text = f'{text} {uuid.uuid4().hex[:8]}'
+    payload = {'text': text, 'service': service}
+    if service == 'ttsmaker':
+        payload.update({'voice_id': 1504, 'speed': 1.0, 'pitch': 1.0, 'volume': 1.0})
+    else:
+        payload.update({'voice_id': 'zh-CN-XiaoxiaoNeural', 'speed': 'medium', 'pitch': 'medium', 'volume': 'medium'})
+    return payload
+
+
+def run_level(url, concurrency, args):
+    """Run closed-loop clients for args.duration seconds and summarize their requests"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    local = threading.local()
+
+    def client(worker):
+        nonlocal errors
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        index = worker
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.post(url + args.endpoint, json=make_payload(args, index), timeout=args.timeout)
+                ok = response.status_code == 200 and response.json().get('success')
+            except (requests.RequestException, ValueError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors += not ok
+            index += concurrency
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    wall = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / wall if wall else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'rss_mb': rss_megabytes(args.pid),
+    }
+
+
+def print_row(row):
+    rss = f'{row["rss_mb"]:.1f}' if row['rss_mb'] is not None else '-'
+    print(f'{row["concurrency"]:>11} {row["requests"]:>9} {row["errors"]:>7} {row["rps"]:>9.1f} '
+          f'{row["p50"] * 1000:>9.1f} {row["p95"] * 1000:>9.1f} {row["p99"] * 1000:>9.1f} {rss:>8}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', help='benchmark a running server instead of starting the app in-process')
+    parser.add_argument('--upstreams-only', action='store_true', help='only run the stand-ins until interrupted')
+    parser.add_argument('--ttsmaker-port', type=int, default=0)
+    parser.add_argument('--edge-port', type=int, default=0)
+    parser.add_argument('--pid', type=int, help='process whose memory to report (defaults to this one)')
+    parser.add_argument('--endpoint', default='/api/convert')
+    parser.add_argument('--service', choices=['ttsmaker', 'ai_speaker', 'mixed'], default='mixed')
+    parser.add_argument('--concurrency', default='1,4,16,64', help='comma-separated client counts')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per concurrency level')
+    parser.add_argument('--text-length', type=int, default=60)
+    parser.add_argument('--repeat-ratio', type=float, default=0.0, help='share of requests repeating a cached text')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--ttsmaker-latency', type=float, default=0.2)
+    parser.add_argument('--ttsmaker-jitter', type=float, default=0.05)
+    parser.add_argument('--ttsmaker-errors', type=float, default=0.0)
+    parser.add_argument('--edge-latency', type=float, default=0.15)
+    parser.add_argument('--edge-jitter', type=float, default=0.05)
+    parser.add_argument('--edge-errors', type=float, default=0.0)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    if args.upstreams_only:
+        ttsmaker, edge = start_upstreams(args)
+        print(f'TTS_TTSMAKER_URL={ttsmaker.url} TTS_EDGE_WSS_URL={edge.url!r}')
+        print('set TTS_RATE_*_RPS/CPS high to measure the app rather than its upstream quotas; Ctrl+C to stop')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return 0
+
+    upstreams = []
+    url = args.target
+    if url is None:
+        workdir = tempfile.mkdtemp(prefix='tts-bench-')
+        upstreams = start_upstreams(args)
+        _, url = start_app(*upstreams, workdir)
+        print(f'app on {url}, fake TTSMaker on {upstreams[0].url}, fake edge-tts on {upstreams[1].url}')
+        print(f'audio written to {workdir}')
+
+    print(f'{"concurrency":>11} {"requests":>9} {"errors":>7} {"req/s":>9} '
+          f'{"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"RSS MiB":>8}')
+    results = []
+    for level in [int(c) for c in args.concurrency.split(',')]:
+        row = run_level(url, level, args)
+        results.append(row)
+        print_row(row)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+    for upstream in upstreams:
+        upstream.stop()
+    return 0 if all(row['errors'] < row['requests'] for row in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import threading
+from contextlib import contextmanager
+
+
+class Cancellation:
+    """Lets one thread abandon work another thread is doing on its behalf
+
+    The worker registers callbacks that stop whatever it is blocked on (an
+    event loop future, an open response); cancel() sets the flag and runs them.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        """Run callback on cancel(), or right away if that already happened"""
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+_local = threading.local()
+
+
+@contextmanager
+def scope(cancellation):
+    """Make cancellation the one that applies to work done by this thread"""
+    previous = getattr(_local, 'cancellation', None)
+    _local.cancellation = cancellation
+    try:
+        yield cancellation
+    finally:
+        _local.cancellation = previous
+
+
+def current():
+    """The cancellation that applies to this thread's work, or None; pass it to scope() in helper threads"""
+    return getattr(_local, 'cancellation', None)
+
+
+def cancelled():
+    """Whether the work this thread is doing has been abandoned"""
+    current = getattr(_local, 'cancellation', None)
+    return current is not None and current.cancelled
+
+
+def on_cancel(callback):
+    """Register callback with the thread's cancellation, if it has one"""
+    current = getattr(_local, 'cancellation', None)
+    if current is not None:
+        current.on_cancel(callback)
+
+
+def cancelled_result():
+    """The result a provider returns for work abandoned by its caller"""
+    return {'success': False, 'error': 'Request cancelled', 'error_type': 'cancelled'}
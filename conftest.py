@@ -0,0 +1,23 @@
+"""
+Test session set-up shared by the offline tests
+"""
+
+import os
+import shutil
+import tempfile
+
+# The app reads its configuration when it is first imported. Point its audio store, job table and voice
+# snapshot at a scratch directory and skip the voice refresher, so importing it in a test writes nothing
+# into the repository and makes no calls to ttsmaker.cn or edge-tts.
+WORKDIR = tempfile.mkdtemp(prefix='tts-test-')
+os.environ.update({
+    'TTS_AUDIO_DIR': os.path.join(WORKDIR, 'audio'),
+    'TTS_JOB_DB': os.path.join(WORKDIR, 'jobs.db'),
+    'TTS_VOICE_SNAPSHOT': os.path.join(WORKDIR, 'voices.json'),
+    'TTS_VOICE_REFRESH_INTERVAL': '0',
+    'TTS_TIMING_SAMPLE_RATE': '0',
+})
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(WORKDIR, ignore_errors=True)
@@ -3,9 +3,7 @@
 Script to extract the actual voice data from TTSMaker website
 """
 import requests
-import re
-import json
-from urllib.parse import unquote
+from js_literal import extract_assignment, JSLiteralError
 
 def extract_voice_data():
     """Extract actual voice data from TTSMaker website"""
@@ -21,118 +19,48 @@ def extract_voice_data():
     }
     
     try:
-        response = requests.get('https://ttsmaker.cn/', headers=headers)
-        page_content = response.text
+        response = requests.get('https://ttsmaker.cn/', headers=headers, stream=True)
         
-        # Find the support_language_data JavaScript variable
-        # This looks for var support_language_data = { ... };
-        pattern = r'var support_language_data\s*=\s*({.*?});'
-        match = re.search(pattern, page_content, re.DOTALL)
+        # Parse the support_language_data JavaScript object straight from the response stream
+        voice_data = extract_assignment(response.iter_content(chunk_size=64 * 1024), 'support_language_data')
+        response.close()
         
-        if match:
-            data_str = match.group(1)
-            print("Found voice data in page source")
-            
-            # Convert JavaScript object notation to valid JSON
-            # Replace single quotes with double quotes, but be careful not to replace quotes inside strings
-            json_str = convert_js_to_json(data_str)
+        if not isinstance(voice_data, dict):
+            print("Could not find support_language_data in page")
+            return []
+        print(f"Found voice data for {len(voice_data)} languages in page source")
+        
+        # Extract Chinese voices specifically
+        if 'zh-cn' in voice_data:
+            chinese_voices = voice_data['zh-cn']
+            print(f"Found {len(chinese_voices)} Chinese voices:")
             
-            try:
-                voice_data = json.loads(json_str)
+            formatted_voices = []
+            for voice in chinese_voices:
+                voice_id = voice.get('id', '')
+                name = voice.get('name', '')
+                gender = voice.get('gender', '')
+                
+                gender_str = 'Female' if gender == 2 else 'Male' if gender == 1 else 'Other'
+                print(f"  ID: {voice_id}, Name: {name}, Gender: {gender_str}")
                 
-                # Extract Chinese voices specifically
-                if 'zh-cn' in voice_data:
-                    chinese_voices = voice_data['zh-cn']
-                    print(f"Found {len(chinese_voices)} Chinese voices:")
-                    
-                    formatted_voices = []
-                    for voice in chinese_voices:
-                        voice_id = voice.get('id', '')
-                        name = voice.get('name', '')
-                        gender = voice.get('gender', '')
-                        
-                        gender_str = 'Female' if gender == 2 else 'Male' if gender == 1 else 'Other'
-                        print(f"  ID: {voice_id}, Name: {name}, Gender: {gender_str}")
-                        
-                        formatted_voices.append({
-                            'id': voice_id,
-                            'name': f"{name} - {gender_str}"
-                        })
-                    
-                    return formatted_voices
-                else:
-                    print("No Chinese voices found in the data")
-                    return []
-            except json.JSONDecodeError as e:
-                print(f"JSON decode error: {e}")
-                print("Trying alternative extraction method...")
-                return extract_voices_alternative(data_str)
+                formatted_voices.append({
+                    'id': voice_id,
+                    'name': f"{name} - {gender_str}"
+                })
+            
+            return formatted_voices
         else:
-            print("Could not find support_language_data in page")
+            print("No Chinese voices found in the data")
             return []
             
+    except JSLiteralError as e:
+        print(f"Could not parse support_language_data: {e}")
+        return []
     except Exception as e:
         print(f"Error extracting voice data: {e}")
         return []
 
-def convert_js_to_json(js_str):
-    """Convert JavaScript object notation to valid JSON"""
-    # This is a simplified conversion - in practice, a more robust solution would be needed
-    # For now, we'll use a different approach
-    
-    # Find the zh-cn section specifically
-    zh_cn_pattern = r"'zh-cn':\s*(\[.*?\])(?=\s*,\s*['\"]|$)"
-    zh_cn_match = re.search(zh_cn_pattern, js_str, re.DOTALL)
-    
-    if zh_cn_match:
-        # Extract just the Chinese voices array
-        voices_str = zh_cn_match.group(1)
-        
-        # Replace single quotes with double quotes, but be careful about quotes inside strings
-        # This is a simplified approach - for a robust solution we'd need a proper JS parser
-        result = voices_str
-        
-        # Replace property names with double quotes
-        result = re.sub(r"'(\w+)':", r'"\1":', result)
-        
-        # Replace standalone single quotes with double quotes (this is imperfect)
-        # For now, let's return the original string to avoid breaking it
-        return result
-    
-    return js_str
-
-def extract_voices_alternative(data_str):
-    """Alternative method to extract voices using regex"""
-    print("Using alternative extraction method...")
-    
-    # Look for the zh-cn array specifically
-    zh_cn_pattern = r"'zh-cn':\s*\[(.*?)\](?=\s*,\s*['\"]|\s*\})"
-    zh_cn_match = re.search(zh_cn_pattern, data_str, re.DOTALL)
-    
-    if zh_cn_match:
-        voices_content = zh_cn_match.group(1)
-        
-        # Extract individual voice objects
-        # Each voice object looks like: {'id': number, 'name': 'string', 'gender': number, ...}
-        voice_pattern = r"\{\s*'id'\s*:\s*(\d+)[^}]*?'name'\s*:\s*'([^']*)'[^}]*?'gender'\s*:\s*(\d+)"
-        voice_matches = re.findall(voice_pattern, voices_content)
-        
-        print(f"Found {len(voice_matches)} Chinese voices using alternative method:")
-        formatted_voices = []
-        
-        for voice_id, name, gender in voice_matches:
-            gender_str = 'Female' if gender == '2' else 'Male' if gender == '1' else 'Other'
-            print(f"  ID: {voice_id}, Name: {name}, Gender: {gender_str}")
-            
-            formatted_voices.append({
-                'id': int(voice_id),
-                'name': f"{name} - {gender_str}"
-            })
-        
-        return formatted_voices
-    
-    return []
-
 def main():
     voices = extract_voice_data()
     
@@ -0,0 +1,208 @@
+"""
+Local stand-ins for the TTSMaker HTTP API and the edge-tts WebSocket service
+
+Both return silent but well-formed MP3 audio whose length follows the text,
+with configurable latency, jitter and error rates, so the app can be exercised
+and benchmarked without network access.
+"""
+
+import asyncio
+import html
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from aiohttp import WSMsgType, web
+
+# MPEG-2 Layer III, 48 kbps, 24 kHz, mono: the format edge-tts produces
+FRAME_HEADER = b'\xff\xf3\x64\xc4'
+FRAME_LENGTH = 144
+FRAME_SECONDS = 576 / 24000
+BYTES_PER_SECOND = 48000 // 8
+TICKS_PER_SECOND = 10_000_000
+SENTENCE = re.compile(r'[^。！？!?.；;\n]+[。！？!?.；;\n]*')
+TAG = re.compile(r'<[^>]+>')
+
+
+def silent_mp3(seconds):
+    """Return silent MP3 frames lasting about the given number of seconds (at least one frame)"""
+    frames = max(1, int(round(seconds / FRAME_SECONDS)))
+    return (FRAME_HEADER + b'\x00' * (FRAME_LENGTH - 4)) * frames
+
+
+class Profile:
+    """Latency/jitter/error distribution of a fake upstream"""
+
+    def __init__(self, latency=0.1, jitter=0.02, error_rate=0.0, seconds_per_char=0.06):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seconds_per_char = seconds_per_char
+
+    def delay(self):
+        return max(0.0, random.gauss(self.latency, self.jitter))
+
+    def fails(self):
+        return random.random() < self.error_rate
+
+    def audio_for(self, text):
+        return silent_mp3(len(text) * self.seconds_per_char)
+
+
+class FakeTTSMaker:
+    """Threaded HTTP server answering POSTs like https://ttsmaker.cn/api/tts"""
+
+    def __init__(self, profile=None, host='127.0.0.1', port=0):
+        self.profile = profile or Profile()
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                text = form.get('text', [''])[0]
+                time.sleep(fake.profile.delay())
+                with fake._lock:
+                    fake.requests += 1
+                    failed = fake.profile.fails()
+                    fake.errors += failed
+                if failed:
+                    body, status, content_type = b'{"error_code": 500}', 500, 'application/json'
+                else:
+                    body, status, content_type = fake.profile.audio_for(text), 200, 'audio/mpeg'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/api/tts'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-ttsmaker', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeEdgeTTS:
+    """aiohttp WebSocket server speaking the edge-tts synthesis protocol
+
+    Every SSML request is answered with turn.start, one boundary event and
+    audio per sentence, and turn.end. Boundary offsets and durations use the
+    same 100ns ticks and 48 kbps byte accounting as the real service.
+    """
+
+    def __init__(self, profile=None, host='127.0.0.1', port=0):
+        self.profile = profile or Profile()
+        self.host = host
+        self.port = port
+        self.sessions = 0
+        self.requests = 0
+        self.errors = 0
+        self.loop = asyncio.new_event_loop()
+        self._runner = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'ws://{self.host}:{self.port}/edge/v1?TrustedClientToken=fake'
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sessions += 1
+        word_boundary = False
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            headers, _, body = message.data.partition('\r\n\r\n')
+            if 'Path:speech.config' in headers:
+                word_boundary = '"wordBoundaryEnabled":"true"' in body
+                continue
+            if 'Path:ssml' not in headers:
+                continue
+            self.requests += 1
+            request_id = re.search(r'X-RequestId:(\w+)', headers).group(1)
+            # Strip the SSML envelope, unescape the text, then drop any markup it contained
+            text = TAG.sub(' ', html.unescape(TAG.sub('', body))).strip()
+            await asyncio.sleep(self.profile.delay())
+            if self.profile.fails():
+                self.errors += 1
+                await ws.close(code=1011, message=b'synthesis failed')
+                break
+            await self._send_turn(ws, request_id, text, 'WordBoundary' if word_boundary else 'SentenceBoundary')
+        return ws
+
+    async def _send_turn(self, ws, request_id, text, boundary):
+        def text_message(path, payload):
+            return (f'X-RequestId:{request_id}\r\nContent-Type:application/json; charset=utf-8\r\n'
+                    f'Path:{path}\r\n\r\n{json.dumps(payload, ensure_ascii=False)}')
+
+        audio_header = f'X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n'.encode('utf-8')
+        await ws.send_str(text_message('turn.start', {}))
+        sent = 0
+        for sentence in SENTENCE.findall(text) or [text]:
+            audio = self.profile.audio_for(sentence.strip() or ' ')
+            await ws.send_str(text_message('audio.metadata', {'Metadata': [{
+                'Type': boundary,
+                'Data': {
+                    'Offset': sent * TICKS_PER_SECOND // BYTES_PER_SECOND,
+                    'Duration': len(audio) * TICKS_PER_SECOND // BYTES_PER_SECOND,
+                    'text': {'Text': html.escape(sentence.strip()), 'Length': len(sentence), 'BoundaryType': boundary},
+                },
+            }]}))
+            for start in range(0, len(audio), 20 * FRAME_LENGTH):
+                data = audio[start:start + 20 * FRAME_LENGTH]
+                await ws.send_bytes(len(audio_header).to_bytes(2, 'big') + audio_header + data)
+            sent += len(audio)
+        await ws.send_str(text_message('turn.end', {}))
+
+    def start(self):
+        ready = threading.Event()
+
+        async def serve():
+            app = web.Application()
+            app.router.add_get('/edge/v1', self._handle)
+            self._runner = web.AppRunner(app)
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, self.host, self.port)
+            await site.start()
+            self.port = self._runner.addresses[0][1]
+            ready.set()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(serve())
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='fake-edge-tts', daemon=True)
+        self._thread.start()
+        ready.wait(10)
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,118 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import cancellation
+from cancellation import Cancellation
+
+
+class Hedger:
+    """Sends a backup request when the primary is slower than its recent latency percentile
+
+    The backup goes to the first healthy equivalent provider from the router's
+    plan, or to the same provider when there is none. The first successful
+    result wins. A loser that has not started yet is never run; one that is
+    in flight is cancelled through the cancellation module, which stops its
+    edge-tts session or closes its HTTP response, and it writes no file.
+    """
+
+    def __init__(self, router, percentile=95, min_delay=0.5, max_delay=10.0, workers=64):
+        self.router = router
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.requests = 0
+        self.fired = 0
+        self.wins = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts-hedge')
+
+    def delay_for(self, service):
+        """How long to wait for the primary before hedging"""
+        latency = self.router.health[service].percentile(self.percentile)
+        if latency is None:
+            return self.max_delay
+        return min(self.max_delay, max(self.min_delay, latency))
+
+    def _backup_for(self, service, params):
+        for candidate, candidate_params in self.router.plan(service, params):
+            if candidate != service and self.router.breakers[candidate].allow():
+                return candidate, candidate_params
+        return service, params
+
+    def _submit(self, service, text, params, convert):
+        token = Cancellation()
+
+        def run():
+            start = time.monotonic()
+            with cancellation.scope(token):
+                try:
+                    result = convert(service, text, params)
+                except Exception as e:
+                    result = {'success': False, 'error': str(e)}
+            self.router.observe(service, result, time.monotonic() - start)
+            return result
+        future = self._executor.submit(run)
+        future.cancellation = token
+        return future
+
+    def call(self, service, text, params, convert):
+        """Like ProviderRouter.call, but hedges a slow primary with a second request"""
+        if not self.router.breakers[service].allow():
+            return self.router.call(service, text, params, convert)
+
+        with self._lock:
+            self.requests += 1
+        primary = self._submit(service, text, params, convert)
+        done, _ = wait([primary], timeout=self.delay_for(service))
+        if done and primary.result()['success']:
+            return self._finish(primary.result(), service, service, hedged=False)
+
+        # A primary that already failed is retried on the backup; only a primary still pending is hedged
+        hedged = not done
+        backup_service, backup_params = self._backup_for(service, params)
+        if hedged:
+            with self._lock:
+                self.fired += 1
+        backup = self._submit(backup_service, text, backup_params, convert)
+
+        pending = {backup: backup_service}
+        if not done:
+            pending[primary] = service
+        last_result = primary.result() if done else None
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                candidate = pending.pop(future)
+                result = future.result()
+                if not result['success']:
+                    last_result = result
+                    continue
+                for loser, loser_service in pending.items():
+                    if loser.cancel():
+                        self.router.breakers[loser_service].release()
+                    else:
+                        loser.cancellation.cancel()
+                if hedged and future is backup:
+                    with self._lock:
+                        self.wins += 1
+                return self._finish(result, service, candidate, hedged=hedged)
+        return last_result
+
+    def _finish(self, result, service, candidate, hedged):
+        result['hedged'] = hedged
+        result['provider'] = candidate
+        if candidate != service:
+            result['fallback_from'] = service
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedges_fired': self.fired,
+                'hedges_won': self.wins,
+                'hedge_rate': self.fired / self.requests if self.requests else 0.0,
+                'win_rate': self.wins / self.fired if self.fired else 0.0,
+                'percentile': self.percentile,
+            }
@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HTTPPool:
+    """Shared keep-alive sessions with one bounded connection pool per upstream host
+
+    Sessions are created on first use and reused by every request and worker
+    thread, so DNS lookups, TCP connects and TLS handshakes are only paid when
+    the pool has no idle connection to the host.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=60.0, block=True):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.block = block
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url):
+        parts = urlsplit(url)
+        return f'{parts.scheme}://{parts.netloc}'
+
+    def session_for(self, url):
+        """Return the shared session for the host of url, creating it on first use"""
+        key = self.host_key(url)
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_size,
+                    pool_block=self.block
+                )
+                session.mount(key, adapter)
+                self._sessions[key] = session
+            return session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def preconnect(self, url, connections=1):
+        """Open keep-alive connections to the host of url ahead of the first request
+
+        Any response will do, since only the connection is wanted. Returns the
+        number of connections opened (at most pool_size).
+        """
+        key = self.host_key(url)
+        count = max(1, min(connections, self.pool_size))
+
+        def connect(_):
+            self.request('HEAD', key + '/', allow_redirects=False).close()
+
+        with ThreadPoolExecutor(max_workers=count) as pool:
+            list(pool.map(connect, range(count)))
+        return count
+
+    def hosts(self):
+        with self._lock:
+            return list(self._sessions)
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
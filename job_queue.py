@@ -0,0 +1,194 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    """Runs synthesis jobs on a worker pool and records them in a persistent SQLite job table
+
+    handler(payload) does the actual work and must return a result dict in the
+    same shape as the TTSConverter methods ({'success': ..., 'filename': ...}).
+    Each job records the pid of the process that owns it; every sweep_interval
+    seconds the queue renews the heartbeat of its own running jobs, fails
+    running jobs whose owner has died or whose heartbeat is older than
+    stale_after, and adopts queued jobs whose owner has died, so a worker
+    replaced by prefork.py does not leave them behind.
+    """
+
+    def __init__(self, db_path, handler, workers=4, stale_after=600, sweep_interval=30):
+        self.db_path = db_path
+        self.handler = handler
+        self.stale_after = stale_after
+        self.sweep_interval = sweep_interval
+        self.pid = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts-job')
+        self._stopped = threading.Event()
+        self._init_db()
+        # Jobs this pid queued belong to an earlier queue in this process, since nothing else can own them yet
+        self.sweep(restarted=True)
+        if sweep_interval:
+            threading.Thread(target=self._sweep_loop, name='tts-job-sweep', daemon=True).start()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                '''CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    filename TEXT,
+                    service TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )'''
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)')
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(jobs)')]
+            if 'owner' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN owner INTEGER')
+            if 'heartbeat' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN heartbeat REAL')
+
+    @staticmethod
+    def _alive(pid):
+        if pid is None:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def sweep(self, restarted=False):
+        """Fail running jobs whose owner died or stopped beating, and take over queued jobs of dead owners"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE state = 'running' AND owner = ?", (now, self.pid)
+            )
+            rows = conn.execute(
+                "SELECT id, state, payload, owner, heartbeat FROM jobs WHERE state IN ('queued', 'running') "
+                "ORDER BY created_at"
+            ).fetchall()
+            dead = {self.pid: False}
+            adopted = []
+            for row in rows:
+                owner = row['owner']
+                if owner not in dead:
+                    dead[owner] = not self._alive(owner)
+                if row['state'] == 'running':
+                    # A live owner's jobs may legitimately run for a long time; it renews their heartbeat
+                    stalled = owner != self.pid and (row['heartbeat'] or 0) < now - self.stale_after
+                    if dead[owner] or stalled:
+                        conn.execute(
+                            "UPDATE jobs SET state = 'failed', error = 'interrupted', finished_at = ? "
+                            "WHERE id = ? AND state = 'running'",
+                            (now, row['id'])
+                        )
+                elif dead[owner] or (restarted and owner == self.pid):
+                    taken = conn.execute(
+                        "UPDATE jobs SET owner = ? WHERE id = ? AND state = 'queued' AND owner IS ?",
+                        (self.pid, row['id'], owner)
+                    ).rowcount
+                    if taken:
+                        adopted.append(row)
+        for row in adopted:
+            self._executor.submit(self._run, row['id'], json.loads(row['payload']))
+
+    def _sweep_loop(self):
+        while not self._stopped.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except sqlite3.Error:
+                pass
+
+    def submit(self, payload):
+        """Record a new job and hand it to the worker pool, returning its id"""
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, state, payload, owner, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(payload, ensure_ascii=False), self.pid, time.time())
+            )
+        self._executor.submit(self._run, job_id, payload)
+        return job_id
+
+    def _run(self, job_id, payload):
+        now = time.time()
+        with self._connect() as conn:
+            claimed = conn.execute(
+                "UPDATE jobs SET state = 'running', started_at = ?, heartbeat = ?, owner = ? "
+                "WHERE id = ? AND state = 'queued'",
+                (now, now, self.pid, job_id)
+            ).rowcount
+        if not claimed:
+            return
+
+        try:
+            result = self.handler(payload)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+
+        with self._connect() as conn:
+            if result.get('success'):
+                conn.execute(
+                    "UPDATE jobs SET state = 'succeeded', filename = ?, service = ?, finished_at = ? "
+                    "WHERE id = ? AND state = 'running'",
+                    (result.get('filename'), result.get('service'), time.time(), job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET state = 'failed', error = ?, finished_at = ? WHERE id = ? AND state = 'running'",
+                    (result.get('error', 'unknown error'), time.time(), job_id)
+                )
+
+    def get(self, job_id):
+        """Return the job's state, timings and result, or None if it does not exist"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            'id': row['id'],
+            'state': row['state'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'queue_time': None,
+            'run_time': None,
+        }
+        if row['started_at'] is not None:
+            job['queue_time'] = row['started_at'] - row['created_at']
+        if row['finished_at'] is not None and row['started_at'] is not None:
+            job['run_time'] = row['finished_at'] - row['started_at']
+        if row['state'] == 'succeeded':
+            job['filename'] = row['filename']
+            job['service'] = row['service']
+        elif row['state'] == 'failed':
+            job['error'] = row['error']
+        return job
+
+    def shutdown(self, wait=True):
+        self._stopped.set()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,216 @@
+import codecs
+import re
+
+IDENTIFIER_START = re.compile(r'[A-Za-z_$]')
+IDENTIFIER = re.compile(r'[A-Za-z0-9_$]*')
+NUMBER_CHARS = re.compile(r'[0-9A-Fa-fxX.+-]*')
+NUMBER = re.compile(r'[-+]?(0[xX][0-9a-fA-F]+|(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?)')
+STRING_RUN = {q: re.compile(r'[^\\' + q + r']*') for q in '\'"`'}
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0'}
+KEYWORDS = {'true': True, 'false': False, 'null': None, 'undefined': None}
+
+
+class JSLiteralError(ValueError):
+    """Raised when the input is not a JavaScript object/array literal this parser understands"""
+
+
+class _Reader:
+    """Character reader over a stream of text chunks, holding only the current chunk"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+
+    def fill(self, minimum=1):
+        """Make at least minimum characters available; returns False at end of input"""
+        while len(self.buffer) - self.pos < minimum:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return False
+            if isinstance(chunk, bytes):
+                # Multi-byte characters may be split across network reads
+                chunk = self._decoder.decode(chunk)
+            self.buffer = self.buffer[self.pos:] + chunk
+            self.pos = 0
+        return True
+
+    def peek(self):
+        return self.buffer[self.pos] if self.fill() else ''
+
+    def take(self):
+        if not self.fill():
+            raise JSLiteralError('unexpected end of input')
+        char = self.buffer[self.pos]
+        self.pos += 1
+        return char
+
+    def match(self, pattern):
+        """Consume the longest run matching pattern, refilling when it reaches the chunk end"""
+        parts = []
+        while self.fill():
+            m = pattern.match(self.buffer, self.pos)
+            parts.append(m.group())
+            self.pos = m.end()
+            if self.pos < len(self.buffer):
+                break
+        return ''.join(parts)
+
+    def skip_space(self):
+        """Skip whitespace and // or /* */ comments"""
+        while self.fill():
+            char = self.buffer[self.pos]
+            if char.isspace():
+                self.pos += 1
+            elif char == '/' and self.fill(2) and self.buffer[self.pos + 1] in '/*':
+                closing = '\n' if self.buffer[self.pos + 1] == '/' else '*/'
+                self.pos += 2
+                self.seek(closing)
+            else:
+                return
+
+    def seek(self, marker):
+        """Advance past the next occurrence of marker; returns False if the input ends first"""
+        while True:
+            index = self.buffer.find(marker, self.pos)
+            if index >= 0:
+                self.pos = index + len(marker)
+                return True
+            # Keep a tail in case the marker straddles two chunks
+            self.pos = max(self.pos, len(self.buffer) - len(marker) + 1)
+            if not self.fill(len(self.buffer) - self.pos + 1):
+                return False
+
+
+def _parse_value(reader):
+    reader.skip_space()
+    char = reader.peek()
+    if char == '{':
+        return _parse_object(reader)
+    if char == '[':
+        return _parse_array(reader)
+    if char in '\'"`':
+        return _parse_string(reader)
+    if char and (char.isdigit() or char in '-+.'):
+        return _parse_number(reader)
+    if char and IDENTIFIER_START.match(char):
+        word = reader.match(IDENTIFIER)
+        if word in KEYWORDS:
+            return KEYWORDS[word]
+        raise JSLiteralError(f'unsupported identifier {word!r}')
+    raise JSLiteralError(f'unexpected character {char!r}')
+
+
+def _parse_object(reader):
+    reader.take()
+    result = {}
+    while True:
+        reader.skip_space()
+        char = reader.peek()
+        if char == '}':
+            reader.take()
+            return result
+        if char in '\'"`':
+            key = _parse_string(reader)
+        elif char and (char.isdigit() or char in '-+.'):
+            key = str(_parse_number(reader))
+        elif char and IDENTIFIER_START.match(char):
+            key = reader.match(IDENTIFIER)
+        else:
+            raise JSLiteralError(f'unexpected character {char!r} in object key')
+        reader.skip_space()
+        if reader.take() != ':':
+            raise JSLiteralError(f'expected ":" after key {key!r}')
+        result[key] = _parse_value(reader)
+        reader.skip_space()
+        char = reader.take()
+        if char == '}':
+            return result
+        if char != ',':
+            raise JSLiteralError(f'expected "," or "}}" in object, got {char!r}')
+
+
+def _parse_array(reader):
+    reader.take()
+    result = []
+    while True:
+        reader.skip_space()
+        if reader.peek() == ']':
+            reader.take()
+            return result
+        result.append(_parse_value(reader))
+        reader.skip_space()
+        char = reader.take()
+        if char == ']':
+            return result
+        if char != ',':
+            raise JSLiteralError(f'expected "," or "]" in array, got {char!r}')
+
+
+def _parse_string(reader):
+    quote = reader.take()
+    run = STRING_RUN[quote]
+    parts = []
+    while True:
+        parts.append(reader.match(run))
+        char = reader.take()
+        if char == quote:
+            return ''.join(parts)
+        escaped = reader.take()
+        if escaped == 'u':
+            if reader.peek() == '{':
+                reader.take()
+                digits = ''
+                while reader.peek() != '}':
+                    digits += reader.take()
+                reader.take()
+            else:
+                digits = ''.join(reader.take() for _ in range(4))
+            parts.append(chr(int(digits, 16)))
+        elif escaped == 'x':
+            parts.append(chr(int(reader.take() + reader.take(), 16)))
+        elif escaped in '\r\n':
+            # Line continuation
+            if escaped == '\r' and reader.peek() == '\n':
+                reader.take()
+        else:
+            parts.append(ESCAPES.get(escaped, escaped))
+
+
+def _parse_number(reader):
+    text = reader.match(NUMBER_CHARS)
+    if not NUMBER.fullmatch(text):
+        raise JSLiteralError(f'invalid number {text!r}')
+    sign = -1 if text[0] == '-' else 1
+    digits = text.lstrip('+-')
+    if digits[:2] in ('0x', '0X'):
+        return sign * int(digits, 16)
+    if any(c in digits for c in '.eE'):
+        return sign * float(digits)
+    return sign * int(digits)
+
+
+def parse(chunks):
+    """Parse one object or array literal from a string or an iterable of text chunks"""
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    return _parse_value(_Reader(chunks))
+
+
+def extract_assignment(chunks, name):
+    """Find `name = <literal>` in a stream of text chunks (e.g. an HTML page) and parse the literal
+
+    Scans the stream once without keeping more than the current chunk in memory.
+    Returns None if no assignment to name is found.
+    """
+    reader = _Reader(chunks)
+    while reader.seek(name):
+        reader.skip_space()
+        if reader.peek() != '=':
+            continue
+        reader.take()
+        if reader.peek() == '=':
+            continue
+        return _parse_value(reader)
+    return None
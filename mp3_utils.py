@@ -0,0 +1,143 @@
+"""
+Minimal MPEG audio frame parser used to stitch and cut MP3 files on frame boundaries
+"""
+
+# Bitrates in kbps indexed by [mpeg1][layer][index]
+BITRATES = {
+    True: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    False: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+class FrameHeader:
+    __slots__ = ('mpeg1', 'layer', 'bitrate', 'sample_rate', 'padding', 'mono', 'length', 'samples')
+
+    def __init__(self, mpeg1, layer, bitrate, sample_rate, padding, mono):
+        self.mpeg1 = mpeg1
+        self.layer = layer
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.padding = padding
+        self.mono = mono
+        if layer == 1:
+            self.length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+            self.samples = 384
+        elif layer == 2 or mpeg1:
+            self.length = 144 * bitrate * 1000 // sample_rate + padding
+            self.samples = 1152
+        else:
+            self.length = 72 * bitrate * 1000 // sample_rate + padding
+            self.samples = 576
+
+    @property
+    def duration(self):
+        return self.samples / self.sample_rate
+
+
+def parse_header(data, offset):
+    """Parse the four byte frame header at offset, or return None if it is not one"""
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset:offset + 4]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)
+    bitrate_index = (b2 >> 4) & 0x0F
+    rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    return FrameHeader(
+        mpeg1=mpeg1,
+        layer=layer,
+        bitrate=BITRATES[mpeg1][layer][bitrate_index],
+        sample_rate=SAMPLE_RATES[version][rate_index],
+        padding=(b2 >> 1) & 0x01,
+        mono=(b3 >> 6) == 3,
+    )
+
+
+def audio_start(data):
+    """Return the offset just past a leading ID3v2 tag, if any"""
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = 0
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def is_info_frame(data, offset, header):
+    """True for Xing/Info/VBRI header frames, which carry metadata instead of audio"""
+    if header.mpeg1:
+        side_info = 17 if header.mono else 32
+    else:
+        side_info = 9 if header.mono else 17
+    tag = data[offset + 4 + side_info:offset + 8 + side_info]
+    return tag in (b'Xing', b'Info') or data[offset + 36:offset + 40] == b'VBRI'
+
+
+def iter_frames(data):
+    """Yield (offset, header) for each complete audio frame, skipping tags and garbage"""
+    offset = audio_start(data)
+    end = len(data)
+    if end >= 128 and data[end - 128:end - 125] == b'TAG':
+        end -= 128
+
+    while offset + 4 <= end:
+        header = parse_header(data, offset)
+        if header is None or offset + header.length > end:
+            # Resynchronise on the next frame sync word
+            offset = data.find(b'\xff', offset + 1, end)
+            if offset < 0:
+                return
+            continue
+        if not is_info_frame(data, offset, header):
+            yield offset, header
+        offset += header.length
+
+
+def duration(data):
+    """Total playing time of the audio frames in seconds"""
+    return sum(header.duration for _, header in iter_frames(data))
+
+
+def join_mp3(parts):
+    """Concatenate MP3 files frame by frame into one gapless stream, in order"""
+    output = bytearray()
+    for data in parts:
+        for offset, header in iter_frames(data):
+            output += data[offset:offset + header.length]
+    return bytes(output)
+
+
+def split_mp3(data, times):
+    """Cut MP3 data before the frames nearest to the given times (seconds, ascending)
+
+    Returns len(times) + 1 parts; a part is empty if a cut lies past the end.
+    """
+    parts = []
+    current = bytearray()
+    elapsed = 0.0
+    cuts = iter(times)
+    next_cut = next(cuts, None)
+    for offset, header in iter_frames(data):
+        while next_cut is not None and elapsed + header.duration / 2 > next_cut:
+            parts.append(bytes(current))
+            current = bytearray()
+            next_cut = next(cuts, None)
+        current += data[offset:offset + header.length]
+        elapsed += header.duration
+    parts.append(bytes(current))
+    return parts + [b''] * (len(times) + 1 - len(parts))
@@ -0,0 +1,78 @@
+"""
+Packing many short texts into one edge-tts request and cutting the audio back per text
+
+edge-tts escapes the text it sends, so packed texts cannot be separated with
+SSML marks. Each packed text ends a sentence, the texts are joined with
+newlines, and the SentenceBoundary events the service sends for every sentence
+show where each text's audio starts.
+"""
+
+from text_segmenter import SENTENCE_END
+
+TICKS_PER_SECOND = 10_000_000
+
+
+def _letters(text):
+    return ''.join(ch for ch in text if ch.isalnum())
+
+
+def can_pack(text, max_chars):
+    """True if text ends a sentence, has something to say and fits in a pack on its own"""
+    match = None
+    for match in SENTENCE_END.finditer(text):
+        pass
+    return match is not None and match.end() == len(text) and bool(_letters(text)) and len(text) < max_chars
+
+
+def plan_packs(texts, max_chars):
+    """Group the indexes of texts into packs of at most max_chars characters, in order
+
+    Texts that cannot be packed get a group of their own.
+    """
+    packs = []
+    current = []
+    size = 0
+    for index, text in enumerate(texts):
+        if not can_pack(text, max_chars):
+            packs.append([index])
+            continue
+        if current and size + len(text) + 1 > max_chars:
+            packs.append(current)
+            current = []
+            size = 0
+        current.append(index)
+        size += len(text) + 1
+    if current:
+        packs.append(current)
+    return packs
+
+
+def pack_text(texts):
+    return '\n'.join(texts)
+
+
+def item_starts(texts, boundaries):
+    """Offsets (in 100ns ticks) at which each packed text's audio starts
+
+    boundaries is the list of (offset, text) sentence boundary events of the
+    packed request. Returns None if the events do not line up with the texts.
+    """
+    starts = []
+    position = 0
+    for text in texts:
+        target = _letters(text)
+        if position >= len(boundaries):
+            return None
+        # The first text also gets the leading silence
+        starts.append(boundaries[position][0] if starts else 0)
+        spoken = ''
+        while spoken != target:
+            if position >= len(boundaries):
+                return None
+            spoken += _letters(boundaries[position][1])
+            position += 1
+            if not target.startswith(spoken):
+                return None
+    if position != len(boundaries):
+        return None
+    return starts
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Preforking production server
+
+Binds the listening socket once and forks --workers processes that accept
+connections from it. Each worker imports the app only after the fork, so no
+threads or connections are shared between processes, and a worker that exits
+is replaced. Workers serve with a threaded WSGI server, or with the asyncio
+server (async_server.py) when TTS_SERVER_MODE=async.
+
+    python prefork.py --workers 4 --port 5001
+
+State that must be the same in every worker lives on disk: the synthesis
+cache is the shared audio directory, jobs are in the SQLite job table, and
+the upstream rate-limit buckets are in TTS_RATE_LIMIT_DB (tts_rate_limits.db
+unless set), so more workers do not mean more upstream traffic. Workers warm
+up at start (TTS_WARMUP=1 unless set) and answer /healthz/ready once done.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+
+def serve_worker(sock, worker_id, args):
+    """Run one worker on the inherited socket; never returns"""
+    os.environ['TTS_WORKER_ID'] = str(worker_id)
+    if args.mode == 'async':
+        from aiohttp import web
+        import async_server
+
+        web.run_app(async_server.create_app(), sock=sock, print=None)
+    else:
+        from werkzeug.serving import make_server
+        import app as tts_app
+
+        server = make_server(args.host, args.port, tts_app.app, threaded=True, fd=sock.fileno())
+        server.serve_forever()
+
+
+def spawn(sock, worker_id, args):
+    pid = os.fork()
+    if pid:
+        return pid
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 0
+    try:
+        serve_worker(sock, worker_id, args)
+    except BaseException:
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the TTS app from several worker processes')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('TTS_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--mode', choices=['sync', 'async'],
+                        default='async' if os.environ.get('TTS_SERVER_MODE') == 'async' else 'sync')
+    parser.add_argument('--backlog', type=int, default=1024)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('TTS_RATE_LIMIT_DB', 'tts_rate_limits.db')
+    # Workers replaced during a rolling deploy should be warm before /healthz/ready admits traffic
+    os.environ.setdefault('TTS_WARMUP', '1')
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+    # Workers that do not get a connection first must not hang in accept()
+    sock.setblocking(False)
+
+    workers = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for worker_id in range(max(1, args.workers)):
+        workers[spawn(sock, worker_id, args)] = worker_id
+    print(f'serving on http://{args.host}:{args.port} with {len(workers)} {args.mode} workers', flush=True)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        worker_id = workers.pop(pid, None)
+        if worker_id is None or stopping:
+            continue
+        print(f'worker {worker_id} (pid {pid}) exited with status {status}, restarting', file=sys.stderr, flush=True)
+        # Do not spin if a worker cannot start at all
+        time.sleep(1)
+        workers[spawn(sock, worker_id, args)] = worker_id
+
+    sock.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
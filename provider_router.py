@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import deque
+
+
+class ProviderHealth:
+    """Rolling latency and error statistics for one provider"""
+
+    def __init__(self, alpha=0.2, window=200):
+        self.alpha = alpha
+        self.ewma_latency = None
+        self.requests = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, success, latency):
+        with self._lock:
+            self.requests += 1
+            if not success:
+                self.errors += 1
+            self._outcomes.append(success)
+            self._latencies.append(latency)
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+
+    def percentile(self, p):
+        """Latency at percentile p (0-100) over the recent window, or None without samples"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def error_rate(self):
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def window_size(self):
+        with self._lock:
+            return len(self._outcomes)
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': self.error_rate(),
+            'ewma_latency': self.ewma_latency,
+            'p50_latency': self.percentile(50),
+            'p95_latency': self.percentile(95),
+            'p99_latency': self.percentile(99),
+        }
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by consecutive failures and the recent error rate"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, error_rate_threshold=0.5, min_requests=20, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_requests = min_requests
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request may be sent; lets one probe through after reset_timeout"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Give back a half-open probe that turned out not to reach the provider"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            self.state = self.CLOSED
+
+    def record_failure(self, health):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            tripped = (
+                self.state == self.HALF_OPEN
+                or self.consecutive_failures >= self.failure_threshold
+                or (health.window_size() >= self.min_requests
+                    and health.error_rate() >= self.error_rate_threshold)
+            )
+            if tripped and self.state != self.OPEN:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class ProviderRouter:
+    """Routes conversions to a healthy provider, falling back to compatible ones
+
+    translate(service, params, target) returns the parameters that give the
+    closest equivalent voice on the target provider, or None when the target
+    cannot serve the request. Calls slower than slow_threshold seconds count
+    as failures for the breaker even if they succeed.
+    """
+
+    def __init__(self, providers, fallbacks, translate, slow_threshold=20.0, **breaker_options):
+        self.fallbacks = fallbacks
+        self.translate = translate
+        self.slow_threshold = slow_threshold
+        self.health = {service: ProviderHealth() for service in providers}
+        self.breakers = {service: CircuitBreaker(**breaker_options) for service in providers}
+
+    def plan(self, service, params):
+        """The primary provider followed by compatible fallbacks, as (service, params) pairs"""
+        yield service, params
+        for target in self.fallbacks.get(service, []):
+            translated = self.translate(service, params, target)
+            if translated is not None:
+                yield target, translated
+
+    def record(self, service, success, latency):
+        health = self.health[service]
+        health.record(success, latency)
+        if success and latency <= self.slow_threshold:
+            self.breakers[service].record_success()
+        else:
+            self.breakers[service].record_failure(health)
+
+    def observe(self, service, result, latency):
+        """Record a convert() result, unless it was answered without calling the provider
+
+        Cached results, results marked 'upstream': False (the marker is
+        removed) and calls the caller cancelled say nothing about the
+        provider's health or latency.
+        """
+        called = result.pop('upstream', True)
+        if result.get('cached') or not called or result.get('error_type') == 'cancelled':
+            self.breakers[service].release()
+            return
+        self.record(service, result['success'], latency)
+
+    def call(self, service, text, params, convert):
+        """Run convert(service, text, params) on the first healthy candidate provider"""
+        last_result = None
+        for candidate, candidate_params in self.plan(service, params):
+            if not self.breakers[candidate].allow():
+                continue
+            start = time.monotonic()
+            try:
+                result = convert(candidate, text, candidate_params)
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            self.observe(candidate, result, time.monotonic() - start)
+
+            if result['success']:
+                result['provider'] = candidate
+                if candidate != service:
+                    result['fallback_from'] = service
+                return result
+            last_result = result
+
+        return last_result or {'success': False, 'error': '所有TTS服务暂时不可用，请稍后再试'}
+
+    async def call_async(self, service, text, params, convert):
+        """Like call, for a coroutine convert(service, text, params)"""
+        last_result = None
+        for candidate, candidate_params in self.plan(service, params):
+            if not self.breakers[candidate].allow():
+                continue
+            start = time.monotonic()
+            try:
+                result = await convert(candidate, text, candidate_params)
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            self.observe(candidate, result, time.monotonic() - start)
+
+            if result['success']:
+                result['provider'] = candidate
+                if candidate != service:
+                    result['fallback_from'] = service
+                return result
+            last_result = result
+
+        return last_result or {'success': False, 'error': '所有TTS服务暂时不可用，请稍后再试'}
+
+    def status(self):
+        return {
+            service: dict(health.snapshot(), state=self.breakers[service].state)
+            for service, health in self.health.items()
+        }
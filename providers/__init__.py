@@ -0,0 +1,74 @@
+"""
+Provider plugins
+
+Every synthesis backend is a plugin module in this package, imported the first
+time the service is used (or at start-up when it is listed in TTS_PROVIDERS),
+so a worker serving one provider never loads another's dependencies.
+
+A plugin module defines a Provider subclass (see providers/base.py) that
+declares the service NAME, the upstream HOST it is rate limited under, its
+CAPABILITIES and the BATCH_CONCURRENCY it allows by default.
+"""
+
+import importlib
+import threading
+
+# Service name -> 'module:Class' of its plugin
+PLUGINS = {
+    'ttsmaker': 'providers.ttsmaker:TTSMakerProvider',
+    'ai_speaker': 'providers.edge:EdgeTTSProvider',
+    'luyinzhushou': 'providers.luyinzhushou:LuyinzhushouProvider',
+    'ai_speaker_net': 'providers.ai_speaker_net:AISpeakerNetProvider',
+}
+
+
+class ProviderRegistry:
+    """Provider plugins by service name, imported and created on first use
+
+    context holds the keyword arguments every provider is created with
+    (output_dir, http, limiter, runtime); options[name] adds the ones
+    specific to one plugin.
+    """
+
+    def __init__(self, context, options=None, enabled=(), plugins=PLUGINS):
+        unknown = [name for name in enabled if name not in plugins]
+        if unknown:
+            raise ValueError(f'unknown providers: {", ".join(unknown)}')
+        self.context = context
+        self.options = options or {}
+        self.enabled = list(enabled)
+        self.plugins = dict(plugins)
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Return the provider for a service, importing its plugin the first time"""
+        provider = self._providers.get(name)
+        if provider is not None:
+            return provider
+        with self._lock:
+            provider = self._providers.get(name)
+            if provider is None:
+                module_name, class_name = self.plugins[name].split(':')
+                plugin = getattr(importlib.import_module(module_name), class_name)
+                provider = plugin(**self.context, **self.options.get(name, {}))
+                self._providers[name] = provider
+            return provider
+
+    def load_enabled(self):
+        """Import the plugins listed in enabled; returns their names"""
+        return [self.get(name).NAME for name in self.enabled]
+
+    def loaded(self):
+        return sorted(self._providers)
+
+    def describe(self):
+        """Capabilities and limits of the loaded plugins, and which others are available"""
+        return {
+            name: {
+                'enabled': name in self.enabled,
+                'loaded': name in self._providers,
+                **(self._providers[name].describe() if name in self._providers else {}),
+            }
+            for name in self.plugins
+        }
@@ -0,0 +1,41 @@
+from providers.base import Provider
+from rate_limiter import RateLimitTimeout
+
+
+class AISpeakerNetProvider(Provider):
+    """ai-speaker.net's JSON TTS API"""
+
+    NAME = 'ai_speaker_net'
+    HOST = 'ai-speaker.net'
+    BATCH_CONCURRENCY = 1
+
+    URL = 'https://ai-speaker.net/api/tts'
+
+    def synthesize(self, text, voice_id='zh-CN', speed=1.0, pitch=1.0, volume=1.0):
+        """Convert text to speech using ai-speaker.net"""
+        try:
+            self.limiter.acquire(self.HOST, len(text))
+            # This is a simplified version and might need adjustments based on the actual website's API
+            data = {
+                'text': text,
+                'language': voice_id,
+                'speed': speed,
+                'pitch': pitch,
+                'volume': volume,
+            }
+            response = self.http.post(self.URL, json=data, headers=self.headers)
+            if response.status_code != 200:
+                return {
+                    'success': False,
+                    'error': f'Error from ai-speaker.net: {response.status_code}',
+                    'error_type': f'http_{response.status_code}'
+                }
+            filename, filepath = self.output_file('ai_speaker_net')
+            with open(filepath, 'wb') as f:
+                f.write(response.content)
+            return {'success': True, 'filename': filename, 'service': f'AI-Speaker.net ({voice_id})'}
+
+        except RateLimitTimeout as e:
+            return {'success': False, 'error': f'ai-speaker.net rate limit: {str(e)}', 'error_type': 'rate_limited'}
+        except Exception as e:
+            return {'success': False, 'error': f'Error with ai-speaker.net: {str(e)}', 'error_type': 'exception'}
@@ -0,0 +1,59 @@
+import os
+import uuid
+from datetime import datetime
+
+from async_runtime import AsyncLoopThread
+from http_pool import HTTPPool
+from rate_limiter import RateLimiter
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def output_file(output_dir, prefix):
+    """Return a unique (filename, path) in output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f'{prefix}_{timestamp}_{uuid.uuid4().hex[:8]}.mp3'
+    return filename, os.path.join(output_dir, filename)
+
+
+class Provider:
+    """Base class of provider plugins
+
+    Subclasses declare NAME, HOST (the rate-limiter key of their upstream),
+    CAPABILITIES and BATCH_CONCURRENCY, and implement synthesize(text, **params)
+    returning {'success': ..., 'filename': ...} like the other converters.
+    Capabilities used by the app: 'async' (synthesize_async), 'stream' (stream)
+    and 'packing' (synthesize_packed).
+    """
+
+    NAME = None
+    HOST = None
+    CAPABILITIES = frozenset()
+    BATCH_CONCURRENCY = 4
+
+    def __init__(self, output_dir, http=None, limiter=None, runtime=None):
+        self.output_dir = output_dir
+        # Keep-alive connection pools shared by all worker threads
+        self.http = http or HTTPPool()
+        # Per-host token buckets every upstream call is admitted through
+        self.limiter = limiter or RateLimiter({})
+        # Long-lived event loop that coroutine-based clients are multiplexed on
+        self.runtime = runtime or AsyncLoopThread()
+        self.headers = {'User-Agent': USER_AGENT}
+
+    def output_file(self, prefix):
+        return output_file(self.output_dir, prefix)
+
+    def supports(self, capability):
+        return capability in self.CAPABILITIES
+
+    def describe(self):
+        return {
+            'host': self.HOST,
+            'capabilities': sorted(self.CAPABILITIES),
+            'batch_concurrency': self.BATCH_CONCURRENCY,
+        }
+
+    def synthesize(self, text, **params):
+        raise NotImplementedError
@@ -0,0 +1,246 @@
+import asyncio
+import os
+import queue
+import time
+from concurrent.futures import CancelledError
+
+import edge_tts
+
+import cancellation
+from async_runtime import TIMEOUT_ERRORS
+from mp3_utils import split_mp3
+from packing import TICKS_PER_SECOND, item_starts, pack_text
+from providers.base import Provider
+from rate_limiter import RateLimitTimeout
+from stage_timer import StageTimer
+
+
+class EdgeTTSProvider(Provider):
+    """The AI Speaker service: Microsoft Edge's read-aloud voices through edge-tts
+
+    Sessions run on the shared event loop (or are awaited directly in the
+    async serving mode), and at most timeout seconds are allowed for each.
+    """
+
+    NAME = 'ai_speaker'
+    HOST = 'speech.platform.bing.com'
+    CAPABILITIES = frozenset({'async', 'stream', 'packing'})
+    BATCH_CONCURRENCY = 16
+
+    def __init__(self, output_dir, timeout=120, wss_url='', **context):
+        super().__init__(output_dir, **context)
+        self.timeout = timeout
+        if wss_url:
+            # edge-tts reads its endpoint from a module global when each session connects
+            edge_tts.communicate.WSS_URL = wss_url
+
+    @property
+    def endpoint(self):
+        return edge_tts.communicate.WSS_URL
+
+    def communicate(self, text, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium'):
+        """Build the edge-tts Communicate object for an AI Speaker request"""
+        # Convert string parameters to appropriate values for edge_tts.
+        # edge-tts escapes the text it is given, so prosody cannot be sent as SSML markup;
+        # it is passed through edge-tts's own options, relative to the voice's defaults
+        speed_map = {
+            'x-slow': '-50%', 'slow': '-25%', 'medium': '+0%', 'fast': '+25%', 'x-fast': '+50%',
+            # Also handle numeric values that might be passed as strings
+            '0.5': '-50%', '0.75': '-25%', '1.0': '+0%', '1.25': '+25%', '1.5': '+50%', '2.0': '+100%'
+        }
+        pitch_map = {
+            'x-low': '-50Hz', 'low': '-25Hz', 'medium': '+0Hz', 'high': '+25Hz', 'x-high': '+50Hz',
+            # Also handle numeric values that might be passed as strings
+            '0.5': '-50Hz', '0.75': '-25Hz', '1.0': '+0Hz', '1.25': '+25Hz', '1.5': '+50Hz', '2.0': '+100Hz'
+        }
+        volume_map = {
+            'silent': '-100%', 'x-soft': '-67%', 'soft': '-33%', 'medium': '+0%', 'loud': '+20%', 'x-loud': '+33%',
+            # Also handle numeric values that might be passed as strings
+            '0.5': '-50%', '0.75': '-25%', '1.0': '+0%', '1.25': '+25%', '1.5': '+50%', '2.0': '+100%'
+        }
+
+        return edge_tts.Communicate(
+            text=text,
+            voice=voice_id,
+            rate=speed_map.get(str(speed), '+0%'),
+            pitch=pitch_map.get(str(pitch), '+0Hz'),
+            volume=volume_map.get(str(volume), '+0%')
+        )
+
+    async def save(self, text, filepath, timer, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium'):
+        """Stream an AI Speaker synthesis into filepath, noting when the first audio arrives"""
+        start = time.perf_counter()
+        communicate = self.communicate(text, voice_id, speed, pitch, volume)
+        with open(filepath, 'wb') as f:
+            async for chunk in communicate.stream():
+                if chunk['type'] == 'audio':
+                    if 'upstream_first_byte' not in timer.stages:
+                        timer.add('upstream_first_byte', (time.perf_counter() - start) * 1000)
+                    f.write(chunk['data'])
+
+    async def collect(self, text, timer, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium'):
+        """Return the audio of an AI Speaker synthesis and its (offset, text) sentence boundaries"""
+        start = time.perf_counter()
+        audio = bytearray()
+        boundaries = []
+        communicate = self.communicate(text, voice_id, speed, pitch, volume)
+        async for chunk in communicate.stream():
+            if chunk['type'] == 'audio':
+                if 'upstream_first_byte' not in timer.stages:
+                    timer.add('upstream_first_byte', (time.perf_counter() - start) * 1000)
+                audio += chunk['data']
+            elif chunk['type'] in ('SentenceBoundary', 'WordBoundary'):
+                boundaries.append((chunk['offset'], chunk['text']))
+        return bytes(audio), boundaries
+
+    def result(self, filename, filepath, voice_id, timer):
+        # Verify the file was created
+        if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
+            return {
+                'success': True,
+                'filename': filename,
+                'service': f'AI Speaker ({voice_id})',
+                'timings': timer.stages
+            }
+        return {'success': False, 'error': 'Failed to generate audio file', 'error_type': 'empty_audio'}
+
+    def synthesize(self, text, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium', priority=False):
+        """Convert text to speech using AI Speaker service with edge-tts"""
+        try:
+            filename, filepath = self.output_file('ai_speaker')
+            timer = StageTimer()
+            
+            # Run the synthesis on the shared event loop
+            try:
+                timer.add('rate_limit', self.limiter.acquire(self.HOST, len(text), priority=priority) * 1000)
+                if cancellation.cancelled():
+                    return cancellation.cancelled_result()
+                with timer.stage('upstream'):
+                    self.runtime.run(
+                        self.save(text, filepath, timer, voice_id, speed, pitch, volume),
+                        timeout=self.timeout
+                    )
+            except CancelledError:
+                # A hedged request whose other copy won; its partial file must not be served
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                return cancellation.cancelled_result()
+            except TIMEOUT_ERRORS:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                return {'success': False, 'error': 'AI Speaker request timed out', 'error_type': 'timeout'}
+            except RateLimitTimeout as e:
+                return {'success': False, 'error': f'AI Speaker rate limit: {str(e)}', 'error_type': 'rate_limited'}
+            
+            return self.result(filename, filepath, voice_id, timer)
+                
+        except Exception as e:
+            return {'success': False, 'error': f'Error with AI Speaker: {str(e)}', 'error_type': 'exception'}
+
+    def synthesize_packed(self, texts, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium'):
+        """Synthesize several texts in one AI Speaker session and cut the audio into one file per text
+
+        On success the result's 'items' holds an ai_speaker-style result per text.
+        """
+        text = pack_text(texts)
+        timer = StageTimer()
+        try:
+            timer.add('rate_limit', self.limiter.acquire(self.HOST, len(text)) * 1000)
+            with timer.stage('upstream'):
+                audio, boundaries = self.runtime.run(
+                    self.collect(text, timer, voice_id, speed, pitch, volume),
+                    timeout=self.timeout
+                )
+        except TIMEOUT_ERRORS:
+            return {'success': False, 'error': 'AI Speaker request timed out', 'error_type': 'timeout'}
+        except RateLimitTimeout as e:
+            return {'success': False, 'error': f'AI Speaker rate limit: {str(e)}', 'error_type': 'rate_limited'}
+        except Exception as e:
+            return {'success': False, 'error': f'Error with AI Speaker: {str(e)}', 'error_type': 'exception'}
+
+        starts = item_starts(texts, boundaries)
+        if starts is None:
+            return {'success': False, 'error': 'Sentence boundaries do not match the packed texts', 'error_type': 'unaligned'}
+        parts = split_mp3(audio, [start / TICKS_PER_SECOND for start in starts[1:]])
+        if not all(parts):
+            return {'success': False, 'error': 'Failed to split the packed audio', 'error_type': 'empty_audio'}
+
+        items = []
+        with timer.stage('write'):
+            for part in parts:
+                filename, filepath = self.output_file('ai_speaker')
+                with open(filepath, 'wb') as f:
+                    f.write(part)
+                items.append({'success': True, 'filename': filename, 'service': f'AI Speaker ({voice_id})'})
+        for item in items:
+            item['timings'] = dict(timer.stages)
+        return {'success': True, 'items': items, 'timings': timer.stages}
+
+    async def synthesize_async(self, text, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium'):
+        """Like synthesize, but awaited directly on the caller's event loop"""
+        try:
+            filename, filepath = self.output_file('ai_speaker')
+            timer = StageTimer()
+
+            try:
+                timer.add('rate_limit', await self.limiter.acquire_async(self.HOST, len(text)) * 1000)
+                with timer.stage('upstream'):
+                    await asyncio.wait_for(
+                        self.save(text, filepath, timer, voice_id, speed, pitch, volume),
+                        self.timeout
+                    )
+            except asyncio.TimeoutError:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                return {'success': False, 'error': 'AI Speaker request timed out', 'error_type': 'timeout'}
+            except RateLimitTimeout as e:
+                return {'success': False, 'error': f'AI Speaker rate limit: {str(e)}', 'error_type': 'rate_limited'}
+
+            return self.result(filename, filepath, voice_id, timer)
+
+        except Exception as e:
+            return {'success': False, 'error': f'Error with AI Speaker: {str(e)}', 'error_type': 'exception'}
+
+    def stream(self, text, voice_id='zh-CN-XiaoxiaoNeural', speed='medium', pitch='medium', volume='medium', on_complete=None):
+        """Stream AI Speaker audio chunks as edge-tts produces them, teeing them to a file
+
+        Returns the output filename and a generator of MP3 chunks. Synthesis runs
+        on the shared event loop and finishes writing the file even if the consumer
+        stops reading; on_complete(filename) is called once the file is complete.
+        """
+        self.limiter.acquire(self.HOST, len(text))
+        filename, filepath = self.output_file('ai_speaker')
+        chunks = queue.Queue()
+
+        async def produce():
+            communicate = self.communicate(text, voice_id, speed, pitch, volume)
+            with open(filepath, 'wb') as f:
+                async for chunk in communicate.stream():
+                    if chunk['type'] == 'audio':
+                        f.write(chunk['data'])
+                        chunks.put(chunk['data'])
+
+        def finished(future):
+            error = future.exception() if not future.cancelled() else TimeoutError('stream cancelled')
+            if error is not None:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                chunks.put(error)
+                return
+            if on_complete is not None:
+                on_complete(filename)
+            chunks.put(None)
+
+        future = self.runtime.submit(asyncio.wait_for(produce(), self.timeout))
+        future.add_done_callback(finished)
+
+        def audio_chunks():
+            while True:
+                item = chunks.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+
+        return filename, audio_chunks()
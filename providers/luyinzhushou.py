@@ -0,0 +1,58 @@
+import requests
+from bs4 import BeautifulSoup
+
+from providers.base import Provider
+from rate_limiter import RateLimitTimeout
+
+
+class LuyinzhushouProvider(Provider):
+    """luyinzhushou.com's text-to-voice form: a CSRF token from the page, then the convert API"""
+
+    NAME = 'luyinzhushou'
+    HOST = 'www.luyinzhushou.com'
+    BATCH_CONCURRENCY = 1
+
+    PAGE_URL = 'https://www.luyinzhushou.com/text2voice/'
+    CONVERT_URL = 'https://www.luyinzhushou.com/voice/convert'
+
+    def synthesize(self, text, voice_id='zh-CN-YunxiNeural', speed='0%', pitch='0%', volume=None):
+        """Convert text to speech using luyinzhushou.com"""
+        try:
+            self.limiter.acquire(self.HOST, len(text))
+            # The token is tied to the session's cookies, so each conversion gets its own session
+            session = requests.Session()
+            main_page = session.get(self.PAGE_URL, headers=self.headers, timeout=self.http.timeout)
+            token = BeautifulSoup(main_page.text, 'html.parser').find('input', {'name': '_token'})
+            if token is None or not token.get('value'):
+                return {'success': False, 'error': 'Failed to get CSRF token', 'error_type': 'exception'}
+
+            data = {
+                '_token': token['value'],
+                'text': text,
+                'voice': voice_id,
+                'style': 'general',
+                'rate': speed,
+                'pitch': pitch,
+                'format': 'mp3',
+            }
+            response = session.post(self.CONVERT_URL, data=data, headers=self.headers, timeout=self.http.timeout)
+            if response.status_code != 200:
+                return {
+                    'success': False,
+                    'error': f'Error from luyinzhushou.com: {response.status_code}',
+                    'error_type': f'http_{response.status_code}'
+                }
+            result = response.json()
+            if result.get('status') != 'success' or not result.get('url'):
+                return {'success': False, 'error': f'Error from luyinzhushou.com: {result}', 'error_type': 'exception'}
+
+            audio = session.get(result['url'], headers=self.headers, timeout=self.http.timeout)
+            filename, filepath = self.output_file('luyinzhushou')
+            with open(filepath, 'wb') as f:
+                f.write(audio.content)
+            return {'success': True, 'filename': filename, 'service': f'LuYinZhuShou ({voice_id})'}
+
+        except RateLimitTimeout as e:
+            return {'success': False, 'error': f'luyinzhushou.com rate limit: {str(e)}', 'error_type': 'rate_limited'}
+        except Exception as e:
+            return {'success': False, 'error': f'Error with luyinzhushou.com: {str(e)}', 'error_type': 'exception'}
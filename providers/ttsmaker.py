@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+
+import requests
+
+import cancellation
+from providers.base import USER_AGENT, Provider
+from rate_limiter import RateLimitTimeout
+from stage_timer import StageTimer
+
+
+class TTSMakerProvider(Provider):
+    """The ttsmaker.cn HTTP API, over the shared keep-alive pool or an aiohttp session"""
+
+    NAME = 'ttsmaker'
+    HOST = 'ttsmaker.cn'
+    CAPABILITIES = frozenset({'async'})
+    BATCH_CONCURRENCY = 4
+
+    def __init__(self, output_dir, url='https://ttsmaker.cn/api/tts', **context):
+        super().__init__(output_dir, **context)
+        self.url = url
+
+    def request_form(self, text, voice_id, speed, pitch, volume):
+        """Form data and headers of a TTSMaker API request"""
+        data = {
+            'text': text,
+            'voice_id': voice_id,  # Use the actual voice ID from TTSMaker
+            'speed': speed,
+            'volume': volume,
+            'pitch': pitch,
+            'audio_format': 'mp3',
+            'audio_speed': speed,
+            'audio_volume': volume,
+            'audio_norm': '0',
+            'text_paragraph_pause_time': '0',
+            'background_music_volume': '0',
+            'background_music_speed': '1',
+            'speech_rate': speed,
+            'pitch_rate': pitch,
+        }
+
+        headers = {
+            'User-Agent': USER_AGENT,
+            'Accept': '*/*',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive',
+            'Referer': 'https://ttsmaker.cn/',
+            'Origin': 'https://ttsmaker.cn',
+            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'
+        }
+        return data, headers
+
+    def save_audio(self, content, voice_id, timer):
+        """Write a TTSMaker response body to a new output file and build the result"""
+        filename, filepath = self.output_file('ttsmaker')
+
+        # Save the audio response
+        with timer.stage('write'), open(filepath, 'wb') as f:
+            f.write(content)
+
+        # Verify the file was created
+        if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
+            return {
+                'success': True,
+                'filename': filename,
+                'service': f'TTSMaker (ID: {voice_id})',
+                'timings': timer.stages
+            }
+        return {'success': False, 'error': 'Failed to save audio file', 'error_type': 'empty_audio'}
+
+    def synthesize(self, text, voice_id=1504, speed=1.0, pitch=1.0, volume=1.0, priority=False):
+        """Convert text to speech using the real TTSMaker API"""
+        try:
+            timer = StageTimer()
+            data, headers = self.request_form(text, voice_id, speed, pitch, volume)
+            
+            # Wait for upstream capacity, then make the API request over the pooled keep-alive session
+            timer.add('rate_limit', self.limiter.acquire(self.HOST, len(text), priority=priority) * 1000)
+            if cancellation.cancelled():
+                return cancellation.cancelled_result()
+            with timer.stage('upstream'):
+                # Streamed so a cancelled caller can close the response while the body is read
+                response = self.http.post(self.url, data=data, headers=headers, stream=True)
+                cancellation.on_cancel(response.close)
+                try:
+                    content = response.content
+                except Exception:
+                    if cancellation.cancelled():
+                        return cancellation.cancelled_result()
+                    raise
+            timer.add('upstream_first_byte', response.elapsed.total_seconds() * 1000)
+            if cancellation.cancelled():
+                return cancellation.cancelled_result()
+            
+            if response.status_code == 200:
+                return self.save_audio(content, voice_id, timer)
+            else:
+                return {
+                    'success': False,
+                    'error': f'API request failed with status {response.status_code}',
+                    'error_type': f'http_{response.status_code}'
+                }
+                
+        except requests.Timeout:
+            return {'success': False, 'error': 'TTSMaker API request timed out', 'error_type': 'timeout'}
+        except requests.ConnectionError as e:
+            return {'success': False, 'error': f'Error with TTSMaker API: {str(e)}', 'error_type': 'connection'}
+        except RateLimitTimeout as e:
+            return {'success': False, 'error': f'TTSMaker rate limit: {str(e)}', 'error_type': 'rate_limited'}
+        except Exception as e:
+            return {'success': False, 'error': f'Error with TTSMaker API: {str(e)}', 'error_type': 'exception'}
+
+    async def synthesize_async(self, session, text, voice_id=1504, speed=1.0, pitch=1.0, volume=1.0):
+        """Like synthesize, but awaits the API over an aiohttp session instead of blocking a thread"""
+        # Only the async serving mode needs aiohttp
+        import aiohttp
+
+        try:
+            timer = StageTimer()
+            data, headers = self.request_form(text, voice_id, speed, pitch, volume)
+            # aiohttp only decodes brotli when the optional brotli package is installed
+            headers['Accept-Encoding'] = 'gzip, deflate'
+
+            timer.add('rate_limit', await self.limiter.acquire_async(self.HOST, len(text)) * 1000)
+            with timer.stage('upstream'):
+                start = time.perf_counter()
+                async with session.post(self.url, data=data, headers=headers) as response:
+                    timer.add('upstream_first_byte', (time.perf_counter() - start) * 1000)
+                    if response.status != 200:
+                        return {
+                            'success': False,
+                            'error': f'API request failed with status {response.status}',
+                            'error_type': f'http_{response.status}'
+                        }
+                    content = await response.read()
+            return self.save_audio(content, voice_id, timer)
+
+        except asyncio.TimeoutError:
+            return {'success': False, 'error': 'TTSMaker API request timed out', 'error_type': 'timeout'}
+        except aiohttp.ClientConnectionError as e:
+            return {'success': False, 'error': f'Error with TTSMaker API: {str(e)}', 'error_type': 'connection'}
+        except RateLimitTimeout as e:
+            return {'success': False, 'error': f'TTSMaker rate limit: {str(e)}', 'error_type': 'rate_limited'}
+        except Exception as e:
+            return {'success': False, 'error': f'Error with TTSMaker API: {str(e)}', 'error_type': 'exception'}
@@ -0,0 +1,285 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a request waited longer than allowed for upstream capacity"""
+
+
+class TokenBucket:
+    """Token bucket that admits a cost larger than its capacity once it is full, going into debt
+
+    The debt is paid back before anything else is admitted, so long texts are
+    charged in full and the average rate holds.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, cost, now):
+        """Seconds until cost tokens are available (0 if they are available now)"""
+        self._refill(now)
+        needed = min(cost, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def consume(self, cost):
+        self.tokens -= cost
+
+
+class SharedBuckets:
+    """Token bucket levels kept in a SQLite file, so that several processes draw from one budget
+
+    Each bucket's rate and capacity come from the local TokenBucket passed to
+    take(); only its current level and refill time live in the file.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def take(self, costs):
+        """Consume cost tokens from every bucket if all of them have enough
+
+        costs maps a bucket name to (TokenBucket, cost). Returns 0 once the
+        tokens are taken, otherwise the seconds until they would be available.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            # Lock the file for writing before reading, so no other process takes the same tokens
+            conn.execute('BEGIN IMMEDIATE')
+            levels = {}
+            delay = 0.0
+            for name, (bucket, cost) in costs.items():
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE name = ?', (name,)).fetchone()
+                tokens = bucket.capacity
+                if row is not None:
+                    tokens = min(bucket.capacity, row[0] + max(0.0, now - row[1]) * bucket.rate)
+                # Costs over the capacity are admitted from a full bucket and charged in full (see TokenBucket)
+                needed = min(cost, bucket.capacity)
+                if tokens < needed:
+                    delay = max(delay, (needed - tokens) / bucket.rate)
+                levels[name] = (tokens, cost)
+            conn.executemany(
+                'INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)',
+                [(name, tokens - cost if delay <= 0 else tokens, now) for name, (tokens, cost) in levels.items()]
+            )
+        return delay
+
+
+class HostLimiter:
+    """Request and character token buckets for one upstream host with FIFO queued admission
+
+    Callers that find the buckets empty wait in line instead of failing, up to
+    max_wait seconds, so sustained traffic stays just under the upstream limit.
+    With shared (a SharedBuckets), the token levels are shared with every other
+    process using the same file; the waiting line stays per process.
+    """
+
+    def __init__(self, host, requests_per_second, chars_per_second, burst_requests=None, burst_chars=None, max_wait=30.0,
+                 shared=None):
+        self.host = host
+        self.max_wait = max_wait
+        self.shared = shared
+        self.requests = TokenBucket(requests_per_second, burst_requests)
+        self.chars = TokenBucket(chars_per_second, burst_chars)
+        self.admitted = 0
+        self.rejected = 0
+        self.peak_waiting = 0
+        self.total_wait = 0.0
+        self._queue = deque()
+        self._priority = set()
+        self._cond = threading.Condition()
+
+    def _admit(self, ticket, chars, start, now):
+        """Admit ticket if it is first in line and tokens are available
+
+        Returns (waited, delay): waited is set once admitted, otherwise delay is
+        the time until the tokens are available, or None if ticket is not first.
+        """
+        if self._queue[0] is not ticket:
+            return None, None
+        delay = self._take(chars, now)
+        if delay > 0:
+            return None, delay
+        waited = now - start
+        self.admitted += 1
+        self.total_wait += waited
+        return waited, None
+
+    def _take(self, chars, now):
+        """Consume one request and chars characters if available; returns 0 or the seconds to wait"""
+        if self.shared is not None:
+            return self.shared.take({
+                f'{self.host}/requests': (self.requests, 1),
+                f'{self.host}/chars': (self.chars, chars),
+            })
+        delay = max(self.requests.time_until(1, now), self.chars.time_until(chars, now))
+        if delay <= 0:
+            self.requests.consume(1)
+            self.chars.consume(chars)
+        return delay
+
+    def _enqueue(self, priority=False):
+        ticket = object()
+        if priority:
+            # Ahead of every ordinary caller, behind earlier priority callers
+            index = 0
+            while index < len(self._queue) and self._queue[index] in self._priority:
+                index += 1
+            self._priority.add(ticket)
+            self._queue.insert(index, ticket)
+        else:
+            self._queue.append(ticket)
+        self.peak_waiting = max(self.peak_waiting, len(self._queue))
+        return ticket
+
+    def _leave(self, ticket):
+        self._queue.remove(ticket)
+        self._priority.discard(ticket)
+        self._cond.notify_all()
+
+    def _reject(self, timeout):
+        self.rejected += 1
+        return RateLimitTimeout(f'waited {timeout:.1f}s for {self.host} capacity')
+
+    def acquire(self, chars=0, timeout=None, priority=False):
+        """Block until one request and chars characters may be sent; returns seconds waited
+
+        A priority caller joins the line ahead of the ordinary callers.
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        with self._cond:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    now = time.monotonic()
+                    waited, delay = self._admit(ticket, chars, start, now)
+                    if waited is not None:
+                        return waited
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise self._reject(timeout)
+                    self._cond.wait(remaining if delay is None else min(delay, remaining))
+            finally:
+                self._leave(ticket)
+
+    def _poll(self, ticket, chars, start):
+        """Try to admit ticket; returns (now, waited, delay) with a delay for callers not yet first in line"""
+        now = time.monotonic()
+        waited, delay = self._admit(ticket, chars, start, now)
+        if waited is None and delay is None:
+            delay = max(0.01, self._queue.index(ticket) / self.requests.rate)
+        return now, waited, delay
+
+    async def _locked(self, fn, *args):
+        """Call fn under the lock; off the event loop when the buckets are shared
+
+        Shared buckets are taken in a SQLite transaction that may wait on other
+        processes, and a thread holding the lock may be doing so, so neither may
+        block the loop.
+        """
+        def call():
+            with self._cond:
+                return fn(*args)
+
+        if self.shared is None:
+            return call()
+        return await asyncio.get_running_loop().run_in_executor(None, call)
+
+    async def acquire_async(self, chars=0, timeout=None):
+        """Like acquire, but waits by sleeping the calling coroutine instead of blocking a thread
+
+        Coroutines share the FIFO line with blocking callers. A coroutine behind
+        others sleeps for about as long as those ahead of it need to be admitted.
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        ticket = await self._locked(self._enqueue)
+        try:
+            while True:
+                now, waited, delay = await self._locked(self._poll, ticket, chars, start)
+                if waited is not None:
+                    return waited
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise await self._locked(self._reject, timeout)
+                await asyncio.sleep(min(delay, remaining))
+        finally:
+            await self._locked(self._leave, ticket)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'waiting': len(self._queue),
+                'peak_waiting': self.peak_waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'average_wait': self.total_wait / self.admitted if self.admitted else 0.0,
+                'requests_per_second': self.requests.rate,
+                'chars_per_second': self.chars.rate,
+                'shared': self.shared is not None,
+            }
+
+
+class RateLimiter:
+    """Per-host limiters that TTSConverter upstream calls are admitted through
+
+    limits maps a host name to a dict of HostLimiter options; hosts without an
+    entry are not limited. With shared_path, the buckets live in that SQLite
+    file and are shared by every process pointing at it.
+    """
+
+    def __init__(self, limits, max_wait=30.0, shared_path=None):
+        shared = SharedBuckets(shared_path) if shared_path else None
+        self.limiters = {
+            host: HostLimiter(host, max_wait=options.get('max_wait', max_wait), shared=shared, **{
+                key: value for key, value in options.items() if key != 'max_wait'
+            })
+            for host, options in limits.items()
+        }
+
+    def acquire(self, host, chars=0, timeout=None, priority=False):
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            return 0.0
+        return limiter.acquire(chars, timeout, priority)
+
+    async def acquire_async(self, host, chars=0, timeout=None):
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            return 0.0
+        return await limiter.acquire_async(chars, timeout)
+
+    def stats(self):
+        return {host: limiter.stats() for host, limiter in self.limiters.items()}
@@ -62,9 +62,15 @@ else
     echo "✅ Port 5001 is free"
 fi
 
-# Run the Flask application in the background
-echo "🎬 Starting Flask application on port 5001..."
-python app.py &
+# Run the application in the background: preforked workers (TTS_WORKERS, default one per CPU),
+# on asyncio with TTS_SERVER_MODE=async, or the Flask debug server with TTS_SERVER_MODE=debug
+if [ "$TTS_SERVER_MODE" = "debug" ]; then
+    echo "🎬 Starting Flask debug server on port 5001..."
+    python app.py &
+else
+    echo "🎬 Starting ${TTS_WORKERS:-$(nproc)} worker processes on port 5001..."
+    python prefork.py --port 5001 &
+fi
 
 # Get the process ID of the Flask app
 FLASK_PID=$!
@@ -0,0 +1,91 @@
+import asyncio
+import copy
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key share its result
+
+    Each caller gets its own deep copy of the result, so callers may annotate
+    it freely. An exception raised by the call is raised in every caller.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Return (result, shared): shared is True when another caller's call produced it"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return copy.deepcopy(call.result), False
+
+    def stats(self):
+        with self._lock:
+            return {'leaders': self.leaders, 'followers': self.followers, 'in_flight': len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop
+
+    The call runs as a task of its own, so it carries on for the other
+    callers when the caller that started it is cancelled.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self._calls = {}
+
+    async def do(self, key, coro_fn):
+        """Await coro_fn() once per key at a time; returns (result, shared)"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.followers += 1
+        else:
+            self.leaders += 1
+            task = self._calls[key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda done: self._finished(key, done))
+        # shield: a caller that is cancelled must not cancel the call the others wait for
+        return copy.deepcopy(await asyncio.shield(task)), shared
+
+    def _finished(self, key, task):
+        del self._calls[key]
+        if not task.cancelled():
+            # Keep an exception nobody else awaited from being reported as never retrieved
+            task.exception()
+
+    def stats(self):
+        return {'leaders': self.leaders, 'followers': self.followers, 'in_flight': len(self._calls)}
@@ -0,0 +1,57 @@
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('tts.timing')
+
+
+class StageTimer:
+    """Accumulates how long each stage of a request took, in milliseconds"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name, milliseconds):
+        self.stages[name] = self.stages.get(name, 0.0) + milliseconds
+
+    def merge(self, timings):
+        """Add stage timings reported by a converter result"""
+        for name, milliseconds in (timings or {}).items():
+            self.add(name, milliseconds)
+
+    def as_dict(self):
+        timings = {name: round(ms, 2) for name, ms in self.stages.items()}
+        timings['total'] = round((time.perf_counter() - self.started) * 1000, 2)
+        return timings
+
+    def header(self, timings=None):
+        """Render the stages as a Server-Timing header value"""
+        timings = timings or self.as_dict()
+        return ', '.join(f'{name};dur={ms:.2f}' for name, ms in timings.items())
+
+
+def merge_parallel(timings_list):
+    """Combine the timings of stages that ran in parallel by keeping the slowest of each"""
+    merged = {}
+    for timings in timings_list:
+        for name, milliseconds in (timings or {}).items():
+            merged[name] = max(merged.get(name, 0.0), milliseconds)
+    return merged
+
+
+def log_sampled(timings, sample_rate, **fields):
+    """Write a JSON line with the stage timings for a random sample of requests"""
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return
+    logger.info(json.dumps(dict(fields, timings=timings), ensure_ascii=False, default=str))
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import threading
+import time
+
+
+class SynthesisCache:
+    """Content-addressed cache of synthesized MP3 files kept in the audio store
+
+    Each entry is stored under the hash of its synthesis parameters, so a
+    lookup is a single stat of a known path; size and idle-time eviction are
+    handled by the store's sweeper.
+    """
+
+    def __init__(self, store, max_age=7 * 24 * 3600):
+        self.store = store
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(service, text, voice_id, speed, pitch, volume):
+        """Hash the full set of synthesis parameters into a cache key"""
+        payload = json.dumps(
+            [service, str(voice_id), str(speed), str(pitch), str(volume), text],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def filename_for(self, key):
+        return f'{key}.mp3'
+
+    def get(self, key):
+        """Return the cached filename for a key, or None on a miss"""
+        filename = self.filename_for(key)
+        st = self.store.stat(filename, touch=True)
+        if st is not None and time.time() - st.st_mtime > self.max_age:
+            self.store.remove(filename)
+            st = None
+
+        with self._lock:
+            if st is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return filename
+
+    def put(self, key, path):
+        """Move a freshly synthesized file into the store and return its cached name"""
+        return self.store.adopt(path, self.filename_for(key))
+
+    def stats(self):
+        store_stats = self.store.stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': store_stats['files'],
+                'bytes': store_stats['bytes'],
+                'max_bytes': store_stats['max_bytes'],
+                'max_age': self.max_age,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': store_stats['evictions'],
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the Flask app's request handling
+"""
+
+import os
+import subprocess
+import sys
+import uuid
+
+import edge_tts
+import pytest
+
+import app
+import cancellation
+from fake_upstreams import FakeEdgeTTS, FakeTTSMaker, Profile
+from mp3_utils import duration, iter_frames
+from single_flight import AsyncSingleFlight
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    edge = FakeEdgeTTS(Profile(latency=0, jitter=0)).start()
+    maker = FakeTTSMaker(Profile(latency=0, jitter=0)).start()
+    monkeypatch.setattr(edge_tts.communicate, 'WSS_URL', edge.url)
+    monkeypatch.setattr(app.tts_converter.providers.get('ttsmaker'), 'url', maker.url)
+    yield edge, maker
+    edge.stop()
+    maker.stop()
+
+
+def test_metric_labels_only_use_accepted_values():
+    labels = app.request_metric_labels
+    assert labels({'service': 'ttsmaker', 'voice_id': '1504'}) == ('ttsmaker', '1504')
+    assert labels({'service': 'ai_speaker'}) == ('ai_speaker', 'default')
+    assert labels({'service': 'ai_speaker', 'voice_id': 'made-up-voice'}) == ('ai_speaker', 'unknown')
+    assert labels({'service': 'ttsmaker', 'voice_id': 'abc'}) == ('ttsmaker', 'unknown')
+    assert labels({'service': 'ai_speaker', 'voice_id': ['zh-CN-XiaoxiaoNeural']}) == ('ai_speaker', 'unknown')
+    assert labels({'service': 'made-up-service'}) == ('unknown', 'unknown')
+    assert labels({'service': ['ttsmaker']}) == ('unknown', 'unknown')
+    assert labels(['ttsmaker']) == ('unknown', 'unknown')
+    assert labels(None) == ('unknown', 'unknown')
+
+
+@pytest.mark.parametrize('endpoint', ['/api/convert', '/api/convert/progressive', '/api/jobs', '/api/convert/stream'])
+@pytest.mark.parametrize('fields', [
+    {'service': 'ai_speaker', 'voice_id': ['zh-CN-XiaoxiaoNeural']},
+    {'service': 'ttsmaker', 'voice_id': {'id': 1504}},
+    {'service': 'ai_speaker', 'speed': ['fast']},
+])
+def test_non_scalar_parameters_are_rejected_with_400(endpoint, fields):
+    response = app.app.test_client().post(endpoint, json=dict(fields, text='你好。'))
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith(('参数无效', '流式转换仅支持'))
+
+
+def test_coalesced_stats_include_the_async_server(monkeypatch):
+    flight = AsyncSingleFlight()
+    flight.leaders, flight.followers = 2, 3
+    monkeypatch.setattr(app, 'single_flights', [app.single_flight, flight])
+    stats = app.coalesced_stats()
+    assert stats['followers'] == app.single_flight.followers + 3
+    assert stats['leaders'] == app.single_flight.leaders + 2
+    assert 'tts_coalesced_requests_total %d' % stats['followers'] in app.metrics.render()
+
+
+def test_batch_reports_each_item_in_order(upstreams):
+    edge, maker = upstreams
+    # Fresh texts, so the items are synthesized rather than served from an earlier run's cache
+    tag = uuid.uuid4().hex[:6]
+    texts = [f'短句{tag}。', f'这一句要长一些{tag}。', f'这一句比前面两句都要长很多很多{tag}。']
+    items = [
+        {'service': 'ai_speaker', 'text': texts[0], 'voice_id': 'zh-CN-XiaoxiaoNeural'},
+        {'service': ['ai_speaker'], 'text': '服务不是字符串。'},
+        {'service': 'ai_speaker', 'text': texts[1], 'voice_id': 'zh-CN-XiaoxiaoNeural'},
+        {'service': 'ai_speaker', 'text': '音色不是字符串。', 'voice_id': {'name': 'zh-CN-XiaoxiaoNeural'}},
+        'not an item',
+        {'service': 'ttsmaker', 'text': f'TTSMaker {tag}'},
+        {'service': 'made-up', 'text': '没有这个服务。'},
+        {'service': 'ai_speaker', 'text': texts[2], 'voice_id': 'zh-CN-XiaoxiaoNeural'},
+        {'service': 'ai_speaker', 'text': '   '},
+    ]
+
+    response = app.app.test_client().post('/api/convert/batch', json={'items': items})
+    assert response.status_code == 200
+    body = response.get_json()
+    results = body['results']
+    assert [result['index'] for result in results] == list(range(len(items)))
+    assert [result['success'] for result in results] == [True, False, True, False, False, True, False, True, False]
+    assert (body['succeeded'], body['failed'], body['success']) == (4, 5, False)
+    assert results[1]['error'] == results[6]['error'] == '不支持的TTS服务'
+    assert results[3]['error'] == '参数无效: voice_id'
+    assert results[4]['error'] == '无效的条目'
+    assert results[8]['error'] == '请输入要转换的文本'
+
+    # The three AI Speaker texts shared one edge-tts session, and each got back the audio of its own text
+    assert edge.sessions == 1 and maker.requests == 1
+    with open(app.audio_store.resolve(results[0]['filename']), 'rb') as f:
+        short = duration(f.read())
+    with open(app.audio_store.resolve(results[2]['filename']), 'rb') as f:
+        medium = duration(f.read())
+    with open(app.audio_store.resolve(results[7]['filename']), 'rb') as f:
+        long = duration(f.read())
+    assert short < medium < long
+
+
+def test_only_worker_zero_sweeps_the_shared_audio_directory(tmp_path):
+    env = dict(
+        os.environ, TTS_AUDIO_DIR=str(tmp_path / 'audio'), TTS_JOB_DB=str(tmp_path / 'jobs.db'),
+        TTS_VOICE_SNAPSHOT=str(tmp_path / 'voices.json'), TTS_VOICE_REFRESH_INTERVAL='0'
+    )
+    check = 'import app; print(app.audio_store._sweeper is not None)'
+    for worker_id, sweeps in [('0', 'True'), ('1', 'False')]:
+        output = subprocess.run(
+            [sys.executable, '-c', check], env=dict(env, TTS_WORKER_ID=worker_id),
+            capture_output=True, text=True, check=True
+        ).stdout
+        assert output.strip().splitlines()[-1] == sweeps
+
+
+def test_segment_workers_see_the_callers_cancellation(monkeypatch):
+    monkeypatch.setitem(app.app.config, 'CHUNK_CONCURRENCY', 1)
+    token = cancellation.Cancellation()
+    calls = []
+
+    def call_converter(service, text, params, priority=False):
+        # The hedged request's other copy wins while the first segment is being synthesized
+        calls.append(text)
+        token.cancel()
+        return cancellation.cancelled_result()
+
+    monkeypatch.setattr(app, 'call_converter', call_converter)
+    segments = [f'第{index}句{uuid.uuid4().hex}。' for index in range(4)]
+    with cancellation.scope(token):
+        results = app.synthesize_segments('ttsmaker', segments, app.parse_conversion_params('ttsmaker', {}))
+    assert calls == segments[:1]
+    assert [result['error_type'] for result in results] == ['cancelled'] * 4
+
+
+def test_stream_sends_mp3_frames_as_they_arrive_and_caches_the_file(upstreams):
+    # Long enough for the stand-in to send its audio in several messages
+    text = '这是一段用来测试流式转换的比较长的文本。' * 4 + uuid.uuid4().hex
+    response = app.app.test_client().post('/api/convert/stream', json={'service': 'ai_speaker', 'text': text})
+    assert response.status_code == 200
+    assert response.mimetype == 'audio/mpeg' and response.is_streamed
+    chunks = list(response.response)
+    assert len(chunks) > 1
+    audio = b''.join(chunks)
+    frames = list(iter_frames(audio))
+    assert frames and sum(header.length for _, header in frames) == len(audio)
+
+    download = app.app.test_client().get(response.headers['X-Download-Url'])
+    assert download.status_code == 200 and download.data == audio
+
+
+def test_stream_reports_an_upstream_failure_before_the_first_byte(monkeypatch):
+    edge = FakeEdgeTTS(Profile(latency=0, jitter=0, error_rate=1.0)).start()
+    monkeypatch.setattr(edge_tts.communicate, 'WSS_URL', edge.url)
+    try:
+        response = app.app.test_client().post(
+            '/api/convert/stream', json={'service': 'ai_speaker', 'text': f'失败{uuid.uuid4().hex}。'}
+        )
+    finally:
+        edge.stop()
+    assert response.status_code == 502
+    assert response.get_json()['success'] is False
+
+
+def test_stream_cut_mid_way_is_not_cached(monkeypatch):
+    class BrokenCommunicate:
+        async def stream(self):
+            yield {'type': 'audio', 'data': b'\xff\xfb\x90\x64' + b'\x00' * 413}
+            raise ConnectionResetError('upstream went away')
+
+    provider = app.tts_converter.providers.get('ai_speaker')
+    monkeypatch.setattr(provider, 'communicate', lambda *args: BrokenCommunicate())
+    text = f'中途失败{uuid.uuid4().hex}。'
+    response = app.app.test_client().post('/api/convert/stream', json={'service': 'ai_speaker', 'text': text})
+    assert response.status_code == 200
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'\xff\xfb')
+    with pytest.raises(ConnectionResetError):
+        next(chunks)
+    key = app.SynthesisCache.make_key('ai_speaker', text, **app.parse_conversion_params('ai_speaker', {}))
+    assert app.synthesis_cache.get(key) is None
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the shared background event loop
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from async_runtime import AsyncLoopThread
+
+
+def test_coroutines_from_many_threads_share_one_loop():
+    runtime = AsyncLoopThread()
+    loops = []
+
+    async def work():
+        loops.append(asyncio.get_running_loop())
+        await asyncio.sleep(0.01)
+
+    threads = [threading.Thread(target=runtime.run, args=(work(),)) for _ in range(20)]
+    [thread.start() for thread in threads]
+    [thread.join() for thread in threads]
+    assert len(loops) == 20
+    assert len(set(map(id, loops))) == 1
+    runtime.stop()
+
+
+def test_concurrency_limit():
+    runtime = AsyncLoopThread(max_concurrency=2)
+    peak = []
+
+    async def work():
+        peak.append(runtime.in_flight)
+        await asyncio.sleep(0.02)
+
+    futures = [runtime.submit(work()) for _ in range(6)]
+    [future.result(2) for future in futures]
+    assert max(peak) == 2
+    runtime.stop()
+
+
+def test_timeout_cancels_coroutine():
+    runtime = AsyncLoopThread()
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        runtime.run(slow(), timeout=0.05)
+    assert cancelled.wait(1)
+    runtime.stop()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the native asyncio serving mode
+"""
+
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import app as tts_app
+import async_server
+
+
+def test_request_metrics_are_labelled_with_accepted_values_only():
+    async def run():
+        async with TestClient(TestServer(async_server.create_app())) as client:
+            response = await client.post(
+                '/api/convert', json={'service': 'ai_speaker', 'text': '你好。', 'voice_id': 'zz-evil-0'}
+            )
+            assert response.status == 400
+            response = await client.post('/api/convert', json={'service': 'zz-evil-service', 'text': '你好。'})
+            assert response.status == 400
+
+    asyncio.run(run())
+    rendered = tts_app.metrics.render()
+    assert 'zz-evil' not in rendered
+    assert 'tts_request_duration_seconds_count{endpoint="convert_text",service="ai_speaker",voice="unknown"}' in rendered
+
+
+def test_non_scalar_voice_is_rejected_with_400():
+    async def run():
+        async with TestClient(TestServer(async_server.create_app())) as client:
+            response = await client.post(
+                '/api/convert', json={'service': 'ai_speaker', 'text': '你好。', 'voice_id': ['zh-CN-XiaoxiaoNeural']}
+            )
+            return response.status, await response.json()
+
+    status, body = asyncio.run(run())
+    assert status == 400 and body['error'] == '参数无效: voice_id'
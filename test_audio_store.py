@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the sharded audio store
+"""
+
+import os
+import time
+
+from audio_store import AudioStore
+
+
+def age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_files_are_sharded(tmp_path):
+    store = AudioStore(str(tmp_path))
+    name = store.put_bytes(b'abc')
+    path = store.resolve(name)
+    relative = os.path.relpath(path, str(tmp_path)).split(os.sep)
+    assert len(relative) == 3 and len(relative[0]) == 2 and len(relative[1]) == 2
+    assert relative[2] == name
+
+
+def test_generated_names_do_not_collide(tmp_path):
+    store = AudioStore(str(tmp_path))
+    names = {store.put_bytes(b'x') for _ in range(200)}
+    assert len(names) == 200
+
+
+def test_resolve_rejects_path_traversal(tmp_path):
+    store = AudioStore(str(tmp_path))
+    assert store.resolve('../secret.mp3') is None
+    assert store.resolve('a/b.mp3') is None
+
+
+def test_legacy_flat_files_resolve(tmp_path):
+    (tmp_path / 'tts_output_1.mp3').write_bytes(b'old')
+    store = AudioStore(str(tmp_path))
+    assert store.resolve('tts_output_1.mp3') == str(tmp_path / 'tts_output_1.mp3')
+
+
+def test_sweep_removes_idle_files(tmp_path):
+    store = AudioStore(str(tmp_path), ttl=60)
+    old = store.put_bytes(b'old')
+    fresh = store.put_bytes(b'fresh')
+    age(store.shard_path(old), 120)
+
+    assert store.sweep() == 1
+    assert store.resolve(old) is None
+    assert store.resolve(fresh) is not None
+
+
+def test_sweep_enforces_quota_least_recently_used_first(tmp_path):
+    store = AudioStore(str(tmp_path), max_bytes=25)
+    names = [store.put_bytes(b'x' * 10) for _ in range(3)]
+    age(store.shard_path(names[0]), 300)
+    age(store.shard_path(names[1]), 200)
+    age(store.shard_path(names[2]), 100)
+    store.stat(names[0], touch=True)
+
+    store.sweep()
+    assert store.resolve(names[1]) is None
+    assert store.resolve(names[0]) is not None
+    assert store.stats()['bytes'] == 20
+    assert store.stats()['files'] == 2
+
+
+def test_etag_is_content_hash_and_tracks_rewrites(tmp_path):
+    import hashlib
+    store = AudioStore(str(tmp_path))
+    path = store.resolve(store.put_bytes(b'abc'))
+    assert store.etag(path) == hashlib.sha256(b'abc').hexdigest()
+
+    with open(path, 'wb') as f:
+        f.write(b'abcd')
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    assert store.etag(path) == hashlib.sha256(b'abcd').hexdigest()
+
+
+def test_adopting_over_an_existing_name_replaces_its_size(tmp_path):
+    store = AudioStore(str(tmp_path))
+    name = store.put_bytes(b'x' * 10)
+    assert store.put_bytes(b'y' * 4, name) == name
+    assert (store.stats()['files'], store.stats()['bytes']) == (1, 4)
+    with open(store.resolve(name), 'rb') as f:
+        assert f.read() == b'y' * 4
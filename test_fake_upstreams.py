@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the local TTSMaker and edge-tts stand-ins
+"""
+
+import asyncio
+
+import edge_tts
+import pytest
+import requests
+
+from fake_upstreams import FakeEdgeTTS, FakeTTSMaker, Profile
+from mp3_utils import duration
+
+
+@pytest.fixture
+def edge_server(monkeypatch):
+    server = FakeEdgeTTS(Profile(latency=0, jitter=0)).start()
+    monkeypatch.setattr(edge_tts.communicate, 'WSS_URL', server.url)
+    yield server
+    server.stop()
+
+
+def test_fake_ttsmaker_returns_audio_sized_to_the_text():
+    server = FakeTTSMaker(Profile(latency=0, jitter=0, seconds_per_char=0.1)).start()
+    try:
+        response = requests.post(server.url, data={'text': '你好世界你好世界你好', 'voice_id': 1504})
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == 'audio/mpeg'
+        assert duration(response.content) == pytest.approx(1.0, abs=0.03)
+        assert server.requests == 1
+    finally:
+        server.stop()
+
+
+def test_fake_ttsmaker_injects_errors():
+    server = FakeTTSMaker(Profile(latency=0, jitter=0, error_rate=1.0)).start()
+    try:
+        assert requests.post(server.url, data={'text': 'x'}).status_code == 500
+        assert server.errors == 1
+    finally:
+        server.stop()
+
+
+def test_edge_tts_client_streams_audio_and_boundaries(edge_server):
+    async def synthesize():
+        communicate = edge_tts.Communicate('第一句。第二句话！', 'zh-CN-XiaoxiaoNeural')
+        audio = b''
+        boundaries = []
+        async for chunk in communicate.stream():
+            if chunk['type'] == 'audio':
+                audio += chunk['data']
+            else:
+                boundaries.append(chunk)
+        return audio, boundaries
+
+    audio, boundaries = asyncio.run(synthesize())
+    assert [b['text'] for b in boundaries] == ['第一句。', '第二句话！']
+    assert boundaries[1]['offset'] == boundaries[0]['duration']
+    end = (boundaries[1]['offset'] + boundaries[1]['duration']) / 10_000_000
+    assert duration(audio) == pytest.approx(end, abs=0.01)
+    assert edge_server.sessions == 1
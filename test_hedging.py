@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Offline tests for hedged synthesis requests
+"""
+
+import threading
+import time
+
+import cancellation
+
+from hedging import Hedger
+from provider_router import ProviderRouter
+
+
+def make_hedger(**options):
+    router = ProviderRouter(
+        providers=['primary', 'backup'],
+        fallbacks={'primary': ['backup']},
+        translate=lambda service, params, target: dict(params)
+    )
+    return Hedger(router, **options)
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = make_hedger(max_delay=1)
+    calls = []
+    result = hedger.call('primary', 'hi', {}, lambda service, text, params: calls.append(service) or {'success': True})
+    assert result['provider'] == 'primary' and not result['hedged']
+    assert calls == ['primary']
+    assert hedger.stats()['hedges_fired'] == 0
+
+
+def test_stalled_primary_loses_to_backup():
+    hedger = make_hedger(max_delay=0.05)
+
+    def convert(service, text, params):
+        time.sleep(1 if service == 'primary' else 0.01)
+        return {'success': True, 'filename': f'{service}.mp3'}
+
+    start = time.monotonic()
+    result = hedger.call('primary', 'hi', {}, convert)
+    assert time.monotonic() - start < 0.5
+    assert result['provider'] == 'backup'
+    assert result['hedged'] and result['fallback_from'] == 'primary'
+    stats = hedger.stats()
+    assert stats['hedges_fired'] == 1 and stats['hedges_won'] == 1
+
+
+def test_hedge_delay_follows_recent_latency():
+    hedger = make_hedger(percentile=95, min_delay=0.01, max_delay=10)
+    for _ in range(50):
+        hedger.router.health['primary'].record(True, 0.2)
+    assert hedger.delay_for('primary') == 0.2
+    assert hedger.delay_for('backup') == 10
+
+
+def test_same_provider_is_used_without_equivalent():
+    router = ProviderRouter(providers=['solo'], fallbacks={}, translate=lambda *args: None)
+    hedger = Hedger(router, max_delay=0.05)
+    calls = []
+
+    def convert(service, text, params):
+        calls.append(service)
+        time.sleep(0.5 if len(calls) == 1 else 0.01)
+        return {'success': True}
+
+    assert hedger.call('solo', 'hi', {}, convert)['provider'] == 'solo'
+    assert calls == ['solo', 'solo']
+
+
+def test_in_flight_loser_is_cancelled():
+    hedger = make_hedger(max_delay=0.05)
+    stopped = threading.Event()
+
+    def convert(service, text, params):
+        if service == 'primary':
+            cancellation.on_cancel(stopped.set)
+            stopped.wait(2)
+            return cancellation.cancelled_result()
+        return {'success': True}
+
+    assert hedger.call('primary', 'hi', {}, convert)['provider'] == 'backup'
+    assert stopped.wait(1)
+    time.sleep(0.05)
+    # Being cancelled is not the primary's fault
+    assert hedger.router.health['primary'].requests == 0
+
+
+def test_retry_after_a_fast_failure_is_not_counted_as_a_hedge():
+    hedger = make_hedger(max_delay=1)
+
+    def convert(service, text, params):
+        return {'success': service == 'backup', 'error': 'boom'}
+
+    result = hedger.call('primary', 'hi', {}, convert)
+    assert result['provider'] == 'backup' and not result['hedged']
+    stats = hedger.stats()
+    assert stats['requests'] == 1 and stats['hedges_fired'] == 0 and stats['hedges_won'] == 0
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the shared keep-alive HTTP pool
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_pool import HTTPPool
+
+
+@pytest.fixture
+def server():
+    """A local keep-alive server that records client ports and peak concurrency"""
+    stats = {'ports': set(), 'active': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            with lock:
+                stats['ports'].add(self.client_address[1])
+                stats['active'] += 1
+                stats['peak'] = max(stats['peak'], stats['active'])
+            time.sleep(0.05)
+            with lock:
+                stats['active'] -= 1
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'ok')
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_port}', stats
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_one_session_per_host():
+    pool = HTTPPool()
+    first = pool.session_for('https://ttsmaker.cn/api/tts')
+    assert pool.session_for('https://ttsmaker.cn/voices') is first
+    assert pool.session_for('https://www.luyinzhushou.com/voice/convert') is not first
+    assert sorted(pool.hosts()) == ['https://ttsmaker.cn', 'https://www.luyinzhushou.com']
+    pool.close()
+    assert pool.hosts() == []
+
+
+def test_requests_reuse_connections_within_the_pool_limit(server):
+    url, stats = server
+    pool = HTTPPool(pool_size=2)
+    adapter = pool.session_for(url).get_adapter(url)
+    assert adapter._pool_maxsize == 2 and adapter._pool_block
+
+    with ThreadPoolExecutor(max_workers=8) as threads:
+        responses = list(threads.map(lambda _: pool.get(url + '/tts'), range(16)))
+    assert all(response.text == 'ok' for response in responses)
+    # Sixteen requests from eight threads went over at most two connections, never more at once
+    assert stats['peak'] <= 2
+    assert len(stats['ports']) <= 2
+    pool.close()
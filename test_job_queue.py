@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the persistent synthesis job queue
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+from job_queue import JobQueue
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['state'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError('job did not finish')
+
+
+def test_job_succeeds_with_timings(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), lambda payload: {'success': True, 'filename': payload['text'] + '.mp3'})
+    job = wait_for(queue, queue.submit({'text': 'hello'}))
+    assert job['state'] == 'succeeded'
+    assert job['filename'] == 'hello.mp3'
+    assert job['queue_time'] >= 0 and job['run_time'] >= 0
+    queue.shutdown()
+
+
+def test_failures_and_exceptions_are_recorded(tmp_path):
+    def handler(payload):
+        if payload['raise']:
+            raise RuntimeError('boom')
+        return {'success': False, 'error': 'upstream 500'}
+
+    queue = JobQueue(str(tmp_path / 'jobs.db'), handler)
+    assert wait_for(queue, queue.submit({'raise': False}))['error'] == 'upstream 500'
+    assert wait_for(queue, queue.submit({'raise': True}))['error'] == 'boom'
+    queue.shutdown()
+
+
+def test_unknown_job_returns_none(tmp_path):
+    assert JobQueue(str(tmp_path / 'jobs.db'), lambda payload: {}).get('missing') is None
+
+
+def test_queued_jobs_survive_restart(tmp_path):
+    db = str(tmp_path / 'jobs.db')
+    queue = JobQueue(db, lambda payload: time.sleep(0.2) or {'success': True, 'filename': 'a.mp3'}, workers=1)
+    queue.submit({})
+    pending = queue.submit({})
+    queue.shutdown(wait=False)
+    assert os.path.exists(db)
+
+    restarted = JobQueue(db, lambda payload: {'success': True, 'filename': 'b.mp3'})
+    assert wait_for(restarted, pending)['state'] == 'succeeded'
+    restarted.shutdown()
+
+
+def test_sweep_fails_and_adopts_jobs_of_dead_workers(tmp_path):
+    db = str(tmp_path / 'jobs.db')
+    queue = JobQueue(db, lambda payload: {'success': True, 'filename': 'c.mp3'}, sweep_interval=0.05)
+    worker = subprocess.Popen([sys.executable, '-c', 'pass'])
+    worker.wait()
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO jobs (id, state, payload, owner, created_at, started_at) "
+                     "VALUES ('running', 'running', '{}', ?, ?, ?)", (worker.pid, time.time(), time.time()))
+        conn.execute("INSERT INTO jobs (id, state, payload, owner, created_at) "
+                     "VALUES ('queued', 'queued', '{}', ?, ?)", (worker.pid, time.time()))
+        # Long-running jobs of a live worker that keeps beating are left alone, stalled ones are not
+        long_ago = time.time() - 3600
+        conn.execute("INSERT INTO jobs (id, state, payload, owner, created_at, started_at, heartbeat) "
+                     "VALUES ('alive', 'running', '{}', ?, ?, ?, ?)", (os.getppid(), long_ago, long_ago, time.time()))
+        conn.execute("INSERT INTO jobs (id, state, payload, owner, created_at, started_at, heartbeat) "
+                     "VALUES ('stalled', 'running', '{}', ?, ?, ?, ?)", (os.getppid(), long_ago, long_ago, long_ago))
+
+    interrupted = wait_for(queue, 'running')
+    assert interrupted['state'] == 'failed' and interrupted['error'] == 'interrupted'
+    assert wait_for(queue, 'queued')['filename'] == 'c.mp3'
+    assert wait_for(queue, 'stalled')['error'] == 'interrupted'
+    assert queue.get('alive')['state'] == 'running'
+    queue.shutdown()
+
+
+def test_own_long_jobs_are_kept_running_and_not_finished_twice(tmp_path):
+    release = threading.Event()
+    queue = JobQueue(
+        str(tmp_path / 'jobs.db'), lambda payload: release.wait(5) and {'success': True, 'filename': 'd.mp3'},
+        stale_after=0.05, sweep_interval=0.01
+    )
+    job_id = queue.submit({})
+    time.sleep(0.2)
+    assert queue.get(job_id)['state'] == 'running'
+
+    # Once a job has been failed as interrupted, its late result does not flip it back
+    with queue._connect() as conn:
+        conn.execute("UPDATE jobs SET state = 'failed', error = 'interrupted' WHERE id = ?", (job_id,))
+    release.set()
+    queue.shutdown()
+    assert queue.get(job_id)['state'] == 'failed'
+
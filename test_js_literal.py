@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the streaming JavaScript literal parser
+"""
+
+import pytest
+
+from js_literal import JSLiteralError, extract_assignment, parse
+
+PAGE = """<html><script>
+var other = [1, 2];
+var support_language_data = {
+    // Chinese voices
+    'zh-cn': [{'id': 1504, 'name': '潇潇-热门推荐', 'gender': 2, 'vip': false},
+              {id: 352, name: "云健 \\"新闻\\"", gender: 1, tags: ['news', [1, {}]],},],
+    "en-us": [{'id': 148, 'name': 'Jack\\u0027s', 'gender': 1, 'rate': -1.5e0, 'mask': 0x1F}],
+    /* empty */ 'ja-jp': [],
+};
+var after = {broken
+</script></html>"""
+
+
+def chunked(text, size):
+    data = text.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_extracts_every_language_from_a_page():
+    data = extract_assignment(PAGE, 'support_language_data')
+    assert list(data) == ['zh-cn', 'en-us', 'ja-jp']
+    assert data['zh-cn'][0] == {'id': 1504, 'name': '潇潇-热门推荐', 'gender': 2, 'vip': False}
+    assert data['zh-cn'][1]['name'] == '云健 "新闻"'
+    assert data['zh-cn'][1]['tags'] == ['news', [1, {}]]
+    assert data['en-us'][0]['name'] == "Jack's"
+    assert data['en-us'][0]['rate'] == -1.5
+    assert data['en-us'][0]['mask'] == 31
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64])
+def test_chunk_boundaries_do_not_matter(size):
+    expected = extract_assignment(PAGE, 'support_language_data')
+    assert extract_assignment(chunked(PAGE, size), 'support_language_data') == expected
+
+
+def test_missing_assignment_returns_none():
+    assert extract_assignment('<html>if (support_language_data == null) {}</html>', 'support_language_data') is None
+
+
+def test_malformed_literal_raises():
+    with pytest.raises(JSLiteralError):
+        parse("{'a': [1, 2}")
+    with pytest.raises(JSLiteralError):
+        parse("{'a': 1")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the Prometheus metrics registry
+"""
+
+import pytest
+
+from metrics import Registry
+
+
+def test_counters_and_gauges_render_per_label_set():
+    registry = Registry()
+    errors = registry.counter('upstream_errors_total', 'Upstream errors', ['provider', 'type'])
+    in_flight = registry.gauge('in_flight', 'Requests in flight')
+    errors.inc(provider='ttsmaker', type='timeout')
+    errors.inc(2, provider='ttsmaker', type='timeout')
+    errors.inc(provider='ai_speaker', type='http_500')
+    in_flight.inc()
+    in_flight.dec()
+
+    text = registry.render()
+    assert '# TYPE upstream_errors_total counter' in text
+    assert 'upstream_errors_total{provider="ttsmaker",type="timeout"} 3' in text
+    assert 'upstream_errors_total{provider="ai_speaker",type="http_500"} 1' in text
+    assert 'in_flight 0' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram('latency_seconds', 'Latency', ['service'], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 5):
+        latency.observe(value, service='ttsmaker')
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{service="ttsmaker",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{service="ttsmaker",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{service="ttsmaker",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{service="ttsmaker"} 6.25' in lines
+    assert 'latency_seconds_count{service="ttsmaker"} 4' in lines
+
+
+def test_snapshots_and_label_escaping():
+    registry = Registry()
+    registry.snapshot('cache_hits_total', 'Cache hits', lambda: 7, kind='counter')
+    registry.snapshot('voices', 'Voices', lambda: {('say "hi"\n',): 2}, labelnames=['name'])
+    text = registry.render()
+    assert 'cache_hits_total 7' in text
+    assert 'voices{name="say \\"hi\\"\\n"} 2' in text
+
+
+def test_wrong_labels_are_rejected():
+    counter = Registry().counter('requests_total', 'Requests', ['service'])
+    with pytest.raises(ValueError):
+        counter.inc(voice='x')
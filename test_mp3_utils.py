@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the MP3 frame parser using synthetic frames
+"""
+
+from mp3_utils import iter_frames, join_mp3, duration, split_mp3
+
+# MPEG-2 Layer III, 48 kbps, 24 kHz, mono (edge-tts output format): 144 byte frames
+FRAME_HEADER = bytes([0xFF, 0xF3, 0x64, 0xC4])
+
+
+def make_frame(fill):
+    return FRAME_HEADER + bytes([fill]) * 140
+
+
+def make_info_frame():
+    frame = bytearray(make_frame(0))
+    frame[4 + 9:4 + 13] = b'Info'
+    return bytes(frame)
+
+
+def make_id3():
+    return b'ID3\x04\x00\x00\x00\x00\x00\x05' + b'\x00' * 5
+
+
+def test_iter_frames_skips_tags_and_info_frame():
+    data = make_id3() + make_info_frame() + make_frame(1) + make_frame(2)
+    frames = list(iter_frames(data))
+    assert len(frames) == 2
+    assert all(header.length == 144 for _, header in frames)
+
+
+def test_join_keeps_only_audio_frames_in_order():
+    first = make_id3() + make_info_frame() + make_frame(1)
+    second = make_info_frame() + make_frame(2) + make_frame(3) + b'\xff\x00junk'
+    assert join_mp3([first, second]) == make_frame(1) + make_frame(2) + make_frame(3)
+
+
+def test_duration_counts_samples():
+    data = make_frame(1) * 10
+    assert abs(duration(data) - 10 * 576 / 24000) < 1e-9
+
+
+def test_split_mp3_cuts_at_frame_boundaries():
+    data = b''.join(make_frame(i) for i in range(10))
+    parts = split_mp3(data, [0.05, 0.2])
+    assert [len(part) // 144 for part in parts] == [2, 6, 2]
+    assert join_mp3(parts) == data
+    assert split_mp3(data, [1.0])[1] == b''
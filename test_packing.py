@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Offline tests for packing short texts into one edge-tts request
+"""
+
+from packing import can_pack, item_starts, pack_text, plan_packs
+
+
+def test_can_pack_needs_a_sentence_end_and_room():
+    assert can_pack('你好。', 100)
+    assert can_pack('Hello there!', 100)
+    assert not can_pack('没有句号', 100)
+    assert not can_pack('。。。', 100)
+    assert not can_pack('很长的一句话。', 5)
+
+
+def test_plan_packs_groups_in_order_within_size():
+    texts = ['一二三。', '四五六。', '不能打包', '七八九。', '十。']
+    assert sorted(plan_packs(texts, 10)) == [[0, 1], [2], [3, 4]]
+    assert sorted(plan_packs(texts, 1000)) == [[0, 1, 3, 4], [2]]
+
+
+def test_item_starts_follows_sentence_boundaries():
+    texts = ['第一句。', '第二句。第三句！', 'Last one.']
+    boundaries = [(5, '第一句。'), (100, '第二句。'), (180, '第三句！'), (260, 'Last one.')]
+    assert item_starts(texts, boundaries) == [0, 100, 260]
+    assert pack_text(texts) == '第一句。\n第二句。第三句！\nLast one.'
+
+
+def test_item_starts_rejects_misaligned_boundaries():
+    texts = ['第一句。', '第二句。']
+    assert item_starts(texts, [(0, '第一句。第二句。')]) is None
+    assert item_starts(texts, [(0, '第一句。')]) is None
+    assert item_starts(texts, [(0, '第一句。'), (10, '第二句。'), (20, '多余。')]) is None
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Offline tests for health tracking, circuit breakers and fallback routing
+"""
+
+import asyncio
+import time
+
+from provider_router import CircuitBreaker, ProviderHealth, ProviderRouter
+
+
+def make_router(**options):
+    return ProviderRouter(
+        providers=['primary', 'backup'],
+        fallbacks={'primary': ['backup']},
+        translate=lambda service, params, target: dict(params, voice_id='equivalent'),
+        **options
+    )
+
+
+def test_percentiles_and_ewma():
+    health = ProviderHealth()
+    for latency in range(1, 101):
+        health.record(True, latency / 100)
+    assert abs(health.percentile(50) - 0.5) < 0.02
+    assert abs(health.percentile(95) - 0.95) < 0.02
+    assert 0.5 < health.ewma_latency <= 1.0
+
+
+def test_breaker_opens_after_consecutive_failures_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    health = ProviderHealth()
+    breaker.record_failure(health)
+    assert breaker.allow()
+    breaker.record_failure(health)
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failures_fall_back_to_compatible_provider():
+    router = make_router(failure_threshold=2, reset_timeout=60)
+    calls = []
+
+    def convert(service, text, params):
+        calls.append(service)
+        if service == 'primary':
+            return {'success': False, 'error': 'down'}
+        return {'success': True, 'filename': f'{params["voice_id"]}.mp3'}
+
+    for _ in range(4):
+        result = router.call('primary', 'hi', {'voice_id': 1}, convert)
+        assert result['provider'] == 'backup'
+        assert result['fallback_from'] == 'primary'
+        assert result['filename'] == 'equivalent.mp3'
+
+    # Once the breaker is open the primary is skipped entirely
+    assert calls.count('primary') == 2
+    assert router.status()['primary']['state'] == 'open'
+
+
+def test_slow_successes_count_against_the_breaker():
+    router = make_router(failure_threshold=1, slow_threshold=0.01)
+    router.call('primary', 'hi', {}, lambda service, text, params: time.sleep(0.02) or {'success': True})
+    assert router.status()['primary']['state'] == 'open'
+
+
+def test_reports_last_error_when_no_provider_succeeds():
+    router = make_router()
+    result = router.call('backup', 'hi', {}, lambda service, text, params: {'success': False, 'error': 'boom'})
+    assert result == {'success': False, 'error': 'boom'}
+
+
+def test_async_calls_fall_back_like_sync_calls():
+    router = make_router(failure_threshold=1, reset_timeout=60)
+
+    async def convert(service, text, params):
+        if service == 'primary':
+            raise RuntimeError('down')
+        return {'success': True, 'filename': f'{params["voice_id"]}.mp3'}
+
+    result = asyncio.run(router.call_async('primary', 'hi', {'voice_id': 1}, convert))
+    assert result['provider'] == 'backup'
+    assert result['fallback_from'] == 'primary'
+    assert router.status()['primary']['state'] == 'open'
+
+
+def test_results_that_did_not_reach_the_provider_are_not_recorded():
+    router = make_router(failure_threshold=1, reset_timeout=0.01)
+    router.record('primary', False, 1.0)
+    time.sleep(0.02)
+
+    # The half-open probe is answered from the cache: the breaker stays half-open for a real probe
+    result = router.call('primary', 'hi', {'voice_id': 1}, lambda *args: {'success': True, 'cached': True})
+    assert result['provider'] == 'primary'
+    assert router.breakers['primary'].state == CircuitBreaker.HALF_OPEN
+    result = router.call('primary', 'hi', {'voice_id': 1}, lambda *args: {'success': True, 'upstream': False})
+    assert 'upstream' not in result
+    assert router.health['primary'].window_size() == 1
+
+    router.call('primary', 'hi', {'voice_id': 1}, lambda *args: {'success': True})
+    assert router.breakers['primary'].state == CircuitBreaker.CLOSED
+    assert router.health['primary'].window_size() == 2
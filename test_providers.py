@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the lazily loaded provider plugin registry
+"""
+
+import asyncio
+import concurrent.futures
+import sys
+
+import pytest
+
+from providers import ProviderRegistry
+from providers.base import Provider
+
+
+class EchoProvider(Provider):
+    NAME = 'echo'
+    HOST = 'echo.invalid'
+    CAPABILITIES = frozenset({'async'})
+    BATCH_CONCURRENCY = 2
+
+    def __init__(self, output_dir, greeting='hi', **context):
+        super().__init__(output_dir, **context)
+        self.greeting = greeting
+
+    def synthesize(self, text, **params):
+        filename, path = self.output_file('echo')
+        with open(path, 'w') as f:
+            f.write(f'{self.greeting} {text}')
+        return {'success': True, 'filename': filename}
+
+
+PLUGINS = {'echo': 'test_providers:EchoProvider', 'luyinzhushou': 'providers.luyinzhushou:LuyinzhushouProvider'}
+
+
+def test_plugins_are_created_once_with_their_options(tmp_path):
+    registry = ProviderRegistry({'output_dir': str(tmp_path)}, options={'echo': {'greeting': 'hello'}}, plugins=PLUGINS)
+    assert registry.loaded() == []
+    provider = registry.get('echo')
+    assert registry.get('echo') is provider
+    assert provider.supports('async') and not provider.supports('stream')
+    result = provider.synthesize('world')
+    assert (tmp_path / result['filename']).read_text() == 'hello world'
+    assert registry.describe()['echo'] == {
+        'enabled': False, 'loaded': True, 'host': 'echo.invalid', 'capabilities': ['async'], 'batch_concurrency': 2,
+    }
+
+
+def test_plugin_modules_are_imported_on_first_use(tmp_path):
+    sys.modules.pop('providers.luyinzhushou', None)
+    registry = ProviderRegistry({'output_dir': str(tmp_path)}, enabled=['echo'], plugins=PLUGINS)
+    assert registry.load_enabled() == ['echo']
+    assert 'providers.luyinzhushou' not in sys.modules
+    assert registry.describe()['luyinzhushou'] == {'enabled': False, 'loaded': False}
+    assert registry.get('luyinzhushou').BATCH_CONCURRENCY == 1
+    assert 'providers.luyinzhushou' in sys.modules
+
+
+def test_unknown_enabled_provider_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ProviderRegistry({'output_dir': str(tmp_path)}, enabled=['nope'], plugins=PLUGINS)
+
+
+def test_converter_facade_delegates_luyinzhushou_to_its_plugin(tmp_path, monkeypatch):
+    from app import TTSConverter
+    from providers.luyinzhushou import LuyinzhushouProvider
+
+    calls = []
+    monkeypatch.setattr(LuyinzhushouProvider, 'synthesize', lambda self, *args: calls.append(args) or {'success': True})
+    assert TTSConverter(str(tmp_path)).luyinzhushou('你好', 'zh-CN-YunyangNeural')['success']
+    assert calls == [('你好', 'zh-CN-YunyangNeural', '0%', '0%', None)]
+
+
+@pytest.mark.parametrize('error', [concurrent.futures.TimeoutError, asyncio.TimeoutError, TimeoutError])
+def test_edge_timeouts_of_every_kind_are_reported_as_timeouts(tmp_path, error):
+    from providers.edge import EdgeTTSProvider
+
+    class StalledRuntime:
+        def run(self, coro, timeout=None):
+            coro.close()
+            raise error()
+
+    result = EdgeTTSProvider(str(tmp_path), runtime=StalledRuntime()).synthesize('你好')
+    assert result['error_type'] == 'timeout'
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the per-host token bucket rate limiter
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from rate_limiter import HostLimiter, RateLimiter, RateLimitTimeout
+
+
+def test_burst_then_paced_admission():
+    limiter = HostLimiter('example.com', requests_per_second=20, chars_per_second=10000, burst_requests=2)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    elapsed = time.monotonic() - start
+    # Two requests from the burst, four more paced at 20/s
+    assert 0.15 < elapsed < 0.4
+    assert limiter.stats()['admitted'] == 6
+
+
+def test_character_budget_paces_long_texts():
+    limiter = HostLimiter('example.com', requests_per_second=100, chars_per_second=1000)
+    limiter.acquire(chars=1000)
+    waited = limiter.acquire(chars=200)
+    assert 0.15 < waited < 0.35
+
+
+def test_texts_longer_than_the_burst_are_charged_in_full():
+    limiter = HostLimiter('example.com', requests_per_second=100, chars_per_second=10000, burst_chars=1000)
+    assert limiter.acquire(chars=3000) < 0.01
+    # The bucket owes 2000 characters and needs 1000 more for the next long text
+    waited = limiter.acquire(chars=3000)
+    assert 0.25 < waited < 0.45
+
+
+def test_shared_buckets_charge_long_texts_in_full(tmp_path):
+    limiter = RateLimiter(
+        {'example.com': {'requests_per_second': 100, 'chars_per_second': 10000, 'burst_chars': 1000}},
+        shared_path=str(tmp_path / 'limits.db')
+    )
+    limiter.acquire('example.com', 3000)
+    assert 0.25 < limiter.acquire('example.com', 3000) < 0.45
+
+
+def test_waiters_time_out_and_are_counted():
+    limiter = HostLimiter('example.com', requests_per_second=1, chars_per_second=1000, max_wait=0.05)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire()
+    stats = limiter.stats()
+    assert stats['rejected'] == 1
+    assert stats['waiting'] == 0
+
+
+def test_queue_depth_is_reported_while_waiting():
+    limiter = HostLimiter('example.com', requests_per_second=10, chars_per_second=1000, burst_requests=1)
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(5)]
+    [thread.start() for thread in threads]
+    time.sleep(0.05)
+    assert limiter.stats()['waiting'] >= 3
+    [thread.join() for thread in threads]
+    assert limiter.stats()['peak_waiting'] >= 4
+
+
+def test_async_waiters_are_paced_without_blocking_the_loop():
+    limiter = HostLimiter('example.com', requests_per_second=20, chars_per_second=10000, burst_requests=2)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        clock = asyncio.ensure_future(ticker())
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire_async() for _ in range(6)))
+        elapsed = time.monotonic() - start
+        clock.cancel()
+        return elapsed, ticks
+
+    elapsed, ticks = asyncio.run(run())
+    assert 0.15 < elapsed < 0.5
+    # The loop kept running other tasks while the waiters slept
+    assert ticks >= 10
+    assert limiter.stats()['admitted'] == 6
+    assert limiter.stats()['waiting'] == 0
+
+
+def test_async_waiters_time_out():
+    limiter = HostLimiter('example.com', requests_per_second=1, chars_per_second=1000, max_wait=0.05)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        asyncio.run(limiter.acquire_async())
+    assert limiter.stats()['waiting'] == 0
+
+
+def test_priority_callers_jump_the_queue():
+    limiter = HostLimiter('example.com', requests_per_second=20, chars_per_second=10000, burst_requests=1)
+    limiter.acquire()
+    order = []
+
+    def acquire(name, priority=False):
+        limiter.acquire(priority=priority)
+        order.append(name)
+
+    waiters = [threading.Thread(target=acquire, args=(f'ordinary-{i}',)) for i in range(3)]
+    for thread in waiters:
+        thread.start()
+        time.sleep(0.005)
+    urgent = threading.Thread(target=acquire, args=('urgent', True))
+    urgent.start()
+    [thread.join() for thread in waiters + [urgent]]
+    # The head of the line may already be admitted; the priority caller goes right after it
+    assert order.index('urgent') <= 1
+
+
+def test_unknown_hosts_are_not_limited():
+    assert RateLimiter({}).acquire('example.com', 10 ** 6) == 0.0
+
+
+def test_shared_buckets_pace_limiters_in_different_processes(tmp_path):
+    path = str(tmp_path / 'limits.db')
+    # Two limiters with their own queues stand in for two worker processes
+    first, second = [
+        RateLimiter({'example.com': {'requests_per_second': 20, 'chars_per_second': 10000, 'burst_requests': 2}},
+                    shared_path=path)
+        for _ in range(2)
+    ]
+    start = time.monotonic()
+    for _ in range(3):
+        first.acquire('example.com')
+        second.acquire('example.com')
+    elapsed = time.monotonic() - start
+    # One shared burst of two, then four requests paced at 20/s
+    assert 0.15 < elapsed < 0.5
+    assert first.stats()['example.com']['shared']
+
+
+def test_async_waiters_take_shared_buckets_off_the_event_loop(tmp_path):
+    limiter = RateLimiter(
+        {'example.com': {'requests_per_second': 20, 'chars_per_second': 10000, 'burst_requests': 2}},
+        shared_path=str(tmp_path / 'limits.db')
+    )
+    shared = limiter.limiters['example.com'].shared
+    take = shared.take
+    threads = set()
+
+    def recording_take(costs):
+        threads.add(threading.get_ident())
+        return take(costs)
+
+    shared.take = recording_take
+
+    async def run():
+        await asyncio.gather(*(limiter.acquire_async('example.com') for _ in range(4)))
+        return threading.get_ident()
+
+    start = time.monotonic()
+    loop_thread = asyncio.run(run())
+    assert 0.05 < time.monotonic() - start < 0.5
+    assert threads and loop_thread not in threads
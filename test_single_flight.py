@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Offline tests for coalescing identical concurrent calls
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_with_one_key_share_one_result():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def synthesize():
+        calls.append(1)
+        release.wait(5)
+        return {'success': True, 'filename': 'a.mp3'}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, 'key', synthesize) for _ in range(8)]
+        while flight.stats()['followers'] < 7:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert all(result == {'success': True, 'filename': 'a.mp3'} for result, _ in results)
+    results[0][0]['timings'] = {}
+    assert 'timings' not in results[1][0]
+    assert flight.stats() == {'leaders': 1, 'followers': 7, 'in_flight': 0}
+
+
+def test_failures_reach_every_waiter_and_the_key_is_released():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def broken():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError('upstream down')
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, 'key', broken)
+        started.wait(5)
+        follower = pool.submit(flight.do, 'key', broken)
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError):
+                future.result()
+    assert flight.do('key', lambda: 'again') == ('again', False)
+
+
+def test_async_single_flight_coalesces_coroutines():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def synthesize():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'success': True}
+
+    async def run():
+        return await asyncio.gather(*(flight.do('key', synthesize) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_async_followers_survive_a_cancelled_leader():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def synthesize():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'success': True}
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do('key', synthesize))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do('key', synthesize))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == ({'success': True}, True)
+    assert len(calls) == 1
+    assert flight.stats()['in_flight'] == 0
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the request stage timer
+"""
+
+import json
+import logging
+import time
+
+from stage_timer import StageTimer, log_sampled, merge_parallel
+
+
+def test_stages_accumulate_and_render_as_server_timing():
+    timer = StageTimer()
+    with timer.stage('upstream'):
+        time.sleep(0.01)
+    timer.add('write', 1.5)
+    timer.merge({'write': 0.5, 'store': 2})
+
+    timings = timer.as_dict()
+    assert timings['upstream'] >= 10
+    assert timings['write'] == 2.0
+    assert timings['total'] >= timings['upstream']
+    header = timer.header(timings)
+    assert header.startswith('upstream;dur=')
+    assert 'write;dur=2.00, store;dur=2.00, total;dur=' in header
+
+
+def test_parallel_stages_keep_the_slowest():
+    merged = merge_parallel([{'upstream': 30, 'write': 1}, {'upstream': 50}, None])
+    assert merged == {'upstream': 50, 'write': 1}
+
+
+def test_log_sampling(caplog):
+    with caplog.at_level(logging.INFO, logger='tts.timing'):
+        log_sampled({'total': 1.0}, 0, service='ttsmaker')
+        assert not caplog.records
+        log_sampled({'total': 1.0}, 1, service='ttsmaker')
+    assert json.loads(caplog.records[0].getMessage()) == {'service': 'ttsmaker', 'timings': {'total': 1.0}}
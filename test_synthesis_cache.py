@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the synthesis cache
+"""
+
+import os
+import time
+
+from audio_store import AudioStore
+from synthesis_cache import SynthesisCache
+
+
+def write_file(store, size):
+    path = store.staging_path()
+    with open(path, 'wb') as f:
+        f.write(b'\xff' * size)
+    return path
+
+
+def test_put_then_get_hits(tmp_path):
+    store = AudioStore(str(tmp_path))
+    cache = SynthesisCache(store)
+    key = SynthesisCache.make_key('ttsmaker', '你好', 1504, 1.0, 1.0, 1.0)
+    assert cache.get(key) is None
+
+    source = write_file(store, 10)
+    cached_name = cache.put(key, source)
+    assert cache.get(key) == cached_name
+    assert not os.path.exists(source)
+    assert store.resolve(cached_name) is not None
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_key_depends_on_every_parameter():
+    base = SynthesisCache.make_key('ai_speaker', 'hi', 'en-US-GuyNeural', 'medium', 'medium', 'medium')
+    assert base != SynthesisCache.make_key('ai_speaker', 'hi', 'en-US-GuyNeural', 'fast', 'medium', 'medium')
+    assert base != SynthesisCache.make_key('ttsmaker', 'hi', 'en-US-GuyNeural', 'medium', 'medium', 'medium')
+
+
+def test_evicted_files_miss(tmp_path):
+    store = AudioStore(str(tmp_path), max_bytes=15)
+    cache = SynthesisCache(store)
+    cache.put('a', write_file(store, 10))
+    os.utime(store.shard_path('a.mp3'), (time.time() - 100, time.time() - 100))
+    cache.put('b', write_file(store, 10))
+    store.sweep()
+
+    assert cache.get('a') is None
+    assert cache.get('b') == 'b.mp3'
+
+
+def test_expired_entries_miss(tmp_path):
+    store = AudioStore(str(tmp_path))
+    cache = SynthesisCache(store, max_age=0.05)
+    cache.put('a', write_file(store, 10))
+    time.sleep(0.1)
+    assert cache.get('a') is None
+
+
+def test_entries_survive_restart(tmp_path):
+    store = AudioStore(str(tmp_path))
+    SynthesisCache(store).put('a', write_file(store, 10))
+    assert SynthesisCache(AudioStore(str(tmp_path))).get('a') == 'a.mp3'
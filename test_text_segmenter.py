@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Offline tests for sentence splitting and segmentation
+"""
+
+from text_segmenter import split_sentences, split_first, segment_text
+
+
+def test_split_chinese_and_english_sentences():
+    text = '今天天气很好。我们去公园吧！Are you coming? Yes.'
+    assert split_sentences(text) == ['今天天气很好。', '我们去公园吧！', 'Are you coming?', 'Yes.']
+
+
+def test_closing_quotes_stay_with_sentence():
+    assert split_sentences('他说：“好的。”然后走了。') == ['他说：“好的。”', '然后走了。']
+
+
+def test_decimal_points_do_not_split():
+    assert split_sentences('The price is 3.5 yuan. Thanks.') == ['The price is 3.5 yuan.', 'Thanks.']
+
+
+def test_overlong_sentence_is_split_at_clauses():
+    text = '，'.join(['一二三四五六七八九十'] * 5) + '。'
+    segments = segment_text(text, max_chars=25)
+    assert all(len(segment) <= 25 for segment in segments)
+    assert ''.join(segments) == text
+
+
+def test_split_first_returns_first_sentence_and_rest():
+    assert split_first('  你好。世界很大！ ') == ('你好。', '世界很大！')
+    assert split_first('Only one sentence') == ('Only one sentence', '')
+    assert split_first('') == ('', '')
+
+
+def test_split_first_cuts_a_long_first_sentence_at_a_clause():
+    first, rest = split_first('这句话很长，后面还有内容，继续写下去。第二句。', max_chars=8)
+    assert first == '这句话很长，'
+    assert rest == '后面还有内容，继续写下去。第二句。'
+
+
+def test_segments_are_normalized_sentences():
+    assert segment_text('第一句。\n  第二句   有空格！ Third  one.') == ['第一句。', '第二句 有空格！', 'Third one.']
+
+
+def test_editing_one_sentence_keeps_the_other_segments():
+    sentences = [f'这是第{i}句话，内容各不相同。' for i in range(20)]
+    before = segment_text(''.join(sentences), max_chars=40)
+    sentences[5] = '这一句被改写得长了很多，和原来完全不一样了。'
+    after = segment_text(''.join(sentences), max_chars=40)
+    assert [a == b for a, b in zip(before, after)].count(False) == 1
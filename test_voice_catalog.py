@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the voice catalog
+"""
+
+import json
+
+from voice_catalog import VoiceCatalog
+
+SEED = {
+    'ttsmaker': [{'id': 1504, 'name': '潇潇-热门推荐通用女声 - Female'}],
+    'ai_speaker': [{'id': 'zh-CN-XiaoxiaoNeural', 'name': '晓晓 - 标准女声'}],
+}
+
+
+def edge_voices():
+    return [
+        {'id': 'zh-CN-XiaoxiaoNeural', 'name': 'Microsoft Xiaoxiao', 'language': 'zh-cn', 'gender': 'Female'},
+        {'id': 'en-US-GuyNeural', 'name': 'Microsoft Guy', 'language': 'en-us', 'gender': 'Male'},
+    ]
+
+
+def test_seed_is_indexed_with_inferred_language_and_gender():
+    catalog = VoiceCatalog(SEED)
+    assert catalog.get('ttsmaker', 1504)['gender'] == 'Female'
+    assert catalog.get('ai_speaker', 'zh-CN-XiaoxiaoNeural')['language'] == 'zh-cn'
+    assert not catalog.has('ttsmaker', 99999)
+
+
+def test_refresh_merges_sources_and_keeps_seed_names():
+    catalog = VoiceCatalog(SEED, sources={'ai_speaker': edge_voices})
+    version = catalog.version
+    assert catalog.refresh()
+    assert catalog.version != version
+    assert catalog.get('ai_speaker', 'zh-CN-XiaoxiaoNeural')['name'] == '晓晓 - 标准女声'
+    assert [v['id'] for v in catalog.voices('ai_speaker', language='en-US')] == ['en-US-GuyNeural']
+    assert [v['id'] for v in catalog.voices('ai_speaker', gender='Male')] == ['en-US-GuyNeural']
+
+
+def test_failed_source_keeps_previous_voices():
+    def broken():
+        raise ConnectionError('offline')
+
+    catalog = VoiceCatalog(SEED, sources={'ttsmaker': broken})
+    assert not catalog.refresh()
+    assert catalog.has('ttsmaker', 1504)
+    assert 'offline' in catalog.stats()['errors']['ttsmaker']
+
+
+def test_snapshot_is_loaded_on_startup(tmp_path):
+    snapshot = str(tmp_path / 'voices.json')
+    VoiceCatalog(SEED, sources={'ai_speaker': edge_voices}, snapshot_path=snapshot).refresh()
+    with open(snapshot, encoding='utf-8') as f:
+        assert 'en-US-GuyNeural' in json.dumps(json.load(f))
+
+    restarted = VoiceCatalog(SEED, snapshot_path=snapshot)
+    assert restarted.has('ai_speaker', 'en-US-GuyNeural')
+
+
+def test_catalog_without_sources_follows_the_snapshot(tmp_path):
+    snapshot = str(tmp_path / 'voices.json')
+    follower = VoiceCatalog(SEED, snapshot_path=snapshot)
+    assert not follower.reload_snapshot()
+
+    VoiceCatalog(SEED, sources={'ai_speaker': edge_voices}, snapshot_path=snapshot).refresh()
+    assert follower.reload_snapshot()
+    assert follower.has('ai_speaker', 'en-US-GuyNeural')
+    assert not follower.reload_snapshot()
+
+
+def test_prime_waits_for_the_refreshers_first_update():
+    catalog = VoiceCatalog(SEED, sources={'ai_speaker': edge_voices}, refresh_interval=3600)
+    catalog.start_refresher()
+    assert catalog.prime(timeout=5) == {'ttsmaker': 1, 'ai_speaker': 2}
+    assert catalog.last_refresh is not None
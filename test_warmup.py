@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the start-up warm-up
+"""
+
+from warmup import WarmUp, resolve_host
+
+
+def test_warmup_reports_ready_after_all_steps_even_if_one_fails():
+    calls = []
+
+    def broken():
+        raise OSError('no route to host')
+
+    warmup = WarmUp([('first', lambda: calls.append('first')), ('broken', broken), ('last', lambda: 3)])
+    assert not warmup.ready
+    warmup.start()
+    assert warmup.wait(5)
+    status = warmup.status()
+    assert status['ready'] and calls == ['first']
+    assert status['steps']['broken'] == {'success': False, 'error': 'no route to host',
+                                         'duration_ms': status['steps']['broken']['duration_ms']}
+    assert status['steps']['last']['detail'] == 3
+    assert status['finished_at'] >= status['started_at']
+
+
+def test_skipped_warmup_is_ready_at_once():
+    warmup = WarmUp([('never', lambda: 1 / 0)])
+    warmup.skip()
+    assert warmup.ready and warmup.status()['steps'] == {}
+
+
+def test_resolve_host_uses_the_scheme_default_port():
+    assert resolve_host('wss://localhost/edge/v1?x=1') >= 1
@@ -0,0 +1,74 @@
+import re
+
+# Sentence terminators for Chinese and English text. Closing quotes and
+# brackets that follow a terminator stay with the sentence they close.
+SENTENCE_END = re.compile(
+    r'(?:[。！？!?；;…]+|\.(?=\s|$))[”’"\'）)」』】]*\s*|\n+'
+)
+# Weaker break points used when a single sentence is longer than a chunk
+CLAUSE_END = re.compile(r'[，,、：:]\s*|\s+')
+
+
+def split_sentences(text):
+    """Split text into sentences at Chinese and English sentence boundaries"""
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        end = match.end()
+        sentence = text[start:end].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = end
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _split_long(sentence, max_chars):
+    """Break an over-long sentence at clause boundaries, falling back to a hard cut"""
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = 0
+        for match in CLAUSE_END.finditer(sentence, 0, max_chars):
+            cut = match.end()
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return [piece for piece in pieces if piece]
+
+
+def split_first(text, max_chars=60):
+    """Split text into its first sentence and the rest
+
+    A first sentence longer than max_chars is cut at its first clause boundary
+    instead, so the first segment stays quick to synthesize.
+    """
+    text = text.strip()
+    sentences = split_sentences(text)
+    if not sentences:
+        return '', ''
+    first = _split_long(sentences[0], max_chars)[0]
+    return first, text[len(first):].strip()
+
+
+def normalize_segment(text):
+    """Collapse runs of whitespace, so re-wrapping a text does not change its segments"""
+    return ' '.join(text.split())
+
+
+def segment_text(text, max_chars=300):
+    """Split text into normalized sentences of at most max_chars characters, in order
+
+    Sentences are never merged, so segment boundaries depend only on the sentence
+    itself and editing one sentence leaves the segments of all the others unchanged.
+    """
+    return [
+        normalize_segment(piece)
+        for sentence in split_sentences(text)
+        for piece in _split_long(sentence, max_chars)
+    ]
+
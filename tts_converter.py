@@ -1,8 +1,6 @@
 import os
-import time
-import requests
-from urllib.parse import quote
-from bs4 import BeautifulSoup
+
+from providers import ProviderRegistry
 
 class TTSConverter:
     def __init__(self, output_dir='tts_output'):
@@ -10,104 +8,27 @@ class TTSConverter:
         self.output_dir = output_dir
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        # Each service's plugin (and its dependencies) is only imported when it is first used
+        self.providers = ProviderRegistry({'output_dir': output_dir})
+
+    def convert(self, service, text, **params):
+        """Run one provider plugin and describe the outcome"""
+        result = self.providers.get(service).synthesize(text, **params)
+        if result['success']:
+            return f"Success! Audio saved as {os.path.join(self.output_dir, result['filename'])}"
+        return result['error']
 
     def tts_maker_cn(self, text, voice_type=0):
         """Convert text to speech using ttsmaker.cn"""
-        try:
-            url = 'https://ttsmaker.cn/api/tts'
-            data = {
-                'text': text,
-                'voice_id': voice_type,  # 0-7 for different voices
-                'speed': 1.0,
-                'volume': 1.0,
-                'pitch': 1.0,
-                'audio_format': 'mp3',
-                'audio_speed': 1.0,
-                'audio_volume': 0,
-                'audio_norm': '0',
-                'text_paragraph_pause_time': 0,
-                'background_music_volume': 0,
-                'background_music_speed': 1.0,
-                'background_music_volume': 0,
-                'speech_rate': 1.0,
-                'pitch_rate': 1.0,
-                'speech_volume': 1.0,
-            }
-            
-            response = requests.post(url, data=data, headers=self.headers)
-            if response.status_code == 200:
-                timestamp = int(time.time())
-                filename = os.path.join(self.output_dir, f'ttsmaker_{timestamp}.mp3')
-                with open(filename, 'wb') as f:
-                    f.write(response.content)
-                return f"Success! Audio saved as {filename}"
-            return f"Error from ttsmaker.cn: {response.status_code}"
-        except Exception as e:
-            return f"Error with ttsmaker.cn: {str(e)}"
+        return self.convert('ttsmaker', text, voice_id=voice_type)
 
     def luyinzhushou(self, text):
         """Convert text to speech using luyinzhushou.com"""
-        try:
-            # First, get the token from the main page
-            session = requests.Session()
-            main_page = session.get('https://www.luyinzhushou.com/text2voice/', headers=self.headers)
-            soup = BeautifulSoup(main_page.text, 'html.parser')
-            token = soup.find('input', {'name': '_token'})['value']
-            
-            # Then make the TTS request
-            url = 'https://www.luyinzhushou.com/voice/convert'
-            data = {
-                '_token': token,
-                'text': text,
-                'voice': 'zh-CN-YunxiNeural',
-                'style': 'general',
-                'rate': '0%',
-                'pitch': '0%',
-                'format': 'mp3',
-            }
-            
-            response = session.post(url, data=data, headers=self.headers)
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('status') == 'success':
-                    audio_url = result.get('url')
-                    if audio_url:
-                        audio_response = session.get(audio_url, headers=self.headers)
-                        timestamp = int(time.time())
-                        filename = os.path.join(self.output_dir, f'luyinzhushou_{timestamp}.mp3')
-                        with open(filename, 'wb') as f:
-                            f.write(audio_response.content)
-                        return f"Success! Audio saved as {filename}"
-            return f"Error from luyinzhushou.com: {response.status_code}"
-        except Exception as e:
-            return f"Error with luyinzhushou.com: {str(e)}"
+        return self.convert('luyinzhushou', text)
 
     def ai_speaker_net(self, text):
         """Convert text to speech using ai-speaker.net"""
-        try:
-            # This is a simplified version and might need adjustments based on the actual website's API
-            url = 'https://ai-speaker.net/api/tts'
-            data = {
-                'text': text,
-                'language': 'zh-CN',
-                'speed': 1.0,
-                'pitch': 1.0,
-                'volume': 1.0,
-            }
-            
-            response = requests.post(url, json=data, headers=self.headers)
-            if response.status_code == 200:
-                timestamp = int(time.time())
-                filename = os.path.join(self.output_dir, f'ai_speaker_{timestamp}.mp3')
-                with open(filename, 'wb') as f:
-                    f.write(response.content)
-                return f"Success! Audio saved as {filename}"
-            return f"Error from ai-speaker.net: {response.status_code}"
-        except Exception as e:
-            return f"Error with ai-speaker.net: {str(e)}"
+        return self.convert('ai_speaker_net', text)
 
 def main():
     print("中文TTS转换器 - 支持多种免费TTS服务\n" + "="*50)
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from js_literal import extract_assignment
+
+TTSMAKER_GENDERS = {1: 'Male', 2: 'Female'}
+
+
+def guess_gender(name):
+    """Infer a voice's gender from its display name"""
+    if 'Female' in name or '女' in name:
+        return 'Female'
+    if 'Male' in name or '男' in name:
+        return 'Male'
+    return 'Other'
+
+
+def guess_language(service, voice_id):
+    """Infer a voice's language code from its id ('zh-CN-XiaoxiaoNeural' -> 'zh-cn')"""
+    if isinstance(voice_id, str) and voice_id.count('-') >= 2:
+        return '-'.join(voice_id.split('-')[:2]).lower()
+    return 'zh-cn' if service == 'ttsmaker' else 'unknown'
+
+
+def fetch_ttsmaker_voices(http, limiter=None):
+    """Read every language's voices from the support_language_data literal on ttsmaker.cn"""
+    if limiter is not None:
+        limiter.acquire('ttsmaker.cn')
+    response = http.get('https://ttsmaker.cn/', headers={'Referer': 'https://ttsmaker.cn/'}, stream=True)
+    with response:
+        response.raise_for_status()
+        # Parsed straight off the socket; the rest of the page is never read
+        data = extract_assignment(response.iter_content(chunk_size=64 * 1024), 'support_language_data')
+    if not isinstance(data, dict):
+        raise ValueError('support_language_data not found on ttsmaker.cn')
+
+    voices = []
+    for language, entries in data.items():
+        for entry in entries:
+            voices.append({
+                'id': int(entry['id']),
+                'name': entry.get('name', str(entry['id'])),
+                'language': language.lower(),
+                'gender': TTSMAKER_GENDERS.get(entry.get('gender'), 'Other'),
+            })
+    return voices
+
+
+def fetch_edge_voices(runtime, timeout=30):
+    """List the voices edge-tts offers"""
+    # Imported here so that loading the catalog does not load the edge-tts provider's dependencies
+    import edge_tts
+
+    voices = runtime.run(edge_tts.list_voices(), timeout=timeout)
+    return [
+        {
+            'id': voice['ShortName'],
+            'name': voice.get('FriendlyName', voice['ShortName']),
+            'language': voice['Locale'].lower(),
+            'gender': voice.get('Gender', 'Other'),
+        }
+        for voice in voices
+    ]
+
+
+class VoiceCatalog:
+    """Indexed voice lists per service, loaded from a snapshot and refreshed in the background
+
+    seed holds the curated voices for each service; they always stay in the
+    catalog and keep their display names when a refresh returns them again.
+    sources maps a service to a callable returning its current voice list.
+    A catalog without sources follows the snapshot another process refreshes.
+    """
+
+    def __init__(self, seed, sources=None, snapshot_path=None, refresh_interval=3600):
+        self.seed = {service: [self._normalize(service, v) for v in voices] for service, voices in seed.items()}
+        self.sources = sources or {}
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self.last_refresh = None
+        self.errors = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._updated = threading.Event()
+        self._snapshot_mtime = self._snapshot_version()
+        self._install(self._load_snapshot())
+
+    @staticmethod
+    def _normalize(service, voice):
+        return {
+            'id': voice['id'],
+            'name': voice['name'],
+            'language': voice.get('language') or guess_language(service, voice['id']),
+            'gender': voice.get('gender') or guess_gender(voice['name']),
+        }
+
+    def _snapshot_version(self):
+        try:
+            return os.path.getmtime(self.snapshot_path) if self.snapshot_path else None
+        except OSError:
+            return None
+
+    def _load_snapshot(self):
+        if not self.snapshot_path:
+            return {}
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                return json.load(f).get('voices', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_snapshot(self, voices):
+        if not self.snapshot_path:
+            return
+        staging = f'{self.snapshot_path}.tmp'
+        with open(staging, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': time.time(), 'voices': voices}, f, ensure_ascii=False)
+        os.replace(staging, self.snapshot_path)
+
+    def _install(self, fetched):
+        """Merge fetched voice lists over the seed and rebuild the indexes"""
+        voices = {}
+        by_id = {}
+        by_language = {}
+        by_gender = {}
+        for service, seed_voices in self.seed.items():
+            merged = {voice['id']: voice for voice in seed_voices}
+            for voice in fetched.get(service, []):
+                voice = self._normalize(service, voice)
+                if voice['id'] in merged:
+                    voice['name'] = merged[voice['id']]['name']
+                merged[voice['id']] = voice
+            voices[service] = list(merged.values())
+            by_id[service] = merged
+            by_language[service] = {}
+            by_gender[service] = {}
+            for voice in merged.values():
+                by_language[service].setdefault(voice['language'], []).append(voice)
+                by_gender[service].setdefault(voice['gender'], []).append(voice)
+
+        version = hashlib.sha256(json.dumps(voices, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+        with self._lock:
+            self._voices = voices
+            self._by_id = by_id
+            self._by_language = by_language
+            self._by_gender = by_gender
+            self.version = version
+
+    def get(self, service, voice_id):
+        """Return the voice entry for an id, or None if the service does not offer it"""
+        return self._by_id.get(service, {}).get(voice_id)
+
+    def has(self, service, voice_id):
+        return self.get(service, voice_id) is not None
+
+    def voices(self, service, language=None, gender=None):
+        """Voices of a service, optionally narrowed to one language and/or gender"""
+        if language is not None:
+            candidates = self._by_language.get(service, {}).get(language.lower(), [])
+        elif gender is not None:
+            candidates = self._by_gender.get(service, {}).get(gender, [])
+        else:
+            candidates = self._voices.get(service, [])
+        if gender is not None:
+            candidates = [voice for voice in candidates if voice['gender'] == gender]
+        return candidates
+
+    def languages(self, service):
+        return sorted(self._by_language.get(service, {}))
+
+    def refresh(self):
+        """Fetch every source, keeping the previous list for any that fails"""
+        with self._lock:
+            fetched = {service: list(voices) for service, voices in self._voices.items()}
+        changed = False
+        for service, source in self.sources.items():
+            try:
+                fetched[service] = source()
+                self.errors.pop(service, None)
+                changed = True
+            except Exception as e:
+                self.errors[service] = str(e)
+        if changed:
+            self._install(fetched)
+            self._save_snapshot(self._voices)
+        self.last_refresh = time.time()
+        return changed
+
+    def reload_snapshot(self):
+        """Install the snapshot again if another process has saved a newer one"""
+        version = self._snapshot_version()
+        if version is None or version == self._snapshot_mtime:
+            return False
+        self._snapshot_mtime = version
+        self._install(self._load_snapshot())
+        self.last_refresh = time.time()
+        return True
+
+    def start_refresher(self):
+        """Run refresh() now and then every refresh_interval seconds on a daemon thread
+
+        Without sources, the snapshot is checked for changes instead, at least
+        once a minute.
+        """
+        if self._refresher is not None or self.refresh_interval <= 0:
+            return
+        if self.sources:
+            update, interval = self.refresh, self.refresh_interval
+        elif self.snapshot_path:
+            update, interval = self.reload_snapshot, min(self.refresh_interval, 60)
+        else:
+            return
+
+        def run():
+            while True:
+                update()
+                self._updated.set()
+                time.sleep(interval)
+
+        self._refresher = threading.Thread(target=run, name='voice-catalog-refresher', daemon=True)
+        self._refresher.start()
+
+    def prime(self, timeout=None):
+        """Load the voice lists once before serving: wait for the refresher's first update, or refresh now"""
+        if self._refresher is not None:
+            self._updated.wait(timeout)
+        elif self.sources:
+            self.refresh()
+        else:
+            self.reload_snapshot()
+        return {service: len(voices) for service, voices in self._voices.items()}
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'voices': {service: len(voices) for service, voices in self._voices.items()},
+            'last_refresh': self.last_refresh,
+            'errors': dict(self.errors),
+        }
@@ -0,0 +1,68 @@
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def resolve_host(url):
+    """Resolve the host of url so the first connection does not wait on DNS"""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme in ('https', 'wss') else 80)
+    return len(socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM))
+
+
+class WarmUp:
+    """Named start-up steps run once on a background thread, reporting readiness when all have finished
+
+    A failing step is recorded but does not hold back readiness: the service
+    can still answer, only without that step's head start.
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.results = {}
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+        self._thread = None
+
+    def run(self):
+        self.started_at = time.time()
+        for name, step in self.steps:
+            start = time.perf_counter()
+            try:
+                detail = step()
+                result = {'success': True}
+                if detail is not None:
+                    result['detail'] = detail
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            result['duration_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            self.results[name] = result
+        self.finished_at = time.time()
+        self._done.set()
+
+    def start(self):
+        """Run the steps on a daemon thread; calling it again does nothing"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name='tts-warmup', daemon=True)
+            self._thread.start()
+
+    def skip(self):
+        """Report ready without running any step"""
+        self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'steps': dict(self.results),
+        }